@@ -0,0 +1,50 @@
+"""
+baas: one entry point for every pipeline step.
+
+    baas run --study VEXIN-03 --domains DM
+    baas scaffold --study VEXIN-03 --domain all
+
+Only the module of the chosen command is imported, and it runs exactly as it
+would under `python3 -m <module>`, so each command keeps its own options.
+"""
+import argparse
+import runpy
+import sys
+
+COMMANDS = {
+    "run": ("adapters.odm_json.runners.run_pipeline", "Run the whole pipeline for one study"),
+    "batch": ("adapters.odm_json.runners.run_batch", "Run the pipeline for many studies"),
+    "convert": ("adapters.odm_json.extractors.convert_odm_xml_to_json", "Validate ODM-XML and extract metadata"),
+    "ingest": ("adapters.odm_json.extractors.extract_clinical_data", "Load ClinicalData into DuckDB"),
+    "terminology": ("adapters.odm_json.validators.validate_controlled_terms", "Check raw data against CodeLists"),
+    "normalize": ("adapters.odm_json.extractors.normalize_sdtmig_json", "Normalize the SDTMIG JSON"),
+    "match": ("adapters.odm_json.matchers.match_odm_to_sdtm", "Match ODM items to SDTM variables"),
+    "suggest": ("adapters.odm_json.matchers.suggest_candidates", "Suggest SDTM variables for unmatched items"),
+    "scaffold": ("adapters.odm_json.scaffolds.scaffold_sql", "Generate dbt models per domain"),
+    "define": ("adapters.odm_json.writers.write_define_xml", "Write Define-XML 2.1 for the study"),
+    "build": ("adapters.odm_json.runners.run_dbt", "Build the dbt models changed since the last build"),
+    "serve": ("adapters.odm_json.runners.serve", "Serve jobs from one process with warm caches"),
+    "job": ("adapters.odm_json.runners.service_client", "Submit a job to a running service"),
+}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="baas",
+        description="SDTM Blueprint-as-a-Service command line.",
+        epilog="\n".join(f"  {name:<10} {help_text}" for name, (_, help_text) in COMMANDS.items()),
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    parser.add_argument("command", choices=sorted(COMMANDS), metavar="command", help="One of the commands below")
+    parser.add_argument("args", nargs=argparse.REMAINDER, help="Options passed to the command (see baas <command> -h)")
+    args = parser.parse_args(argv)
+
+    module, _ = COMMANDS[args.command]
+    sys.argv = [f"baas {args.command}", *args.args]
+    runpy.run_module(module, run_name="__main__", alter_sys=True)
+
+
+if __name__ == "__main__":
+    main()
+
+## -- End of Program Code -- ##
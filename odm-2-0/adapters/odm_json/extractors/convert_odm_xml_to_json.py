@@ -1,21 +1,37 @@
 import argparse
-import json
 import xml.etree.ElementTree as ET
-from lxml import etree
 from pathlib import Path
+from typing import Optional
 
+from adapters.odm_json.utils.artifacts import artifact_outputs, save_tree
+from adapters.odm_json.utils.build_cache import file_digest
 from adapters.odm_json.utils.load_paths import load_paths
+from adapters.odm_json.utils.metadata_model import (
+    Alias,
+    CodeList,
+    ItemDef,
+    ItemGroupDef,
+    ItemRef,
+    MetaDataVersion,
+    StudyMetadata,
+    intern,
+)
 
 NS = {"odm": "http://www.cdisc.org/ns/odm/v2.0"}
 
 # -- Schema Validation
-def validate_xml_against_xsd(xml_path: Path, xsd_path: Path):
-    """Validate the XML against a given XSD schema, resolving includes."""
-    parser = etree.XMLParser(load_dtd=True, no_network=False)
+def validate_xml_against_xsd(xml_path: Path, xsd_path: Path, cache_dir: Optional[Path] = None):
+    """
+    Validate the XML against a given XSD schema, resolving includes.
 
-    with open(xsd_path, 'rb') as f:
-        schema_doc = etree.parse(f, parser)
-        schema = etree.XMLSchema(schema_doc)
+    The compiled schema is cached per process (see utils.schema_cache) and the
+    parsed lxml document is returned so parse_metadata() can reuse it.
+    """
+    # lxml is only needed when an XSD is configured
+    from lxml import etree
+    from adapters.odm_json.utils.schema_cache import load_schema
+
+    schema = load_schema(xsd_path, cache_dir=cache_dir)
 
     xml_doc = etree.parse(str(xml_path))
     is_valid = schema.validate(xml_doc)
@@ -23,10 +39,90 @@ def validate_xml_against_xsd(xml_path: Path, xsd_path: Path):
     if not is_valid:
         raise ValueError(f"XML validation failed:\n{schema.error_log}")
     print(f"✅ XML file {xml_path.name} is valid against {xsd_path.name}")
+    return xml_doc
 
 # -- XML Parse
-def parse_metadata(xml_path: Path) -> dict:
-    tree = ET.parse(xml_path)
+# Definitions are built as the slotted records of utils.metadata_model, with
+# OIDs, names and other repeated attribute values interned.
+def _attr(elem, name: str) -> Optional[str]:
+    return intern(elem.attrib.get(name))
+
+
+def _item_def_entry(item) -> ItemDef:
+    cl_ref = item.find("odm:CodeListRef", NS)
+    code_list_oid = _attr(cl_ref, "CodeListOID") if cl_ref is not None else None
+    aliases = []
+    is_derived = False
+    for alias in item.findall("odm:Alias", NS):
+        ctx = _attr(alias, "Context")
+        aliases.append(Alias(ctx, _attr(alias, "Name")))
+        if ctx == "DERIVATION_RULE":
+            is_derived = True
+    question_el = item.find("odm:Question/odm:TranslatedText", NS)
+    question = question_el.text.strip() if question_el is not None and question_el.text else None
+
+    return ItemDef(
+        OID=_attr(item, "OID"),
+        Name=_attr(item, "Name"),
+        DataType=_attr(item, "DataType"),
+        Length=_attr(item, "Length"),
+        Format=_attr(item, "DisplayFormat"),
+        CodeListRef=code_list_oid,
+        Derived=is_derived,
+        Question=question,
+        Aliases=tuple(aliases),
+    )
+
+
+def _code_list_entry(cl) -> CodeList:
+    coded_values, decodes = [], []
+    for cli in cl.findall("odm:CodeListItem", NS):
+        decode_el = cli.find("odm:Decode/odm:TranslatedText", NS)
+        coded_values.append(_attr(cli, "CodedValue"))
+        decodes.append(decode_el.text if decode_el is not None else None)
+    return CodeList(
+        OID=_attr(cl, "OID"),
+        Name=_attr(cl, "Name"),
+        DataType=_attr(cl, "DataType"),
+        CodedValues=tuple(coded_values),
+        Decodes=tuple(decodes),
+    )
+
+
+def _item_group_def_entry(ig) -> ItemGroupDef:
+    return ItemGroupDef(
+        OID=_attr(ig, "OID"),
+        Name=_attr(ig, "Name"),
+        Type=_attr(ig, "Type"),
+        Repeating=_attr(ig, "Repeating"),
+        ItemRefs=tuple(
+            ItemRef(_attr(ir, "ItemOID"), _attr(ir, "Mandatory"), _attr(ir, "RepeatKey"))
+            for ir in ig.findall("odm:ItemRef", NS)
+        ),
+    )
+
+
+# MetaDataVersion children captured by the extractor, keyed by Clark tag
+ENTRY_BUILDERS = {
+    f"{{{NS['odm']}}}ItemDef": ("ItemDefs", _item_def_entry),
+    f"{{{NS['odm']}}}CodeList": ("CodeLists", _code_list_entry),
+    f"{{{NS['odm']}}}ItemGroupDef": ("ItemGroupDefs", _item_group_def_entry),
+}
+
+
+def parse_metadata(xml_path: Path, stream: bool = False, tree=None) -> StudyMetadata:
+    """
+    Extract MetaDataVersion definitions from an ODM-XML file. The result is a
+    StudyMetadata record that reads (and is saved) like the JSON dict.
+
+    Pass an already parsed document as `tree` (e.g. the lxml tree returned by
+    validate_xml_against_xsd) to skip re-reading the file.
+    """
+    if stream:
+        return parse_metadata_streaming(xml_path)
+
+    if tree is None:
+        tree = ET.parse(xml_path)
     root = tree.getroot()
 
     study = root.find("odm:Study", NS)
@@ -38,79 +134,140 @@ def parse_metadata(xml_path: Path) -> dict:
     if mdv is None:
         raise ValueError("No <MetaDataVersion> found – export may be incomplete.")
 
-    meta_json = {
-        "StudyOID": study_oid,
-        "MetaDataVersion": {
-            "OID": mdv.attrib.get("OID", "MDV.UNKNOWN"),
-            "Name": mdv.attrib.get("Name", ""),
-            "ItemDefs": [],
-            "CodeLists": [],
-            "ItemGroupDefs": [],
-        }
-    }
-
-    # ----- ItemDefs -----
-    for item in mdv.findall("odm:ItemDef", NS):
-        fmt = item.attrib.get("DisplayFormat")
-        cl_ref = item.find("odm:CodeListRef", NS)
-        code_list_oid = cl_ref.attrib.get("CodeListOID") if cl_ref is not None else None
-        aliases = []
-        is_derived = False
-        for alias in item.findall("odm:Alias", NS):
-            ctx = alias.attrib.get("Context")
-            name_ = alias.attrib.get("Name")
-            aliases.append({"Context": ctx, "Name": name_})
-            if ctx == "DERIVATION_RULE":
-                is_derived = True
-
-        item_entry = {
-            "OID": item.attrib.get("OID"),
-            "Name": item.attrib.get("Name"),
-            "DataType": item.attrib.get("DataType"),
-            "Length": item.attrib.get("Length"),
-            "Format": fmt,
-            "CodeListRef": code_list_oid,
-            "Derived": is_derived,
-            "Aliases": aliases
-        }
-        meta_json["MetaDataVersion"]["ItemDefs"].append(item_entry)
-
-    # ----- CodeLists -----
-    for cl in mdv.findall("odm:CodeList", NS):
-        cl_entry = {
-            "OID": cl.attrib.get("OID"),
-            "Name": cl.attrib.get("Name"),
-            "DataType": cl.attrib.get("DataType"),
-            "Items": []
-        }
-        for cli in cl.findall("odm:CodeListItem", NS):
-            coded_val = cli.attrib.get("CodedValue")
-            decode_el = cli.find("odm:Decode/odm:TranslatedText", NS)
-            decode_text = decode_el.text if decode_el is not None else None
-            cl_entry["Items"].append({
-                "CodedValue": coded_val,
-                "Decode": decode_text
-            })
-        meta_json["MetaDataVersion"]["CodeLists"].append(cl_entry)
-
-    # ----- ItemGroupDefs -----
-    for ig in mdv.findall("odm:ItemGroupDef", NS):
-        ig_entry = {
-            "OID": ig.attrib.get("OID"),
-            "Name": ig.attrib.get("Name"),
-            "Type": ig.attrib.get("Type"),
-            "Repeating": ig.attrib.get("Repeating"),
-            "ItemRefs": []
-        }
-        for ir in ig.findall("odm:ItemRef", NS):
-            ig_entry["ItemRefs"].append({
-                "ItemOID": ir.attrib.get("ItemOID"),
-                "Mandatory": ir.attrib.get("Mandatory"),
-                "RepeatKey": ir.attrib.get("RepeatKey")
-            })
-        meta_json["MetaDataVersion"]["ItemGroupDefs"].append(ig_entry)
-
-    return meta_json
+    return StudyMetadata(
+        StudyOID=intern(study_oid),
+        MetaDataVersion=MetaDataVersion(
+            OID=intern(mdv.attrib.get("OID", "MDV.UNKNOWN")),
+            Name=mdv.attrib.get("Name", ""),
+            ItemDefs=[_item_def_entry(item) for item in mdv.findall("odm:ItemDef", NS)],
+            CodeLists=[_code_list_entry(cl) for cl in mdv.findall("odm:CodeList", NS)],
+            ItemGroupDefs=[_item_group_def_entry(ig) for ig in mdv.findall("odm:ItemGroupDef", NS)],
+        ),
+    )
+
+
+# -- Streaming XML Parse
+def iter_metadata(xml_path: Path):
+    """
+    Stream the first Study/MetaDataVersion of an ODM-XML file with iterparse.
+
+    Yields ("Study", {...}) and ("MetaDataVersion", {...}) headers as their
+    start tags are read, then ("ItemDefs" | "CodeLists" | "ItemGroupDefs", entry)
+    as each definition closes. Every finished element is detached from its
+    parent, and reading stops as soon as MetaDataVersion closes, so the
+    ClinicalData after it is never parsed.
+    """
+    study_tag = f"{{{NS['odm']}}}Study"
+    mdv_tag = f"{{{NS['odm']}}}MetaDataVersion"
+
+    stack = []
+    study = mdv = capture = None
+
+    with open(xml_path, "rb") as source:
+        for event, elem in ET.iterparse(source, events=("start", "end")):
+            if event == "start":
+                stack.append(elem)
+                depth = len(stack)
+                if depth == 2 and study is None and elem.tag == study_tag:
+                    study = elem
+                    yield "Study", {"OID": elem.attrib.get("OID", "UNKNOWN_STUDY")}
+                elif depth == 3 and mdv is None and stack[1] is study and elem.tag == mdv_tag:
+                    mdv = elem
+                    yield "MetaDataVersion", {
+                        "OID": elem.attrib.get("OID", "MDV.UNKNOWN"),
+                        "Name": elem.attrib.get("Name", ""),
+                    }
+                elif depth == 4 and capture is None and stack[2] is mdv and elem.tag in ENTRY_BUILDERS:
+                    capture = elem
+                continue
+
+            stack.pop()
+            if elem is mdv:
+                # Everything read here is inside MetaDataVersion; skip the ClinicalData after it
+                return
+            if elem is capture:
+                key, build = ENTRY_BUILDERS[elem.tag]
+                yield key, build(elem)
+                capture = None
+            elif capture is not None:
+                # Children of a captured definition are read when it closes
+                continue
+
+            elem.clear()
+            if stack:
+                stack[-1].remove(elem)
+
+
+def parse_metadata_streaming(xml_path: Path) -> StudyMetadata:
+    """Build the same StudyMetadata as parse_metadata() from iter_metadata() in flat memory."""
+    study_oid = None
+    mdv_header = None
+    sections = {key: [] for key, _ in ENTRY_BUILDERS.values()}
+
+    for kind, entry in iter_metadata(xml_path):
+        if kind == "Study":
+            study_oid = entry["OID"]
+        elif kind == "MetaDataVersion":
+            mdv_header = entry
+        else:
+            sections[kind].append(entry)
+
+    if study_oid is None:
+        raise ValueError("No <Study> element found – is this valid ODM‑XML?")
+    if mdv_header is None:
+        raise ValueError("No <MetaDataVersion> found – export may be incomplete.")
+
+    return StudyMetadata(
+        StudyOID=intern(study_oid),
+        MetaDataVersion=MetaDataVersion(
+            OID=intern(mdv_header["OID"]),
+            Name=mdv_header["Name"],
+            ItemDefs=sections["ItemDefs"],
+            CodeLists=sections["CodeLists"],
+            ItemGroupDefs=sections["ItemGroupDefs"],
+        ),
+    )
+
+
+def validate_odm_xml(paths: dict, stream: bool = False, workers: Optional[int] = None, force: bool = False):
+    """
+    Validate the study export against its configured XSD, unless this exact file
+    already passed (recorded by content hash under schema_cache_dir). With stream,
+    ClinicalData is validated per SubjectData chunk on a process pool and None is
+    returned; otherwise the validated lxml document is returned for reuse.
+    """
+    xml_path = Path(paths["odm_xml"])
+    xsd_path = paths.get("odm_xsd") or paths.get("schemas", {}).get("odm_xsd")
+    cache_dir = Path(paths["schema_cache_dir"]) if paths.get("schema_cache_dir") else None
+
+    if not xml_path.exists():
+        raise FileNotFoundError(f"Input ODM-XML not found at: {xml_path}")
+    if not xsd_path:
+        return None
+
+    from adapters.odm_json.utils.schema_cache import schema_set_digest
+    from adapters.odm_json.validators.validate_odm_xml import is_validated, record_validated, validate_xml_streaming
+
+    if stream:
+        validate_xml_streaming(xml_path, Path(xsd_path), cache_dir=cache_dir, workers=workers, force=force)
+        return None
+
+    xml_digest, xsd_digest = file_digest(xml_path), schema_set_digest(Path(xsd_path), cache_dir)
+    if not force and is_validated(xml_digest, xsd_digest, cache_dir):
+        print(f"✅ XML file {xml_path.name} unchanged since last validation against {Path(xsd_path).name}, skipping")
+        return None
+    xml_doc = validate_xml_against_xsd(xml_path, Path(xsd_path), cache_dir=cache_dir)
+    record_validated(xml_path, xml_digest, xsd_digest, cache_dir)
+    return xml_doc
+
+
+def extract_odm_metadata(paths: dict, stream: bool = False, workers: Optional[int] = None) -> StudyMetadata:
+    """Validate (when an XSD is configured) and extract metadata for a resolved paths.yml."""
+    xml_path = Path(paths["odm_xml"])
+    xml_doc = validate_odm_xml(paths, stream=stream, workers=workers)
+
+    # Reuse the validated lxml document instead of parsing the file a second time
+    return parse_metadata(xml_path, stream=stream, tree=None if stream else xml_doc)
 
 
 def main():
@@ -119,25 +276,33 @@ def main():
     )
     parser.add_argument("--study", required=True, help="Study folder name")
     parser.add_argument("--env", required=True, help="Environment name in paths.yml (e.g., dev)")
+    parser.add_argument(
+        "--stream", action="store_true",
+        help="Stream MetaDataVersion with iterparse (flat memory for large ClinicalData exports)"
+    )
+    parser.add_argument(
+        "--validate-only", action="store_true",
+        help="Only validate the export against its XSD (streamed, parallel) and report throughput"
+    )
+    parser.add_argument("--workers", type=int, default=None, help="Validation workers (default: CPU count)")
+    parser.add_argument(
+        "--force", action="store_true", help="Validate even if this export already passed"
+    )
     args = parser.parse_args()
 
     paths = load_paths(study=args.study, env=args.env)
-    xml_path = Path(paths["odm_xml"])
-    out_path = Path(paths["crf_metadata_json"])
-    xsd_path = paths.get("schemas", {}).get("odm_xsd")
-
-    if not xml_path.exists():
-        raise FileNotFoundError(f"Input ODM-XML not found at: {xml_path}")
-    if xsd_path:
-        validate_xml_against_xsd(xml_path, Path(xsd_path))
 
-    metadata = parse_metadata(xml_path)
+    if args.validate_only:
+        if not (paths.get("odm_xsd") or paths.get("schemas", {}).get("odm_xsd")):
+            parser.error("No odm_xsd configured in paths.yml")
+        validate_odm_xml(paths, stream=True, workers=args.workers, force=args.force)
+        return
 
-    out_path.parent.mkdir(parents=True, exist_ok=True)
-    with open(out_path, "w", encoding="utf-8") as f:
-        json.dump(metadata, f, indent=2)
+    metadata = extract_odm_metadata(paths, stream=args.stream)
 
-    print(f"✅ Metadata written to {out_path}")
+    for out_path in artifact_outputs(paths, "crf_metadata"):
+        save_tree(metadata, out_path)
+        print(f"✅ Metadata written to {out_path}")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,578 @@
+from __future__ import annotations
+
+import argparse
+import json
+import xml.etree.ElementTree as ET
+from pathlib import Path
+from typing import TYPE_CHECKING, Dict, Iterator, Optional
+
+import yaml
+
+from adapters.odm_json.extractors.convert_odm_xml_to_json import NS, parse_metadata
+from adapters.odm_json.utils.build_cache import data_digest, file_digest
+from adapters.odm_json.utils.load_paths import load_paths
+
+# duckdb and pandas are imported where a connection is used, not at import time
+if TYPE_CHECKING:
+    import duckdb
+
+# DuckDB schema the raw tables are loaded into; dbt reads them as source('odm_raw', ...)
+RAW_SCHEMA = "odm_raw"
+
+# Identifying columns written ahead of the ItemDef columns of every raw table
+KEY_COLUMNS = [
+    "SubjectKey", "StudyEventOID", "StudyEventRepeatKey",
+    "ItemGroupOID", "ItemGroupRepeatKey", "TransactionType",
+]
+
+# A raw row is identified by every key column except its TransactionType
+ROW_KEY = KEY_COLUMNS[:-1]
+
+# ItemGroupData transactions that change only the ItemData they carry; any other
+# (Insert, or none in a snapshot export) replaces the whole row
+MERGE_TRANSACTIONS = ("Update", "Upsert", "Context")
+
+# Subjects touched by the last ingest; incremental dbt models read only these
+CHANGES_TABLE = "ingest_changes"
+
+# ODM DataType → DuckDB column type; anything else (text, date, datetime, ...) stays VARCHAR
+DUCKDB_TYPES = {
+    "integer": "BIGINT",
+    "float": "DOUBLE",
+    "double": "DOUBLE",
+    "decimal": "DOUBLE",
+    "boolean": "BOOLEAN",
+}
+
+def _tag(name: str) -> str:
+    return f"{{{NS['odm']}}}{name}"
+
+# -- Table Layout
+def item_domain(item_oid: str) -> Optional[str]:
+    """Domain code from an IT.<DOMAIN>.<VAR> ItemOID, or None for other OID shapes."""
+    parts = item_oid.split(".")
+    return parts[1].upper() if len(parts) >= 3 else None
+
+def group_domain(group: dict) -> str:
+    """
+    Domain an ItemGroupDef loads into: its Domain attribute when present, else the
+    domain most of its ItemRefs point at, else the last segment of its OID.
+    """
+    if group.get("Domain"):
+        return group["Domain"].upper()
+    domains = [item_domain(ref["ItemOID"]) for ref in group.get("ItemRefs", [])]
+    domains = [d for d in domains if d]
+    if domains:
+        return max(set(domains), key=domains.count)
+    return group["OID"].split(".")[-1].upper()
+
+def table_layouts(odm_json: dict) -> Dict[str, dict]:
+    """
+    One wide table per domain from the ItemGroupDefs and their ItemRefs:
+    {table: {"columns": {column: duckdb type}, "items": {ItemGroupOID: {ItemOID: column}}}}.
+    ItemGroups of the same domain share a table; columns are named after ItemDef Name.
+    """
+    item_defs = {item["OID"]: item for item in odm_json["MetaDataVersion"]["ItemDefs"]}
+    layouts: Dict[str, dict] = {}
+
+    for group in odm_json["MetaDataVersion"]["ItemGroupDefs"]:
+        table = f"raw_{group_domain(group).lower()}"
+        layout = layouts.setdefault(
+            table, {"columns": {col: "VARCHAR" for col in KEY_COLUMNS}, "items": {}}
+        )
+        items = layout["items"].setdefault(group["OID"], {})
+        for ref in group.get("ItemRefs", []):
+            item = item_defs.get(ref["ItemOID"], {})
+            column = (item.get("Name") or ref["ItemOID"].split(".")[-1]).upper()
+            layout["columns"].setdefault(column, DUCKDB_TYPES.get((item.get("DataType") or "").lower(), "VARCHAR"))
+            items[ref["ItemOID"]] = column
+
+    return layouts
+
+# -- Streaming ClinicalData Parse
+def _item_value(elem) -> Optional[str]:
+    """ItemData value: the ODM 2.0 <Value> child, or the ODM 1.3 Value attribute."""
+    if elem.attrib.get("IsNull") == "Yes":
+        return None
+    if "Value" in elem.attrib:
+        return elem.attrib["Value"]
+    value = elem.find("odm:Value", NS)
+    return value.text if value is not None else None
+
+def _audit_timestamp(elem) -> Optional[str]:
+    """Latest AuditRecord DateTimeStamp inside an element (ISO 8601 strings compare in order)."""
+    stamps = [stamp.text for stamp in elem.iter(_tag("DateTimeStamp")) if stamp.text]
+    return max(stamps) if stamps else None
+
+def iter_subject_data(xml_path: Path) -> Iterator[dict]:
+    """
+    Stream ClinicalData one SubjectData at a time.
+
+    Yields {"SubjectKey", "TransactionType", "Records"}, where each record is one
+    ItemGroupData with the KEY_COLUMNS, its latest "AuditDateTimeStamp" and
+    "Items" ({ItemOID: value}). A subject is released as soon as it is yielded,
+    so memory stays flat for exports with millions of ItemData values.
+    """
+    clinical_tag, subject_tag = _tag("ClinicalData"), _tag("SubjectData")
+    event_tag, group_tag, item_tag = _tag("StudyEventData"), _tag("ItemGroupData"), _tag("ItemData")
+    clinical = subject = None
+    event = {}
+
+    for evt, elem in ET.iterparse(xml_path, events=("start", "end")):
+        if evt == "start":
+            if elem.tag == clinical_tag:
+                clinical = elem
+            elif elem.tag == subject_tag:
+                subject = {
+                    "SubjectKey": elem.attrib.get("SubjectKey"),
+                    "TransactionType": elem.attrib.get("TransactionType"),
+                    "Records": [],
+                }
+            elif elem.tag == event_tag:
+                event = {
+                    "StudyEventOID": elem.attrib.get("StudyEventOID"),
+                    "StudyEventRepeatKey": elem.attrib.get("StudyEventRepeatKey"),
+                }
+            continue
+
+        if clinical is None:
+            continue
+        if elem.tag == group_tag:
+            subject["Records"].append({
+                "SubjectKey": subject["SubjectKey"],
+                **event,
+                "ItemGroupOID": elem.attrib.get("ItemGroupOID"),
+                "ItemGroupRepeatKey": elem.attrib.get("ItemGroupRepeatKey"),
+                "TransactionType": elem.attrib.get("TransactionType"),
+                "AuditDateTimeStamp": _audit_timestamp(elem),
+                "Items": {item.attrib["ItemOID"]: _item_value(item) for item in elem.iter(item_tag)},
+            })
+            elem.clear()
+        elif elem.tag == event_tag:
+            event = {}
+            elem.clear()
+        elif elem.tag == subject_tag:
+            yield subject
+            subject = None
+            elem.clear()
+            clinical.remove(elem)
+        elif elem is clinical:
+            clinical.clear()
+            clinical = None
+
+# -- Ingest State
+def load_ingest_state(state_path: Optional[Path]) -> dict:
+    """
+    State of the last ingest: the export's file digest, the table layout digest
+    and a digest per subject (of its records, AuditRecords included).
+    """
+    if state_path is None or not Path(state_path).exists():
+        return {}
+    with open(state_path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+def save_ingest_state(state: dict, state_path: Path):
+    state_path = Path(state_path)
+    state_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = state_path.with_suffix(".tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(state, f, indent=2, sort_keys=True)
+    tmp_path.replace(state_path)
+
+# -- DuckDB Load
+def existing_tables(con: duckdb.DuckDBPyConnection) -> set:
+    rows = con.execute(
+        "SELECT table_name FROM information_schema.tables WHERE table_schema = ?", [RAW_SCHEMA]
+    ).fetchall()
+    return {name for (name,) in rows}
+
+def create_raw_tables(con: duckdb.DuckDBPyConnection, layouts: Dict[str, dict], replace: bool = True):
+    """
+    Create the raw tables in RAW_SCHEMA: empty when replace is set, otherwise keep
+    existing rows and only add tables/columns the layout gained.
+    """
+    con.execute(f"CREATE SCHEMA IF NOT EXISTS {RAW_SCHEMA}")
+    tables = set() if replace else existing_tables(con)
+    for table, layout in layouts.items():
+        if table not in tables:
+            columns = ", ".join(f'"{col}" {sql_type}' for col, sql_type in layout["columns"].items())
+            con.execute(f"CREATE OR REPLACE TABLE {RAW_SCHEMA}.{table} ({columns})")
+            continue
+        present = {
+            name for (name,) in con.execute(
+                "SELECT column_name FROM information_schema.columns WHERE table_schema = ? AND table_name = ?",
+                [RAW_SCHEMA, table],
+            ).fetchall()
+        }
+        for col, sql_type in layout["columns"].items():
+            if col not in present:
+                con.execute(f'ALTER TABLE {RAW_SCHEMA}.{table} ADD COLUMN "{col}" {sql_type}')
+
+def _cast(column: str, sql_type: str, alias: str = "") -> str:
+    """SQL for a text column of a registered batch cast to its raw table type."""
+    ref = f'{alias}"{column}"'
+    return f"TRY_CAST({ref} AS {sql_type})" if sql_type != "VARCHAR" else ref
+
+def cast_failures(con: duckdb.DuckDBPyConnection, relation: str, columns: Dict[str, str]) -> Dict[str, int]:
+    """
+    {column: values} of a registered text batch that are not blank but do not
+    cast to their column type, which TRY_CAST would load as NULL.
+    """
+    typed = [col for col, sql_type in columns.items() if sql_type != "VARCHAR"]
+    if not typed:
+        return {}
+    checks = ", ".join(
+        f'count(*) FILTER (WHERE trim(CAST("{col}" AS VARCHAR)) <> \'\' AND {_cast(col, columns[col])} IS NULL)'
+        for col in typed
+    )
+    counts = con.execute(f"SELECT {checks} FROM {relation}").fetchone()
+    return {col: n for col, n in zip(typed, counts) if n}
+
+def append_batch(con: duckdb.DuckDBPyConnection, table: str, columns: Dict[str, str], rows: list) -> Dict[str, int]:
+    """
+    Bulk-insert a batch of row tuples; values arrive as text and are cast per
+    column type. Returns the values per column that did not cast (see cast_failures).
+    """
+    import pandas as pd
+
+    frame = pd.DataFrame.from_records(rows, columns=list(columns))
+    selects = ", ".join(f'{_cast(col, sql_type)} AS "{col}"' for col, sql_type in columns.items())
+    targets = ", ".join(f'"{col}"' for col in columns)
+    con.register("_raw_batch", frame)
+    try:
+        failures = cast_failures(con, "_raw_batch", columns)
+        con.execute(f"INSERT INTO {RAW_SCHEMA}.{table} ({targets}) SELECT {selects} FROM _raw_batch")
+    finally:
+        con.unregister("_raw_batch")
+    return failures
+
+def delete_rows(con: duckdb.DuckDBPyConnection, table: str, keys: list):
+    """Delete the rows whose ROW_KEY is in keys (NULL repeat keys compare equal)."""
+    import pandas as pd
+
+    frame = pd.DataFrame.from_records(keys, columns=ROW_KEY)
+    match = " AND ".join(f't."{col}" IS NOT DISTINCT FROM k."{col}"' for col in ROW_KEY)
+    con.register("_raw_keys", frame)
+    try:
+        con.execute(f"DELETE FROM {RAW_SCHEMA}.{table} t USING _raw_keys k WHERE {match}")
+    finally:
+        con.unregister("_raw_keys")
+
+def merge_rows(con: duckdb.DuckDBPyConnection, table: str, columns: Dict[str, str], records: list) -> Dict[str, int]:
+    """
+    Apply Update records ({column: text value}): set only the columns a record
+    supplies on the row with its ROW_KEY, or insert it when there is no such row.
+    Returns the values per column that did not cast, as append_batch does.
+    """
+    import pandas as pd
+
+    match = " AND ".join(f't."{col}" IS NOT DISTINCT FROM k."{col}"' for col in ROW_KEY)
+    # One statement pair per set of supplied columns; a delta rarely has more than a few
+    by_columns: Dict[tuple, list] = {}
+    for record in records:
+        by_columns.setdefault(tuple(col for col in columns if col in record), []).append(record)
+
+    failures: Dict[str, int] = {}
+    for supplied, group in by_columns.items():
+        frame = pd.DataFrame.from_records([tuple(r[col] for col in supplied) for r in group], columns=list(supplied))
+        updates = ", ".join(f'"{col}" = {_cast(col, columns[col], "k.")}' for col in supplied if col not in ROW_KEY)
+        targets = ", ".join(f'"{col}"' for col in supplied)
+        selects = ", ".join(_cast(col, columns[col], "k.") for col in supplied)
+        con.register("_raw_merge", frame)
+        try:
+            for col, n in cast_failures(con, "_raw_merge", {col: columns[col] for col in supplied}).items():
+                failures[col] = failures.get(col, 0) + n
+            con.execute(f"UPDATE {RAW_SCHEMA}.{table} AS t SET {updates} FROM _raw_merge k WHERE {match}")
+            con.execute(
+                f"INSERT INTO {RAW_SCHEMA}.{table} ({targets}) SELECT {selects} FROM _raw_merge k "
+                f"WHERE NOT EXISTS (SELECT 1 FROM {RAW_SCHEMA}.{table} t WHERE {match})"
+            )
+        finally:
+            con.unregister("_raw_merge")
+    return failures
+
+def delete_subjects(con: duckdb.DuckDBPyConnection, tables, subjects: list):
+    import pandas as pd
+
+    frame = pd.DataFrame({"SubjectKey": subjects})
+    con.register("_raw_subjects", frame)
+    try:
+        for table in tables:
+            con.execute(
+                f'DELETE FROM {RAW_SCHEMA}.{table} WHERE "SubjectKey" IN (SELECT "SubjectKey" FROM _raw_subjects)'
+            )
+    finally:
+        con.unregister("_raw_subjects")
+
+def write_changes(con: duckdb.DuckDBPyConnection, changes: Dict[str, str]):
+    """Replace CHANGES_TABLE with the subjects this ingest upserted or removed."""
+    import pandas as pd
+
+    con.execute(
+        f'CREATE OR REPLACE TABLE {RAW_SCHEMA}.{CHANGES_TABLE} ("SubjectKey" VARCHAR, "Change" VARCHAR)'
+    )
+    if changes:
+        con.register("_raw_changes", pd.DataFrame(list(changes.items()), columns=["SubjectKey", "Change"]))
+        try:
+            con.execute(f"INSERT INTO {RAW_SCHEMA}.{CHANGES_TABLE} SELECT * FROM _raw_changes")
+        finally:
+            con.unregister("_raw_changes")
+
+def load_clinical_data(
+    xml_path: Path,
+    odm_json: dict,
+    con: duckdb.DuckDBPyConnection,
+    batch_size: int = 50_000,
+    state: Optional[dict] = None,
+) -> dict:
+    """
+    Pivot ClinicalData into the wide raw tables, applying it in batches of
+    batch_size rows.
+
+    Without a state (or when the previous load is unusable) the tables are
+    rebuilt from scratch. With the state of a previous ingest, only subjects
+    whose records changed are applied. Within a load, an Insert (or a record
+    without TransactionType) replaces the row with the same ROW_KEY,
+    Update/Upsert/Context set only the ItemData they carry, and Remove deletes
+    the row (or the whole subject on SubjectData); the result does not depend on
+    batch_size. Returns load statistics; stats["state"] is the state to persist
+    for the next run.
+    """
+    layouts = table_layouts(odm_json)
+    layout_digest = data_digest({table: layout["columns"] for table, layout in layouts.items()})
+    group_tables = {
+        group_oid: (table, items)
+        for table, layout in layouts.items()
+        for group_oid, items in layout["items"].items()
+    }
+
+    state = state or {}
+    incremental = (
+        bool(state.get("subjects"))
+        and state.get("layout") == layout_digest
+        and set(layouts) <= existing_tables(con)
+    )
+    create_raw_tables(con, layouts, replace=not incremental)
+
+    export_digest = file_digest(Path(xml_path))
+    stats = {
+        "mode": "incremental" if incremental else "full",
+        "rows": {table: 0 for table in layouts},
+        "columns": {table: list(layout["columns"]) for table, layout in layouts.items()},
+        "rows_removed": 0,
+        "values_uncast": {},
+        "subjects_changed": 0,
+        "subjects_unchanged": 0,
+        "subjects_removed": 0,
+    }
+
+    if incremental and state.get("export") == export_digest:
+        write_changes(con, {})
+        stats["mode"] = "unchanged"
+        stats["state"] = state
+        return stats
+
+    subjects = dict(state.get("subjects", {})) if incremental else {}
+    changes: Dict[str, str] = {}
+
+    # Pending work per table, keyed by ROW_KEY: {key: (merge, {column: value})}
+    # with the records for a row folded in order, and the keys to remove
+    upserts = {table: {} for table in layouts}
+    removes = {table: set() for table in layouts}
+    # Keys a full load already wrote, which later records must delete first
+    flushed = {table: set() for table in layouts}
+    removed_subjects = []
+    pending = 0
+    skipped_groups = set()
+    unknown_items = 0
+
+    def count_uncast(table: str, failures: Dict[str, int]):
+        for col, n in failures.items():
+            key = f"{table}.{col}"
+            stats["values_uncast"][key] = stats["values_uncast"].get(key, 0) + n
+
+    def flush():
+        if removed_subjects:
+            delete_subjects(con, layouts, removed_subjects)
+            removed_subjects.clear()
+        for table in layouts:
+            pending_rows, keys = upserts[table], removes[table]
+            columns = layouts[table]["columns"]
+            replaced = {key for key, (merge, _) in pending_rows.items() if not merge}
+            stale = keys | replaced
+            if not incremental:
+                stale &= flushed[table]
+                flushed[table].update(pending_rows)
+            if stale:
+                delete_rows(con, table, list(stale))
+            rows = [tuple(values.get(col) for col in columns) for merge, values in pending_rows.values() if not merge]
+            if rows:
+                count_uncast(table, append_batch(con, table, columns, rows))
+            merged = [values for merge, values in pending_rows.values() if merge]
+            if merged:
+                count_uncast(table, merge_rows(con, table, columns, merged))
+            stats["rows"][table] += len(pending_rows)
+            stats["rows_removed"] += len(keys)
+            pending_rows.clear()
+            keys.clear()
+
+    for subject in iter_subject_data(xml_path):
+        subject_key = subject["SubjectKey"]
+
+        if subject["TransactionType"] == "Remove":
+            if subject_key in subjects or not incremental:
+                subjects.pop(subject_key, None)
+                for table in layouts:
+                    upserts[table] = {k: v for k, v in upserts[table].items() if k[0] != subject_key}
+                removed_subjects.append(subject_key)
+                changes[subject_key] = "remove"
+                stats["subjects_removed"] += 1
+            continue
+
+        digest = data_digest(subject["Records"])
+        if subjects.get(subject_key) == digest:
+            stats["subjects_unchanged"] += 1
+            continue
+        subjects[subject_key] = digest
+        changes[subject_key] = "upsert"
+        stats["subjects_changed"] += 1
+
+        for record in subject["Records"]:
+            target = group_tables.get(record["ItemGroupOID"])
+            if target is None:
+                skipped_groups.add(record["ItemGroupOID"])
+                continue
+            table, items = target
+            key = tuple(record[col] for col in ROW_KEY)
+
+            if record["TransactionType"] == "Remove":
+                upserts[table].pop(key, None)
+                removes[table].add(key)
+            else:
+                values = {col: record[col] for col in KEY_COLUMNS}
+                for item_oid, value in record["Items"].items():
+                    column = items.get(item_oid)
+                    if column is None:
+                        unknown_items += 1
+                        continue
+                    values[column] = value
+                merge = record["TransactionType"] in MERGE_TRANSACTIONS
+                previous = upserts[table].get(key)
+                if key in removes[table]:
+                    # The row is gone, so an Update starts a new one
+                    merge = False
+                    removes[table].discard(key)
+                elif merge and previous is not None:
+                    merge, values = previous[0], {**previous[1], **values}
+                upserts[table][key] = (merge, values)
+
+            pending += 1
+            if pending >= batch_size:
+                flush()
+                pending = 0
+    flush()
+    write_changes(con, changes)
+
+    if skipped_groups:
+        print(f"⚠️  ItemGroupData without an ItemGroupDef skipped: {', '.join(sorted(skipped_groups))}")
+    if unknown_items:
+        print(f"⚠️  {unknown_items} ItemData values not referenced by their ItemGroupDef were skipped")
+    if stats["values_uncast"]:
+        uncast = ", ".join(f"{column} ({n})" for column, n in sorted(stats["values_uncast"].items()))
+        print(
+            f"⚠️  {sum(stats['values_uncast'].values())} ItemData values do not match their ItemDef "
+            f"DataType and were loaded as NULL: {uncast}"
+        )
+
+    stats["state"] = {
+        "export": export_digest,
+        "layout": layout_digest,
+        "subjects": subjects,
+    }
+    return stats
+
+# -- dbt Sources
+def write_dbt_sources(tables: Dict[str, list], sources_path: Path):
+    """
+    Declare the loaded raw tables ({table: columns}) and the ingest change list as
+    the dbt source 'odm_raw'; the scaffolder reads the columns back to see what a
+    raw table provides.
+    """
+    sources = {
+        "version": 2,
+        "sources": [{
+            "name": RAW_SCHEMA,
+            "schema": RAW_SCHEMA,
+            "description": "Raw ClinicalData pivoted from the study ODM-XML export",
+            "tables": [
+                {"name": table, "columns": [{"name": column} for column in tables[table]]}
+                for table in sorted(tables)
+            ] + [{
+                "name": CHANGES_TABLE,
+                "description": "Subjects upserted or removed by the last ingest",
+            }],
+        }],
+    }
+    sources_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(sources_path, "w") as f:
+        yaml.safe_dump(sources, f, sort_keys=False)
+
+def raw_sources_path(paths: dict) -> Path:
+    return Path(paths["dbt_models_dir"]).parent / "raw" / "_odm_raw__sources.yml"
+
+def extract_clinical_data(
+    paths: dict,
+    odm_json: Optional[dict] = None,
+    batch_size: int = 50_000,
+    full_refresh: bool = False,
+) -> dict:
+    """
+    Load ClinicalData for a resolved paths.yml into its DuckDB file and declare the
+    dbt sources. When paths.yml sets ingest_state the load is incremental against
+    the previous run (full_refresh rebuilds the tables regardless).
+    """
+    xml_path = Path(paths["odm_xml"])
+    odm_json = odm_json or parse_metadata(xml_path, stream=True)
+    state_path = Path(paths["ingest_state"]) if paths.get("ingest_state") else None
+    state = {} if full_refresh else load_ingest_state(state_path)
+
+    import duckdb
+
+    with duckdb.connect(str(paths["duckdb_path"])) as con:
+        stats = load_clinical_data(xml_path, odm_json, con, batch_size=batch_size, state=state)
+
+    if state_path is not None:
+        save_ingest_state(stats["state"], state_path)
+    write_dbt_sources(stats["columns"], raw_sources_path(paths))
+
+    if stats["mode"] == "unchanged":
+        print(f"✅ ODM export unchanged since the last ingest: {xml_path.name}")
+        return stats
+    for table, rows in stats["rows"].items():
+        print(f"✅ {RAW_SCHEMA}.{table}: {rows} rows {'applied' if stats['mode'] == 'incremental' else 'loaded'}")
+    print(
+        f"   {stats['mode']}: {stats['subjects_changed']} subjects changed, "
+        f"{stats['subjects_unchanged']} unchanged, {stats['subjects_removed']} removed"
+    )
+    return stats
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Stream ODM-XML ClinicalData into wide raw tables in the study DuckDB file."
+    )
+    parser.add_argument("--study", required=True, help="Study folder name")
+    parser.add_argument("--env", default="dev", help="Environment name in paths.yml (e.g., dev)")
+    parser.add_argument("--batch-size", type=int, default=50_000, help="Rows per bulk insert")
+    parser.add_argument(
+        "--full-refresh", action="store_true", help="Rebuild the raw tables instead of applying a delta"
+    )
+    args = parser.parse_args()
+
+    paths = load_paths(study=args.study, env=args.env)
+    extract_clinical_data(paths, batch_size=args.batch_size, full_refresh=args.full_refresh)
+
+
+if __name__ == "__main__":
+    main()
+
+## -- End of Program Code -- ##
@@ -1,8 +1,9 @@
 import argparse
-import json
 from pathlib import Path
+from adapters.odm_json.utils.artifacts import artifact_outputs, save_tree
 from adapters.odm_json.utils.load_paths import load_paths
 from adapters.odm_json.utils.parse_sdtmig_json import extract_sdtm_metadata
+from adapters.odm_json.utils.sdtmig_store import build_store
 
 def main():
     parser = argparse.ArgumentParser(
@@ -12,6 +13,10 @@ def main():
     parser.add_argument("--output", help="Path to output normalized JSON")
     parser.add_argument("--study", type=str, help="Study ID for path resolution")
     parser.add_argument("--env", type=str, help="Environment (e.g. dev, prod)")
+    parser.add_argument(
+        "--store", action="store_true",
+        help="Build the shared indexed SDTMIG store (sdtmig_store in paths.yml, or --output) instead of JSON"
+    )
 
     args = parser.parse_args()
 
@@ -19,21 +24,30 @@ def main():
     if args.study and args.env:
         paths = load_paths(study=args.study, env=args.env)
         input_path = Path(args.input) if args.input else Path(paths["sdtmig_input_json"])
-        output_path = Path(args.output) if args.output else Path(paths["sdtmig_normalized_json"])
+        if args.output:
+            output_paths = [Path(args.output)]
+        elif args.store:
+            output_paths = [Path(paths["sdtmig_store"])]
+        else:
+            output_paths = artifact_outputs(paths, "sdtmig_normalized")
 
 
     elif args.input and args.output:
         input_path = Path(args.input)
-        output_path = Path(args.output)
+        output_paths = [Path(args.output)]
     else:
         parser.error("Either --input and --output or --study and --env must be specified.")
 
-    metadata = extract_sdtm_metadata(input_path)
+    if args.store:
+        build_store(input_path, output_paths[0])
+        return
 
-    with open(output_path, "w", encoding="utf-8") as f:
-        json.dump(metadata, f, indent=2)
+    metadata = extract_sdtm_metadata(input_path)
 
-    print(f"✅ SDTM metadata extracted and saved to: {output_path}")
+    # .msgpack outputs are written in binary, anything else as JSON
+    for output_path in output_paths:
+        save_tree(metadata, output_path)
+        print(f"✅ SDTM metadata extracted and saved to: {output_path}")
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,193 @@
+"""
+Columnar engine for the ODM ↔ SDTMIG match.
+
+Produces the same rows as match_odm_to_sdtm.match_odm_to_sdtm_all(), but as
+set operations in DuckDB: ItemDefs, aliases and the flattened SDTMIG lookup are
+loaded as tables once, the parse_aliases() rules become a grouped "last
+assignment wins" aggregation, and the OID (domain, variable) match is a join.
+"""
+from typing import Dict, Optional
+
+import duckdb
+import pandas as pd
+
+from adapters.odm_json.utils.artifacts import MAPPING_SCHEMA
+
+MATCH_COLUMNS = list(MAPPING_SCHEMA)
+
+SDTM_COLUMNS = [
+    "SDTM_Domain", "SDTM_Variable", "SDTM_Label", "Ordinal", "Core", "Role",
+    "Datatype", "Description", "CodeList", "SDTM_Path",
+]
+
+MATCH_SQL = """
+WITH keyed AS (
+    -- ODM.<domain>.<var> OIDs; shorter OIDs are dropped and the last ItemDef per key wins
+    SELECT
+        split_part(ItemOID, '.', 2) AS ODM_Domain,
+        split_part(ItemOID, '.', 3) AS ODM_Variable,
+        max(_item) AS _item,
+        arg_max(ItemOID, _item) AS ItemOID,
+        arg_max(Raw_Input_Name, _item) AS Raw_Input_Name
+    FROM odm_items
+    WHERE length(ItemOID) - length(replace(ItemOID, '.', '')) >= 2
+    GROUP BY 1, 2
+),
+classified AS (
+    SELECT
+        _item, _seq, context, name,
+        context = 'DERIVATION_RULE' AS is_deriv,
+        starts_with(context, 'SUPPQUAL') AS is_supp,
+        context = 'NOT_SUBMITTED' AS is_not_sub,
+        CASE
+            WHEN NOT starts_with(context, 'SUPPQUAL') THEN NULL
+            WHEN contains(context, 'QNAM') THEN 'QNAM'
+            WHEN contains(context, 'QLABEL') THEN 'QLABEL'
+            WHEN contains(context, 'IDVARVAL') THEN 'IDVARVAL'
+            WHEN contains(context, 'IDVAR') THEN 'IDVAR'
+        END AS supp_slot
+    FROM odm_aliases
+),
+resolved AS (
+    -- parse_aliases() applies aliases in order; the last one assigning a field wins
+    SELECT
+        _item,
+        arg_max(CASE WHEN is_deriv THEN 'Derived' WHEN is_supp THEN 'SUPPQUAL' ELSE 'Not_Submitted' END, _seq)
+            FILTER (WHERE is_deriv OR is_supp OR is_not_sub) AS Mapping_Type,
+        arg_max(CASE WHEN is_deriv THEN 'Alias.Derivation' WHEN is_supp THEN 'Alias.SUPP' ELSE 'Alias.NotSubmitted' END, _seq)
+            FILTER (WHERE is_deriv OR is_supp OR is_not_sub) AS Match_Type,
+        arg_max(name, _seq) FILTER (WHERE is_deriv) AS Derived_Target,
+        arg_max(context, _seq) FILTER (WHERE is_supp OR is_not_sub) AS Alias_Context,
+        arg_max(name, _seq) FILTER (WHERE is_supp OR is_not_sub) AS Alias_Name,
+        arg_max(name, _seq) FILTER (WHERE supp_slot = 'QNAM') AS QNAM,
+        arg_max(name, _seq) FILTER (WHERE supp_slot = 'QLABEL') AS QLABEL,
+        arg_max(name, _seq) FILTER (WHERE supp_slot = 'IDVAR') AS IDVAR,
+        arg_max(name, _seq) FILTER (WHERE supp_slot = 'IDVARVAL') AS IDVARVAL,
+        bool_or(is_not_sub) AS Not_Submitted
+    FROM classified
+    GROUP BY _item
+),
+odm AS (
+    SELECT k.*, r.* EXCLUDE (_item)
+    FROM keyed k
+    LEFT JOIN resolved r USING (_item)
+),
+pass1 AS (
+    -- Every SDTMIG variable of a domain the ODM references, matched or not
+    SELECT
+        coalesce(o.ItemOID, '') AS ItemOID,
+        coalesce(o.ODM_Variable, '') AS ODM_Variable,
+        coalesce(o.ODM_Domain, s._domain) AS ODM_Domain,
+        coalesce(o.Raw_Input_Name, '') AS Raw_Input_Name,
+        coalesce(o.Alias_Context, '') AS Alias_Context,
+        coalesce(o.Alias_Name, '') AS Alias_Name,
+        coalesce(o.QLABEL, '') AS Alias_Label,
+        CASE WHEN o._item IS NULL THEN 'Unmatched' ELSE coalesce(o.Mapping_Type, 'Direct') END AS Mapping_Type,
+        CASE WHEN o._item IS NULL THEN 'Missing' ELSE coalesce(o.Match_Type, 'OID') END AS Match_Type,
+        coalesce(o.Derived_Target, '') AS Derived_Target,
+        s.SDTM_Domain, s.SDTM_Variable, s.SDTM_Label, s.Ordinal, s.Core, s.Role,
+        s.Datatype, s.Description, s.CodeList, s.SDTM_Path,
+        coalesce(o.QNAM, '') AS QNAM,
+        coalesce(o.QLABEL, '') AS QLABEL,
+        coalesce(o.IDVAR, '') AS IDVAR,
+        coalesce(o.IDVARVAL, '') AS IDVARVAL,
+        coalesce(o.Not_Submitted, false) AS Not_Submitted,
+        1 AS _pass, s._pos AS _order
+    FROM sdtm_lookup s
+    LEFT JOIN odm o ON s._domain = o.ODM_Domain AND s._var = o.ODM_Variable
+    WHERE s._domain IN (SELECT ODM_Domain FROM keyed)
+),
+pass2 AS (
+    -- ODM items outside the SDTMIG catalogue that resolve to SUPPQUAL
+    SELECT
+        o.ItemOID, o.ODM_Variable, o.ODM_Domain, o.Raw_Input_Name,
+        coalesce(o.Alias_Context, '') AS Alias_Context,
+        coalesce(o.Alias_Name, '') AS Alias_Name,
+        coalesce(o.QLABEL, '') AS Alias_Label,
+        'SUPPQUAL' AS Mapping_Type,
+        'Alias.SUPP' AS Match_Type,
+        '' AS Derived_Target,
+        'SUPP' || o.ODM_Domain AS SDTM_Domain,
+        'QVAL' AS SDTM_Variable,
+        'Qualifier Value' AS SDTM_Label,
+        '' AS Ordinal, '' AS Core, '' AS Role, '' AS Datatype,
+        '' AS Description, '' AS CodeList, '' AS SDTM_Path,
+        coalesce(o.QNAM, '') AS QNAM,
+        coalesce(o.QLABEL, '') AS QLABEL,
+        coalesce(o.IDVAR, '') AS IDVAR,
+        coalesce(o.IDVARVAL, '') AS IDVARVAL,
+        coalesce(o.Not_Submitted, false) AS Not_Submitted,
+        2 AS _pass, o._item AS _order
+    FROM odm o
+    WHERE o.Mapping_Type = 'SUPPQUAL'
+      AND NOT EXISTS (
+          SELECT 1 FROM sdtm_lookup s WHERE s._domain = o.ODM_Domain AND s._var = o.ODM_Variable
+      )
+)
+SELECT * EXCLUDE (_pass, _order)
+FROM (SELECT * FROM pass1 UNION ALL BY NAME SELECT * FROM pass2)
+ORDER BY _pass, _order
+"""
+
+
+def odm_tables(odm_json: Dict):
+    """(items, aliases) DataFrames from parsed ODM ItemDefs; _item is the ItemDef position."""
+    item_defs = odm_json["MetaDataVersion"]["ItemDefs"]
+    items = pd.DataFrame({
+        "_item": range(len(item_defs)),
+        "ItemOID": [item["OID"] for item in item_defs],
+        "Raw_Input_Name": [(item.get("Name") or "").upper() for item in item_defs],
+    })
+    aliases = pd.DataFrame.from_records(
+        [
+            (pos, seq, alias.get("Context", "") or "", alias.get("Name", ""))
+            for pos, item in enumerate(item_defs)
+            for seq, alias in enumerate(item.get("Aliases", []))
+        ],
+        columns=["_item", "_seq", "context", "name"],
+    )
+    return items, aliases
+
+
+def sdtm_table(sdtm_lookup: Dict) -> pd.DataFrame:
+    """The flattened SDTMIG lookup as a table, keyed by its (domain, variable) tuples."""
+    frame = pd.DataFrame.from_records(list(sdtm_lookup.values()), columns=SDTM_COLUMNS)
+    frame["_domain"] = [domain for domain, _ in sdtm_lookup]
+    frame["_var"] = [var for _, var in sdtm_lookup]
+    frame["_pos"] = range(len(frame))
+    return frame
+
+
+def match_odm_to_sdtm_columnar(
+    odm_json: Dict, sdtm_lookup: Dict, con: Optional[duckdb.DuckDBPyConnection] = None
+) -> pd.DataFrame:
+    """
+    Columnar equivalent of match_odm_to_sdtm_all(), returned as a DataFrame with
+    MATCH_COLUMNS. Pass 1 rows follow SDTMIG order, pass 2 (SUPPQUAL-only ODM
+    items) follows ItemDef order.
+    """
+    items, aliases = odm_tables(odm_json)
+    sdtm = sdtm_table(sdtm_lookup)
+
+    own_con = con is None
+    con = con or duckdb.connect()
+    try:
+        con.register("odm_items", items)
+        con.register("odm_aliases", aliases)
+        con.register("sdtm_lookup", sdtm)
+        result = con.execute(MATCH_SQL).df()
+    finally:
+        for view in ("odm_items", "odm_aliases", "sdtm_lookup"):
+            con.unregister(view)
+        if own_con:
+            con.close()
+
+    result["Not_Submitted"] = result["Not_Submitted"].astype(bool)
+    return result[MATCH_COLUMNS]
+
+
+def save_frame_to_csv(df: pd.DataFrame, output_path: str):
+    """Write the match table in the same CSV dialect as save_to_csv()."""
+    df.to_csv(output_path, index=False, lineterminator="\r\n")
+
+## -- End of Program Code -- ##
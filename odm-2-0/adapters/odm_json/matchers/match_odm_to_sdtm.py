@@ -1,52 +1,69 @@
-import json
 import csv
 from pathlib import Path
 from typing import Dict, List, Tuple
 
+from adapters.odm_json.utils.artifacts import artifact_outputs, artifact_paths, load_tree, save_mapping
 from adapters.odm_json.utils.load_paths import load_paths
-
-def load_json(path: str) -> dict:
-    with open(path) as f:
-        return json.load(f)
-
-def flatten_sdtm_metadata(sdtm_json: Dict) -> Dict:
+from adapters.odm_json.utils.metadata_model import (
+    ItemDef,
+    MappingRow,
+    SdtmTarget,
+    intern,
+    load_study_metadata,
+    sdtm_metadata,
+    study_metadata,
+)
+from adapters.odm_json.utils.sdtmig_store import open_store
+
+def flatten_sdtm_metadata(sdtm_json: Dict) -> Dict[Tuple[str, str], SdtmTarget]:
+    """(domain, variable) -> SdtmTarget, the SDTM columns every mapping row of that variable shares."""
     lookup = {}
-    for domain, domain_data in sdtm_json.items():
+    for domain, domain_data in sdtm_metadata(sdtm_json).items():
         for var, meta in domain_data.get("variables", {}).items():
-            lookup[(domain, var)] = {
-                "SDTM_Domain": domain,
-                "SDTM_Variable": var,
-                "SDTM_Label": meta.get("label", ""),
-                "Ordinal": meta.get("ordinal", ""),
-                "Core": meta.get("core", ""),
-                "Role": meta.get("role", ""),
-                "Datatype": meta.get("datatype", ""),
-                "Description": meta.get("description", ""),
-                "CodeList": meta.get("codelist", ""),
-                "SDTM_Path": meta.get("sdtm_path", "")
-            }
+            lookup[(domain, var)] = SdtmTarget(
+                domain, var, meta.label, meta.ordinal, meta.core, meta.role,
+                meta.datatype, meta.description, meta.codelist, meta.sdtm_path,
+            )
     return lookup
 
-def parse_odm_items(odm_json: Dict) -> Dict[Tuple[str, str], Dict]:
-    item_defs = odm_json["MetaDataVersion"]["ItemDefs"]
+def parse_odm_items(odm_json: Dict) -> Dict[Tuple[str, str], ItemDef]:
+    """ItemDefs keyed by the (domain, variable) of their <prefix>.<domain>.<var> OID."""
     results = {}
-    for item in item_defs:
-        oid = item["OID"]
-        name = item.get("Name", "").upper()
-        aliases = item.get("Aliases", [])
-        parts = oid.split(".")
+    for item in study_metadata(odm_json).MetaDataVersion.ItemDefs:
+        parts = item.OID.split(".")
         if len(parts) < 3:
             continue
-        domain, var = parts[1], parts[2]
-        results[(domain, var)] = {
-            "ItemOID": oid,
-            "ODM_Variable": var,
-            "ODM_Domain": domain,
-            "Aliases": aliases,
-            "Raw_Input_Name": name
-        }
+        results[(intern(parts[1]), intern(parts[2]))] = item
     return results
 
+def dropped_item_oids(odm_json: Dict) -> List[str]:
+    """ItemDef OIDs parse_odm_items() skips because they are not <prefix>.<domain>.<var>."""
+    return [
+        item["OID"] for item in odm_json["MetaDataVersion"]["ItemDefs"] if len(item["OID"].split(".")) < 3
+    ]
+
+def report_dropped_items(odm_json: Dict) -> List[str]:
+    dropped = dropped_item_oids(odm_json)
+    if dropped:
+        shown = ", ".join(dropped[:10]) + (", ..." if len(dropped) > 10 else "")
+        print(f"⚠️  {len(dropped)} ItemDef(s) not matched by OID (expected <prefix>.<domain>.<var>): {shown}")
+    return dropped
+
+def referenced_domains(odm_json: Dict) -> set:
+    """Domains named by the ItemDef OIDs (ODM.<domain>.<var>) of a study."""
+    return {domain for (domain, _) in parse_odm_items(odm_json)}
+
+def load_sdtm_metadata(paths: Dict, odm_json: Dict) -> Dict:
+    """
+    Normalized SDTMIG metadata for the domains the study references, read from the
+    shared indexed store when `sdtmig_store` is configured, else the normalized artifact.
+    """
+    store_path = paths.get("sdtmig_store")
+    if store_path:
+        store = open_store(Path(paths["sdtmig_input_json"]), Path(store_path))
+        return store.load_domains(referenced_domains(odm_json))
+    return sdtm_metadata(load_tree(artifact_paths(paths)["sdtmig_normalized"]))
+
 def parse_aliases(aliases: List[Dict]) -> Dict:
     result = {
         "Alias_Context": "",
@@ -76,10 +93,10 @@ def parse_aliases(aliases: List[Dict]) -> Dict:
             elif "QLABEL" in context:
                 result["QLABEL"] = name
                 result["Alias_Label"] = name
-            elif "IDVAR" in context:
-                result["IDVAR"] = name
             elif "IDVARVAL" in context:
                 result["IDVARVAL"] = name
+            elif "IDVAR" in context:
+                result["IDVAR"] = name
             result["Alias_Context"] = context
             result["Alias_Name"] = name
         elif context == "NOT_SUBMITTED":
@@ -90,7 +107,7 @@ def parse_aliases(aliases: List[Dict]) -> Dict:
             result["Not_Submitted"] = True
     return result
 
-def match_odm_to_sdtm_all(odm_json: Dict, sdtm_lookup: Dict) -> List[Dict]:
+def match_odm_to_sdtm_all(odm_json: Dict, sdtm_lookup: Dict) -> List[MappingRow]:
     odm_vars = parse_odm_items(odm_json)
     odm_domains = set(domain for (domain, _) in odm_vars.keys())
 
@@ -102,106 +119,91 @@ def match_odm_to_sdtm_all(odm_json: Dict, sdtm_lookup: Dict) -> List[Dict]:
 	# Pass 1: matched or unmatched SDTMIG vars
     for key in all_keys:
         domain, var = key
-        match = filtered_sdtm_lookup.get(key, {})
-        odm_info = odm_vars.get(key)
-
-        alias_info = {}
-        if odm_info:
-            alias_info = parse_aliases(odm_info.get("Aliases", []))
-
-        results.append({
-            "ItemOID": odm_info["ItemOID"] if odm_info else "",
-            "ODM_Variable": odm_info["ODM_Variable"] if odm_info else "",
-            "ODM_Domain": odm_info["ODM_Domain"] if odm_info else domain,
-            "Raw_Input_Name": odm_info.get("Raw_Input_Name", "") if odm_info else "",
-            "Alias_Context": alias_info.get("Alias_Context", ""),
-            "Alias_Name": alias_info.get("Alias_Name", ""),
-            "Alias_Label": alias_info.get("Alias_Label", ""),
-            "Mapping_Type": alias_info.get("Mapping_Type", "Unmatched") if not odm_info else alias_info.get("Mapping_Type", "Direct"),
-            "Match_Type": alias_info.get("Match_Type", "Missing") if not odm_info else alias_info.get("Match_Type", "OID"),
-            "Derived_Target": alias_info.get("Derived_Target", ""),
-            "SDTM_Domain": match.get("SDTM_Domain", domain),
-            "SDTM_Variable": match.get("SDTM_Variable", var),
-            "SDTM_Label": match.get("SDTM_Label", ""),
-            "Ordinal": match.get("Ordinal", ""),
-            "Core": match.get("Core", ""),
-            "Role": match.get("Role", ""),
-            "Datatype": match.get("Datatype", ""),
-            "Description": match.get("Description", ""),
-            "CodeList": match.get("CodeList", ""),
-            "SDTM_Path": match.get("SDTM_Path", ""),
-            "QNAM": alias_info.get("QNAM", ""),
-            "QLABEL": alias_info.get("QLABEL", ""),
-            "IDVAR": alias_info.get("IDVAR", ""),
-            "IDVARVAL": alias_info.get("IDVARVAL", ""),
-            "Not_Submitted": alias_info.get("Not_Submitted", False)
-        })
+        target = filtered_sdtm_lookup[key]
+        item = odm_vars.get(key)
+
+        if item is None:
+            results.append(MappingRow(
+                "", "", domain, "", "", "", "", "Unmatched", "Missing", "",
+                *target,
+                "", "", "", "", False,
+            ))
+            continue
+
+        alias_info = parse_aliases(item.Aliases)
+        results.append(MappingRow(
+            item.OID, var, domain, (item.Name or "").upper(),
+            alias_info["Alias_Context"], alias_info["Alias_Name"], alias_info["Alias_Label"],
+            alias_info["Mapping_Type"], alias_info["Match_Type"], alias_info["Derived_Target"],
+            *target,
+            alias_info["QNAM"], alias_info["QLABEL"], alias_info["IDVAR"], alias_info["IDVARVAL"],
+            alias_info["Not_Submitted"],
+        ))
 
     # Pass 2: include unmatched ODM variables that map to SUPP
-    for key, odm_info in odm_vars.items():
+    for key, item in odm_vars.items():
         if key in all_keys:
             continue # already processed above
-        alias_info = parse_aliases(odm_info.get("Aliases", []))
-        if alias_info.get("Mapping_Type") == "SUPPQUAL":
-            results.append({
-                "ItemOID": odm_info["ItemOID"],
-                "ODM_Variable": odm_info["ODM_Variable"],
-                "ODM_Domain": odm_info["ODM_Domain"],
-                "Raw_Input_Name": odm_info.get("Raw_Input_Name", ""),
-                "Alias_Context": alias_info.get("Alias_Context", ""),
-                "Alias_Name": alias_info.get("Alias_Name", ""),
-                "Alias_Label": alias_info.get("Alias_Label", ""),
-                "Mapping_Type": "SUPPQUAL",
-                "Match_Type": "Alias.SUPP",
-                "Derived_Target": "",
-                "SDTM_Domain": f"SUPP{odm_info['ODM_Domain']}",
-                "SDTM_Variable": "QVAL",
-                "SDTM_Label": "Qualifier Value",
-                "Ordinal": "",
-                "Core": "",
-                "Role": "",
-                "Datatype": "",
-                "Description": "",
-                "CodeList": "",
-                "SDTM_Path": "",
-                "QNAM": alias_info.get("QNAM", ""),
-                "QLABEL": alias_info.get("QLABEL", ""),
-                "IDVAR": alias_info.get("IDVAR", ""),
-                "IDVARVAL": alias_info.get("IDVARVAL", ""),
-                "Not_Submitted": alias_info.get("Not_Submitted", False)
-            })
+        alias_info = parse_aliases(item.Aliases)
+        if alias_info["Mapping_Type"] == "SUPPQUAL":
+            domain, var = key
+            results.append(MappingRow(
+                item.OID, var, domain, (item.Name or "").upper(),
+                alias_info["Alias_Context"], alias_info["Alias_Name"], alias_info["Alias_Label"],
+                "SUPPQUAL", "Alias.SUPP", "",
+                *SdtmTarget(f"SUPP{domain}", "QVAL", "Qualifier Value"),
+                alias_info["QNAM"], alias_info["QLABEL"], alias_info["IDVAR"], alias_info["IDVARVAL"],
+                alias_info["Not_Submitted"],
+            ))
 
     return results
 
-def save_to_csv(data: List[Dict], output_path: str):
+def save_to_csv(data: List[MappingRow], output_path: str):
     with open(output_path, mode='w', newline='') as f:
-        writer = csv.DictWriter(f, fieldnames=data[0].keys())
-        writer.writeheader()
+        writer = csv.writer(f)
+        writer.writerow(MappingRow._fields)
         writer.writerows(data)
 
-def main(study: str, env: str):
+def main(study: str, env: str, engine: str = "python", parquet: bool = False):
     paths = load_paths(study, env)
 
-    odm_path = paths["crf_metadata_json"]
-    sdtm_path = paths["sdtmig_normalized_json"]
-    output_csv = paths["match_output_csv"]
+    odm_path = artifact_paths(paths)["crf_metadata"]
+    outputs = artifact_outputs(paths, "match_output")
 
-    odm_json = load_json(odm_path)
-    sdtm_json = load_json(sdtm_path)
+    odm_json = load_study_metadata(odm_path)
+    report_dropped_items(odm_json)
+    sdtm_json = load_sdtm_metadata(paths, odm_json)
     sdtm_lookup = flatten_sdtm_metadata(sdtm_json)
 
-    matched = match_odm_to_sdtm_all(odm_json, sdtm_lookup)
-    save_to_csv(matched, output_csv)
+    if engine == "columnar" or parquet:
+        # DuckDB-backed engine; only imported when asked for
+        from adapters.odm_json.matchers.columnar_matcher import match_odm_to_sdtm_columnar
+        matched = match_odm_to_sdtm_columnar(odm_json, sdtm_lookup)
+        if parquet:
+            outputs.append(Path(paths["match_output_csv"]).with_suffix(".parquet"))
+    else:
+        matched = match_odm_to_sdtm_all(odm_json, sdtm_lookup)
 
-    print(f"✅ Match results written to: {output_csv}")
+    # .parquet outputs are written typed, anything else as CSV
+    for output_path in dict.fromkeys(outputs):
+        save_mapping(matched, output_path)
+        print(f"✅ Match results written to: {output_path}")
 
 if __name__ == "__main__":
     import argparse
     parser = argparse.ArgumentParser()
     parser.add_argument("--study", required=True, help="Study name (e.g., VEXIN-03)")
     parser.add_argument("--env", default="dev", help="Environment profile")
+    parser.add_argument(
+        "--engine", choices=["python", "columnar"], default="python",
+        help="Match engine: per-item Python dicts or the DuckDB columnar engine"
+    )
+    parser.add_argument(
+        "--parquet", action="store_true",
+        help="Also write the match table as Parquet next to the CSV (uses the columnar engine)"
+    )
     args = parser.parse_args()
-    main(args.study, args.env)
+    main(args.study, args.env, engine=args.engine, parquet=args.parquet)
 
 
 ## -- End Program Code -- ##
\ No newline at end of file
@@ -0,0 +1,312 @@
+"""
+Second-pass candidate suggestions for ODM items the OID matcher cannot place.
+
+match_odm_to_sdtm_all() only recognises ItemDefs named ODM.<domain>.<var>
+after an SDTMIG variable. This module ranks SDTMIG variables for every other
+item by text similarity instead. The SDTMIG catalogue (variable names, labels
+and descriptions) is turned into an inverted TF-IDF index of words and name
+character trigrams once per IG version and process. Each unmatched item is
+queried by its Name, alias names and Question text, and the queries are scored
+in chunks with numpy over the posting lists. A pairwise Python loop over items
+and variables is never run.
+"""
+import argparse
+import csv
+import math
+import os
+import re
+from collections import Counter
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from adapters.odm_json.matchers.match_odm_to_sdtm import parse_aliases
+from adapters.odm_json.utils.artifacts import artifact_paths, load_mapping, load_tree
+from adapters.odm_json.utils.load_paths import load_paths
+from adapters.odm_json.utils.lru_cache import LRUCache
+from adapters.odm_json.utils.metadata_model import load_study_metadata, sdtm_metadata
+
+TOKEN_RE = re.compile(r"[A-Za-z0-9]+")
+STOP_WORDS = frozenset(
+    {"a", "an", "and", "as", "at", "be", "by", "for", "from", "if", "in", "is", "it",
+     "of", "on", "or", "that", "the", "this", "to", "was", "when", "which", "with"}
+)
+NGRAM = 3
+
+# Weight of each field's terms in a document or query vector
+NAME_WEIGHT = 3.0
+LABEL_WEIGHT = 2.0
+DESCRIPTION_WEIGHT = 1.0
+QUESTION_WEIGHT = 2.0
+
+# Score multiplier for candidates in the domain named by the item's OID
+DOMAIN_BOOST = 0.5
+MIN_SCORE = 0.05
+DEFAULT_TOP_K = 5
+
+# Score matrix cells per chunk of queries (float64: 8 bytes each)
+CHUNK_CELLS = 2_000_000
+
+# Alias contexts whose Name is not a variable name
+NON_NAME_ALIASES = {"DEFAULT_VALUE"}
+
+SUGGESTION_COLUMNS = [
+    "ItemOID", "ODM_Name", "ODM_Domain", "Reason", "Rank",
+    "SDTM_Domain", "SDTM_Variable", "SDTM_Label", "Score",
+]
+
+# IG source stamp -> CandidateIndex, shared by every caller in the process
+_INDEXES = LRUCache("candidate_indexes", max_entries=4)
+
+
+# -- Terms
+def words(text: Optional[str]) -> List[str]:
+    return [w for w in TOKEN_RE.findall((text or "").lower()) if w not in STOP_WORDS]
+
+def name_terms(name: str, weight: float) -> Counter:
+    """Whole-name, word and character-trigram terms of a variable-like name (RACE_WHITE, BRTHDTC)."""
+    terms = Counter()
+    name = name.strip().upper()
+    if not name:
+        return terms
+    terms[f"n:{name}"] += weight
+    for word in words(name.replace("_", " ")):
+        terms[f"w:{word}"] += weight / 2
+    padded = f"^{name}$"
+    for i in range(len(padded) - NGRAM + 1):
+        terms[f"g:{padded[i:i + NGRAM]}"] += weight / len(padded)
+    return terms
+
+def text_terms(text: Optional[str], weight: float) -> Counter:
+    terms = Counter()
+    for word in words(text):
+        terms[f"w:{word}"] += weight
+    return terms
+
+
+# -- Index
+class CandidateIndex:
+    """
+    Inverted TF-IDF index over the SDTMIG variables: postings are stored per
+    term (CSC layout) with L2-normalized document weights, so a query's cosine
+    score against every variable is a scatter-add over its terms' postings.
+    """
+
+    def __init__(self, sdtm_json: Dict[str, dict]):
+        self.variables: List[Tuple[str, str, str]] = []
+        documents = []
+        for domain, domain_data in sdtm_json.items():
+            for var, meta in domain_data.get("variables", {}).items():
+                self.variables.append((domain, var, meta.get("label") or ""))
+                terms = name_terms(var, NAME_WEIGHT)
+                terms.update(text_terms(meta.get("label"), LABEL_WEIGHT))
+                terms.update(text_terms(meta.get("description"), DESCRIPTION_WEIGHT))
+                documents.append(terms)
+
+        self.vocabulary: Dict[str, int] = {}
+        doc_ids, term_ids, weights = [], [], []
+        for doc_id, terms in enumerate(documents):
+            for term, weight in terms.items():
+                doc_ids.append(doc_id)
+                term_ids.append(self.vocabulary.setdefault(term, len(self.vocabulary)))
+                weights.append(weight)
+
+        doc_ids = np.asarray(doc_ids, dtype=np.int64)
+        term_ids = np.asarray(term_ids, dtype=np.int64)
+        weights = np.asarray(weights, dtype=np.float64)
+        n_docs, n_terms = len(documents), len(self.vocabulary)
+
+        df = np.bincount(term_ids, minlength=n_terms)
+        self.idf = np.log((1 + n_docs) / (1 + df)) + 1.0
+        weights *= self.idf[term_ids]
+        norms = np.sqrt(np.bincount(doc_ids, weights=weights ** 2, minlength=n_docs))
+        weights /= norms[doc_ids]
+
+        order = np.argsort(term_ids, kind="stable")
+        self.post_docs = doc_ids[order]
+        self.post_weights = weights[order]
+        self.term_indptr = np.concatenate(([0], np.cumsum(df)))
+
+        domains = sorted({domain for domain, _, _ in self.variables})
+        self.domain_codes = {domain: code for code, domain in enumerate(domains)}
+        self.doc_domains = np.asarray([self.domain_codes[d] for d, _, _ in self.variables], dtype=np.int64)
+
+    def __len__(self) -> int:
+        return len(self.variables)
+
+    def vectorize(self, terms: Counter) -> Tuple[np.ndarray, np.ndarray]:
+        """(term ids, L2-normalized TF-IDF weights) of a query; unknown terms are dropped."""
+        known = [(self.vocabulary[t], w) for t, w in terms.items() if t in self.vocabulary]
+        if not known:
+            return np.empty(0, dtype=np.int64), np.empty(0)
+        ids = np.fromiter((t for t, _ in known), dtype=np.int64, count=len(known))
+        weights = np.fromiter((w for _, w in known), dtype=np.float64, count=len(known)) * self.idf[ids]
+        return ids, weights / math.sqrt(float(weights @ weights))
+
+    def score(self, queries: List[Counter], domains: List[Optional[str]]) -> np.ndarray:
+        """Cosine scores, shape (len(queries), len(self)), boosted for the query's own domain."""
+        n_queries, n_docs = len(queries), len(self.variables)
+        vectors = [self.vectorize(terms) for terms in queries]
+        q_ids = np.repeat(np.arange(n_queries), [len(ids) for ids, _ in vectors])
+        t_ids = np.concatenate([ids for ids, _ in vectors]) if vectors else np.empty(0, dtype=np.int64)
+        q_weights = np.concatenate([w for _, w in vectors]) if vectors else np.empty(0)
+
+        # Expand every (query, term) pair to that term's postings
+        starts = self.term_indptr[t_ids]
+        lengths = self.term_indptr[t_ids + 1] - starts
+        pair = np.repeat(np.arange(len(t_ids)), lengths)
+        offsets = np.arange(int(lengths.sum())) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+        postings = starts[pair] + offsets
+
+        scores = np.bincount(
+            q_ids[pair] * n_docs + self.post_docs[postings],
+            weights=q_weights[pair] * self.post_weights[postings],
+            minlength=n_queries * n_docs,
+        ).reshape(n_queries, n_docs)
+
+        q_domains = np.asarray([self.domain_codes.get(d, -1) for d in domains], dtype=np.int64)
+        scores *= 1.0 + DOMAIN_BOOST * (self.doc_domains[None, :] == q_domains[:, None])
+        return scores
+
+    def top_k(self, queries: List[Counter], domains: List[Optional[str]], k: int = DEFAULT_TOP_K):
+        """Yield [(variable index, score), ...] best first for each query, scored in chunks."""
+        k = min(k, len(self.variables))
+        chunk = max(1, CHUNK_CELLS // max(1, len(self.variables)))
+        for start in range(0, len(queries), chunk):
+            scores = self.score(queries[start:start + chunk], domains[start:start + chunk])
+            best = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+            best_scores = np.take_along_axis(scores, best, axis=1)
+            order = np.argsort(-best_scores, axis=1, kind="stable")
+            best = np.take_along_axis(best, order, axis=1)
+            best_scores = np.take_along_axis(best_scores, order, axis=1)
+            for row, row_scores in zip(best.tolist(), best_scores.tolist()):
+                yield [(i, s) for i, s in zip(row, row_scores) if s >= MIN_SCORE]
+
+
+def load_full_sdtmig(paths: dict) -> Dict[str, dict]:
+    """Every SDTMIG domain, from the shared store when configured, else the normalized artifact."""
+    if paths.get("sdtmig_store"):
+        from adapters.odm_json.utils.sdtmig_store import open_store
+
+        return open_store(Path(paths["sdtmig_input_json"]), Path(paths["sdtmig_store"])).load_domains()
+    return sdtm_metadata(load_tree(artifact_paths(paths)["sdtmig_normalized"]))
+
+def candidate_index(paths: dict, sdtm_json: Optional[Dict[str, dict]] = None) -> CandidateIndex:
+    """The index for the study's IG version, built on first use and kept for the process."""
+    source = Path(paths["sdtmig_input_json"]).resolve()
+    stat = os.stat(source)
+    key = (str(source), stat.st_size, stat.st_mtime_ns)
+    return _INDEXES.get_or_load(
+        key, lambda: CandidateIndex(sdtm_json if sdtm_json is not None else load_full_sdtmig(paths))
+    )
+
+
+# -- Queries
+def item_query(item: dict) -> Counter:
+    """Terms of an ItemDef: Name, the OID's last part, alias names and Question text."""
+    terms = name_terms(item.get("Name") or "", NAME_WEIGHT)
+    oid_name = (item.get("OID") or "").rsplit(".", 1)[-1]
+    if oid_name.upper() != (item.get("Name") or "").upper():
+        terms.update(name_terms(oid_name, NAME_WEIGHT))
+    for alias in item.get("Aliases", []):
+        if alias.get("Context") not in NON_NAME_ALIASES and alias.get("Name"):
+            terms.update(name_terms(alias["Name"], NAME_WEIGHT))
+    terms.update(text_terms(item.get("Question"), QUESTION_WEIGHT))
+    return terms
+
+def matched_item_oids(matched) -> set:
+    """ItemOIDs placed by the matcher, from match rows or a mapping DataFrame."""
+    oids = matched["ItemOID"] if hasattr(matched, "columns") else (row.ItemOID for row in matched)
+    return {oid for oid in oids if isinstance(oid, str) and oid}
+
+def unmatched_items(odm_json: dict, matched) -> List[Tuple[dict, str]]:
+    """
+    (ItemDef, reason) for every item the matcher did not place, except items
+    flagged NOT_SUBMITTED. Reasons: the OID is not ODM.<domain>.<var>, or it
+    names a variable the SDTMIG does not have.
+    """
+    placed = matched_item_oids(matched)
+    items = []
+    for item in odm_json["MetaDataVersion"]["ItemDefs"]:
+        if item["OID"] in placed or parse_aliases(item.get("Aliases", []))["Not_Submitted"]:
+            continue
+        if len(item["OID"].split(".")) < 3:
+            items.append((item, "OID is not <prefix>.<domain>.<var>"))
+        else:
+            items.append((item, "No SDTMIG variable for OID"))
+    return items
+
+def item_domain(item: dict) -> Optional[str]:
+    parts = item["OID"].split(".")
+    return parts[1] if len(parts) >= 3 else None
+
+
+# -- Suggestions
+def suggest_candidates(index: CandidateIndex, items: Iterable[Tuple[dict, str]], top_k: int = DEFAULT_TOP_K) -> List[Dict]:
+    """
+    Top-k SDTMIG candidates per unmatched item, one row per candidate. Items
+    without any candidate above MIN_SCORE get a single row with no candidate.
+    """
+    items = list(items)
+    queries = [item_query(item) for item, _ in items]
+    domains = [item_domain(item) for item, _ in items]
+
+    rows = []
+    for (item, reason), candidates in zip(items, index.top_k(queries, domains, top_k)):
+        base = {
+            "ItemOID": item["OID"],
+            "ODM_Name": item.get("Name") or "",
+            "ODM_Domain": item_domain(item) or "",
+            "Reason": reason,
+        }
+        if not candidates:
+            rows.append({**base, "Rank": "", "SDTM_Domain": "", "SDTM_Variable": "", "SDTM_Label": "", "Score": ""})
+            continue
+        for rank, (i, score) in enumerate(candidates, start=1):
+            domain, var, label = index.variables[i]
+            rows.append({
+                **base, "Rank": rank, "SDTM_Domain": domain, "SDTM_Variable": var,
+                "SDTM_Label": label, "Score": round(score, 4),
+            })
+    return rows
+
+def write_suggestions(rows: List[Dict], output_path: Path):
+    output_path = Path(output_path)
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(output_path, "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=SUGGESTION_COLUMNS)
+        writer.writeheader()
+        writer.writerows(rows)
+
+def suggest_for_study(paths: dict, odm_json: dict, matched, top_k: int = DEFAULT_TOP_K,
+                      sdtm_json: Optional[Dict[str, dict]] = None) -> List[Dict]:
+    """Suggest candidates for a study's unmatched items and write candidate_suggestions_csv."""
+    items = unmatched_items(odm_json, matched)
+    rows = suggest_candidates(candidate_index(paths, sdtm_json), items, top_k) if items else []
+    write_suggestions(rows, Path(paths["candidate_suggestions_csv"]))
+    print(f"✅ Candidate suggestions for {len(items)} unmatched item(s) written to {paths['candidate_suggestions_csv']}")
+    return rows
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Suggest SDTMIG variables for ODM items the OID matcher could not place."
+    )
+    parser.add_argument("--study", required=True, help="Study name (e.g., VEXIN-03)")
+    parser.add_argument("--env", default="dev", help="Environment profile")
+    parser.add_argument("--top-k", type=int, default=DEFAULT_TOP_K, help="Candidates per unmatched item")
+    args = parser.parse_args()
+
+    paths = load_paths(args.study, args.env)
+    if not paths.get("candidate_suggestions_csv"):
+        parser.error("No candidate_suggestions_csv configured in paths.yml")
+    artifacts = artifact_paths(paths)
+    odm_json = load_study_metadata(artifacts["crf_metadata"])
+    matched = load_mapping(artifacts["match_output"])
+    suggest_for_study(paths, odm_json, matched, top_k=args.top_k)
+
+
+if __name__ == "__main__":
+    main()
+
+## -- End of Program Code -- ##
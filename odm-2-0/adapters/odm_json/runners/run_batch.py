@@ -0,0 +1,159 @@
+import argparse
+import logging
+import os
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from adapters.odm_json.runners.run_pipeline import STAGES, run_pipeline
+from adapters.odm_json.utils.load_paths import load_paths
+from adapters.odm_json.utils.sdtmig_store import open_store
+
+STUDIES_DIR = Path(__file__).resolve().parents[3] / "studies"
+
+
+def discover_studies(studies_dir: Path = STUDIES_DIR) -> List[str]:
+    """Every study folder under studies/ that has a config/paths.yml."""
+    return sorted(
+        path.parent.parent.name
+        for path in Path(studies_dir).glob("*/config/paths.yml")
+    )
+
+
+def prepare_shared_artifacts(studies: List[str], env: str) -> Dict[str, str]:
+    """
+    Build the study-independent artifacts once, before any worker starts: the
+    SDTMIG store per IG version and the compiled ODM schema per XSD. Workers are
+    forked from this process, so they inherit the compiled schemas and open stores.
+    Returns {study: error} for studies whose config or shared artifacts could not
+    be prepared; one bad study does not stop the others.
+    """
+    failures = {}
+    # Shared artifact -> error ("" when it was built), so studies sharing a bad one all report it
+    prepared: Dict[tuple, str] = {}
+
+    def prepare(key: tuple, build) -> str:
+        if key not in prepared:
+            try:
+                build()
+                prepared[key] = ""
+            except Exception as exc:
+                prepared[key] = f"{type(exc).__name__}: {exc}"
+        return prepared[key]
+
+    for study in studies:
+        try:
+            paths = load_paths(study=study, env=env)
+        except Exception as exc:
+            failures[study] = f"{type(exc).__name__}: {exc}"
+            continue
+
+        errors = []
+        store = paths.get("sdtmig_store")
+        if store:
+            sdtmig_input = paths["sdtmig_input_json"]
+            errors.append(prepare(
+                ("sdtmig_store", sdtmig_input, store), lambda: open_store(Path(sdtmig_input), Path(store))
+            ))
+
+        xsd = paths.get("odm_xsd")
+        if xsd:
+            from adapters.odm_json.utils.schema_cache import load_schema
+
+            cache_dir = paths.get("schema_cache_dir")
+            errors.append(prepare(
+                ("odm_xsd", xsd), lambda: load_schema(Path(xsd), cache_dir=Path(cache_dir) if cache_dir else None)
+            ))
+
+        errors = [error for error in errors if error]
+        if errors:
+            failures[study] = "; ".join(errors)
+    return failures
+
+
+def run_study(study: str, env: str, domains: List[str], options: dict) -> dict:
+    """Run one study's pipeline, capturing any failure instead of raising it."""
+    start = time.perf_counter()
+    try:
+        timings = run_pipeline(study=study, env=env, domains=domains, workers=1, **options)
+        return {"study": study, "status": "ok", "timings": timings, "error": "",
+                "seconds": time.perf_counter() - start}
+    except Exception as exc:
+        traceback.print_exc()
+        return {"study": study, "status": "failed", "timings": {}, "error": f"{type(exc).__name__}: {exc}",
+                "seconds": time.perf_counter() - start}
+
+
+def run_batch(
+    studies: List[str],
+    env: str,
+    domains: List[str],
+    workers: Optional[int] = None,
+    **options,
+) -> List[dict]:
+    """Run many studies on a process pool; one study failing does not stop the others."""
+    failures = prepare_shared_artifacts(studies, env)
+    results = [
+        {"study": s, "status": "failed", "timings": {}, "error": e, "seconds": 0.0}
+        for s, e in failures.items()
+    ]
+    runnable = [s for s in studies if s not in failures]
+
+    workers = min(workers or os.cpu_count() or 1, max(len(runnable), 1))
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(run_study, study, env, domains, options) for study in runnable]
+        for future in as_completed(futures):
+            results.append(future.result())
+
+    return sorted(results, key=lambda r: r["study"])
+
+
+def print_summary(results: List[dict]):
+    header = f"{'Study':<20} {'Status':<8} {'Total':>8} " + " ".join(f"{s:>10}" for s in STAGES)
+    print("")
+    print(header)
+    print("-" * len(header))
+    for r in results:
+        stages = " ".join(
+            f"{r['timings'][s]:>9.3f}s" if s in r["timings"] else f"{'-':>10}" for s in STAGES
+        )
+        print(f"{r['study']:<20} {r['status']:<8} {r['seconds']:>7.3f}s {stages}")
+    for r in results:
+        if r["error"]:
+            print(f"❌ {r['study']}: {r['error']}")
+    ok = sum(r["status"] == "ok" for r in results)
+    print(f"\n{ok}/{len(results)} studies completed")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Run the BaaS pipeline for many studies on a shared worker pool."
+    )
+    parser.add_argument(
+        "--studies", nargs="+", help="Study folder names (default: every study under studies/)"
+    )
+    parser.add_argument("--env", default="dev", help="Environment profile in paths.yml")
+    parser.add_argument(
+        "--domains", nargs="+", default=["all"], help="SDTM domains to scaffold per study (default: all)"
+    )
+    parser.add_argument("--workers", type=int, default=None, help="Parallel studies (default: CPU count)")
+    parser.add_argument("--force", action="store_true", help="Rebuild every stage even if inputs are unchanged")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s: %(message)s")
+    studies = args.studies or discover_studies()
+    if not studies:
+        parser.error(f"No studies with config/paths.yml found under {STUDIES_DIR}")
+
+    results = run_batch(studies, args.env, args.domains, workers=args.workers, force=args.force)
+    print_summary(results)
+    if any(r["status"] != "ok" for r in results):
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
+
+## -- End of Program Code -- ##
@@ -0,0 +1,167 @@
+"""
+Build a study's dbt models in-process with dbtRunner, selecting only what changed.
+
+    baas build --study VEXIN-03
+    baas build --study VEXIN-03 --full --threads 4
+
+Models are selected with state:modified+ against the manifest of the last
+successful build, kept under dbt_state_dir, so re-scaffolding one domain
+rebuilds that model (and anything built on it) rather than the whole project.
+The first build compares against the manifest already in the project's
+target/ when there is one. dbt parses the project with its own partial parsing
+(target/partial_parse.msgpack), so unchanged files are not parsed again.
+When the raw tables were reloaded, the models reading source('odm_raw', ...)
+are selected as well, so incremental models pick up the new data.
+
+threads (or dbt_threads in paths.yml) is passed as --threads and overrides the
+`threads:` of the DuckDB target in profiles.yml. dbt keeps global state per
+invocation, so builds in one process (e.g. the service) run one at a time.
+"""
+import argparse
+import os
+import shutil
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from adapters.odm_json.utils.load_paths import load_paths
+
+# Added to the selection when the raw tables changed since the last build
+RAW_SOURCE_SELECTOR = "source:odm_raw+"
+FAILED_STATUSES = ("error", "fail", "runtime error")
+
+_DBT_LOCK = threading.Lock()
+
+
+def dbt_project_dir(paths: dict) -> Path:
+    """The dbt project of the study: dbt_project_dir, else the project holding dbt_models_dir."""
+    if paths.get("dbt_project_dir"):
+        return Path(paths["dbt_project_dir"])
+    return Path(paths["dbt_models_dir"]).parents[1]
+
+def dbt_state_dir(paths: dict) -> Path:
+    """Where the manifest of the last successful build is kept."""
+    if paths.get("dbt_state_dir"):
+        return Path(paths["dbt_state_dir"])
+    return dbt_project_dir(paths) / "state"
+
+
+def seed_state(project_dir: Path, state_dir: Path) -> bool:
+    """
+    Make sure state_dir holds a manifest to compare against, taking the one in
+    target/ on the first build. Returns False when there is none (build all).
+    """
+    state_manifest = state_dir / "manifest.json"
+    if state_manifest.exists():
+        return True
+    target_manifest = project_dir / "target" / "manifest.json"
+    if not target_manifest.exists():
+        return False
+    state_dir.mkdir(parents=True, exist_ok=True)
+    shutil.copyfile(target_manifest, state_manifest)
+    return True
+
+def save_state(project_dir: Path, state_dir: Path):
+    """Keep the manifest of this build as the state the next one is compared with."""
+    state_dir.mkdir(parents=True, exist_ok=True)
+    tmp_path = state_dir / "manifest.json.tmp"
+    shutil.copyfile(project_dir / "target" / "manifest.json", tmp_path)
+    os.replace(tmp_path, state_dir / "manifest.json")
+
+
+def dbt_args(
+    paths: dict,
+    command: str = "run",
+    full: bool = False,
+    raw_data_changed: bool = False,
+    threads: Optional[int] = None,
+) -> List[str]:
+    """The dbt command line for one build (without the leading `dbt`)."""
+    project_dir = dbt_project_dir(paths)
+    args = [command, "--project-dir", str(project_dir)]
+    if paths.get("dbt_profiles_dir"):
+        args += ["--profiles-dir", str(paths["dbt_profiles_dir"])]
+    if paths.get("dbt_target"):
+        args += ["--target", str(paths["dbt_target"])]
+    threads = threads or paths.get("dbt_threads")
+    if threads:
+        args += ["--threads", str(threads)]
+
+    selectors = []
+    if not full and seed_state(project_dir, dbt_state_dir(paths)):
+        args += ["--state", str(dbt_state_dir(paths))]
+        selectors.append("state:modified+")
+        if raw_data_changed:
+            selectors.append(RAW_SOURCE_SELECTOR)
+    # dbt_select narrows the build (e.g. path:models/sdtm); "," intersects in dbt's syntax
+    scope = paths.get("dbt_select")
+    if scope:
+        selectors = [f"{selector},{scope}" for selector in selectors] or [scope]
+    if selectors:
+        args += ["--select", *selectors]
+    return args
+
+
+def build_models(
+    paths: dict,
+    command: str = "run",
+    full: bool = False,
+    raw_data_changed: bool = False,
+    threads: Optional[int] = None,
+) -> Dict[str, int]:
+    """
+    Run `dbt <command>` on the study's project in this process and, when it
+    succeeds, keep its manifest as the state for the next build. Returns
+    per-status node counts; raises RuntimeError when dbt fails.
+    """
+    from dbt.cli.main import dbtRunner
+
+    project_dir = dbt_project_dir(paths)
+    args = dbt_args(paths, command, full=full, raw_data_changed=raw_data_changed, threads=threads)
+    with _DBT_LOCK:
+        result = dbtRunner().invoke(args)
+    if result.exception is not None:
+        raise RuntimeError(f"dbt {command} could not run: {result.exception}") from result.exception
+
+    nodes = list(getattr(result.result, "results", None) or [])
+    counts = {"models_selected": len(nodes)}
+    for node in nodes:
+        key = f"models_{str(node.status).lower().replace(' ', '_')}"
+        counts[key] = counts.get(key, 0) + 1
+    if not result.success:
+        failed = [node.node.name for node in nodes if str(node.status).lower() in FAILED_STATUSES]
+        raise RuntimeError(f"dbt {command} failed for: {', '.join(failed) or 'see the dbt log'}")
+
+    save_state(project_dir, dbt_state_dir(paths))
+    if nodes:
+        print(f"✅ dbt {command}: {len(nodes)} model(s) built in {project_dir.name}")
+    else:
+        print(f"✅ dbt {command}: no models changed since the last build")
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the study's dbt models that changed since the last build.")
+    parser.add_argument("--study", required=True, help="Study folder name")
+    parser.add_argument("--env", default="dev", help="Environment name in paths.yml (e.g., dev)")
+    parser.add_argument("--command", choices=["run", "build"], default="run", help="dbt command (build also runs tests)")
+    parser.add_argument("--full", action="store_true", help="Build every model, ignoring the saved state")
+    parser.add_argument("--raw-changed", action="store_true", help="Also rebuild models reading the odm_raw tables")
+    parser.add_argument("--threads", type=int, default=None, help="dbt threads (default: dbt_threads or the profile)")
+    args = parser.parse_args()
+
+    paths = load_paths(study=args.study, env=args.env)
+    start = time.perf_counter()
+    try:
+        build_models(paths, args.command, full=args.full, raw_data_changed=args.raw_changed, threads=args.threads)
+    except RuntimeError as exc:
+        print(f"❌ {exc}")
+        raise SystemExit(1)
+    print(f"⏱  dbt {args.command} finished in {time.perf_counter() - start:.3f}s")
+
+
+if __name__ == "__main__":
+    main()
+
+## -- End of Program Code -- ##
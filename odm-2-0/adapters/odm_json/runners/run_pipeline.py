@@ -0,0 +1,396 @@
+import argparse
+import inspect
+import logging
+from collections import Counter
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from adapters.odm_json.extractors.convert_odm_xml_to_json import extract_odm_metadata
+from adapters.odm_json.extractors.extract_clinical_data import extract_clinical_data, raw_sources_path
+from adapters.odm_json.matchers.match_odm_to_sdtm import (
+    flatten_sdtm_metadata,
+    match_odm_to_sdtm_all,
+    referenced_domains,
+    report_dropped_items,
+)
+from adapters.odm_json.scaffolds.scaffold_sql import (
+    domain_input_digests,
+    domain_outputs,
+    load_derivation_configs,
+    load_materialization_policy,
+    mapping_frame,
+    resolve_domains,
+    scaffold_domains,
+    scaffold_stats,
+)
+from adapters.odm_json.utils.artifacts import (
+    artifact_outputs,
+    artifact_paths,
+    load_mapping,
+    load_tree,
+    save_mapping,
+    save_tree,
+)
+from adapters.odm_json.utils.build_cache import (
+    BuildCache,
+    code_digest,
+    data_digest,
+    directory_digests,
+    file_digest,
+    rows_digest,
+)
+from adapters.odm_json.utils.instrumentation import Instrumentation
+from adapters.odm_json.utils.load_paths import load_paths
+from adapters.odm_json.utils.metadata_model import load_study_metadata, sdtm_metadata
+from adapters.odm_json.utils.parse_sdtmig_json import extract_sdtm_metadata
+from adapters.odm_json.utils.sdtmig_store import open_store
+from adapters.odm_json.validators.validate_controlled_terms import check_study_terminology
+
+STAGES = ("convert", "ingest", "ct_check", "normalize", "match", "suggest", "scaffold", "define", "dbt")
+
+
+def source_digest(*funcs) -> str:
+    """Digest of the modules implementing a stage and of the package modules they import, so code changes invalidate its cache."""
+    return code_digest(*(inspect.getmodule(func) for func in funcs))
+
+
+def mapping_type_counts(matched) -> Dict[str, int]:
+    """Rows per Mapping_Type from match rows (list of dicts) or the columnar DataFrame."""
+    types = matched["Mapping_Type"] if hasattr(matched, "columns") else (r.Mapping_Type for r in matched)
+    return {f"rows_{t.lower()}": n for t, n in sorted(Counter(types).items())}
+
+
+def run_pipeline(
+    study: str,
+    env: str,
+    domains: Optional[List[str]] = None,
+    write_artifacts: bool = True,
+    stream: bool = False,
+    paths: Optional[dict] = None,
+    use_cache: bool = True,
+    force: bool = False,
+    workers: Optional[int] = None,
+    match_engine: str = "python",
+    profile_dir: Optional[Path] = None,
+    export_text: bool = False,
+    dbt_threads: Optional[int] = None,
+) -> Dict[str, float]:
+    """
+    Run convert → ingest → ct_check → normalize → match → suggest → scaffold
+    → define → dbt in one process. The ingest stage loads ClinicalData into the study DuckDB file and
+    only runs when paths.yml sets duckdb_path; with ingest_state it applies only
+    what changed since the last export, and force rebuilds the raw tables.
+    ct_check runs after it when ct_report is set, checking the coded raw
+    columns against their CodeLists (ct_decode adds decoded_<domain> views).
+    suggest ranks SDTMIG candidates for the items the matcher could not place
+    when candidate_suggestions_csv is set, and define writes Define-XML 2.1
+    when define_xml is set. With dbt_build set, dbt then builds the models
+    in-process, selecting only those changed since its last build (plus the
+    ones reading odm_raw when ingest loaded new data); dbt_threads overrides
+    the profile's threads.
+
+    Each stage hands its in-memory result to the next; the intermediates
+    under runs/metadata are only written when write_artifacts is set, as
+    JSON/CSV or, with artifact_format: binary in paths.yml, as msgpack/Parquet
+    (export_text or export_text_artifacts also writes the JSON/CSV). With use_cache, every stage records the content hashes of its
+    inputs in runs/metadata/manifests/ and is skipped on the next run when
+    they are unchanged (force rebuilds regardless). The cache needs the
+    artifacts on disk, so it is disabled when write_artifacts is off.
+    Stage metrics are appended to paths["metrics_log"] as JSON lines, with a
+    cProfile dump per stage when profile_dir is set.
+    Returns the wall time of each stage in seconds.
+    """
+    paths = paths or load_paths(study=study, env=env)
+    metrics = Instrumentation(
+        metrics_path=paths.get("metrics_log"),
+        profile_dir=profile_dir,
+        study=study,
+        env=env,
+        match_engine=match_engine,
+    )
+
+    artifacts = artifact_paths(paths)
+    crf_json_path = artifacts["crf_metadata"]
+    sdtm_json_path = artifacts["sdtmig_normalized"]
+    match_csv_path = artifacts["match_output"]
+
+    def artifact_files(name: str) -> List[Path]:
+        return artifact_outputs(paths, name, export_text)
+
+    def save_artifact(name: str, data, save) -> List[Path]:
+        """Write an intermediate (and its JSON/CSV export); return the files written."""
+        for path in artifact_files(name):
+            save(data, path)
+        return artifact_files(name)
+
+    if use_cache and not write_artifacts:
+        print("⚠️  Build cache disabled: it needs the runs/metadata artifacts to be written")
+        use_cache = False
+    cache = BuildCache(crf_json_path.parent / "manifests") if use_cache else None
+
+    def up_to_date(stage: str, inputs: Dict[str, str], outputs: List[Path]) -> bool:
+        if cache is None or force or not cache.is_fresh(stage, inputs, outputs):
+            return False
+        print(f"  ↷ {stage}: inputs unchanged, skipping")
+        return True
+
+    def record(stage: str, inputs: Dict[str, str], outputs: List[Path]):
+        if cache is not None:
+            cache.record(stage, inputs, outputs)
+
+    print(f"▶ Running pipeline for study: {study} (env={env})")
+
+    odm_json = sdtm_json = matched = None
+    raw_data_changed = False
+
+    with metrics.stage("convert", inputs=[paths["odm_xml"]]) as counters:
+        xsd_path = paths.get("odm_xsd") or paths.get("schemas", {}).get("odm_xsd")
+        inputs = {
+            "code": source_digest(extract_odm_metadata),
+            "odm_xml": file_digest(Path(paths["odm_xml"])),
+            "odm_xsd": file_digest(Path(xsd_path)) if xsd_path else "",
+        }
+        if not up_to_date("convert", inputs, artifact_files("crf_metadata")):
+            odm_json = extract_odm_metadata(paths, stream=stream)
+            mdv = odm_json["MetaDataVersion"]
+            counters.update(
+                item_defs=len(mdv.get("ItemDefs", [])),
+                code_lists=len(mdv.get("CodeLists", [])),
+                item_groups=len(mdv.get("ItemGroupDefs", [])),
+            )
+            if write_artifacts:
+                record("convert", inputs, save_artifact("crf_metadata", odm_json, save_tree))
+
+    if paths.get("duckdb_path"):
+        with metrics.stage("ingest", inputs=[paths["odm_xml"]]) as counters:
+            sources_path = raw_sources_path(paths)
+            inputs = {
+                "code": source_digest(extract_clinical_data),
+                "odm_xml": file_digest(Path(paths["odm_xml"])),
+            }
+            if not up_to_date("ingest", inputs, [sources_path]):
+                odm_json = odm_json if odm_json is not None else load_study_metadata(crf_json_path)
+                stats = extract_clinical_data(paths, odm_json=odm_json, full_refresh=force)
+                counters.update({f"rows_{table}": rows for table, rows in stats["rows"].items()})
+                counters.update({k: v for k, v in stats.items() if k.startswith(("subjects_", "rows_removed"))})
+                counters["values_uncast"] = sum(stats["values_uncast"].values())
+                record("ingest", inputs, [sources_path])
+                raw_data_changed = True
+
+    if paths.get("duckdb_path") and paths.get("ct_report"):
+        with metrics.stage("ct_check", inputs=[paths["odm_xml"]]) as counters:
+            report_path = Path(paths["ct_report"])
+            inputs = {
+                "code": source_digest(check_study_terminology),
+                "odm_xml": file_digest(Path(paths["odm_xml"])),
+                "ct_decode": str(bool(paths.get("ct_decode"))),
+            }
+            if not up_to_date("ct_check", inputs, [report_path]):
+                odm_json = odm_json if odm_json is not None else load_study_metadata(crf_json_path)
+                summary = check_study_terminology(paths, odm_json)
+                counters.update(
+                    coded_columns=len(summary),
+                    values_checked=sum(row["values_checked"] for row in summary),
+                    violations=sum(row["violations"] for row in summary),
+                )
+                record("ct_check", inputs, [report_path])
+
+    with metrics.stage("normalize", inputs=[paths["sdtmig_input_json"]]) as counters:
+        sdtmig_input = Path(paths["sdtmig_input_json"])
+        store = None
+        if paths.get("sdtmig_store"):
+            # Shared per IG version: built once, then only the needed domains are read
+            store = open_store(sdtmig_input, Path(paths["sdtmig_store"]))
+            counters["sdtmig_domains"] = len(store.domains)
+        else:
+            inputs = {
+                "code": source_digest(extract_sdtm_metadata),
+                "sdtmig_input_json": file_digest(sdtmig_input),
+            }
+            if not up_to_date("normalize", inputs, artifact_files("sdtmig_normalized")):
+                sdtm_json = extract_sdtm_metadata(sdtmig_input)
+                counters["sdtmig_domains"] = len(sdtm_json)
+                if write_artifacts:
+                    record("normalize", inputs, save_artifact("sdtmig_normalized", sdtm_json, save_tree))
+
+    with metrics.stage("match", inputs=[crf_json_path, paths.get("sdtmig_store") or sdtm_json_path]) as counters:
+        if match_engine == "columnar":
+            from adapters.odm_json.matchers.columnar_matcher import match_odm_to_sdtm_columnar
+            matcher = match_odm_to_sdtm_columnar
+        else:
+            matcher = match_odm_to_sdtm_all
+        # The stage also runs flatten_sdtm_metadata/report_dropped_items from match_odm_to_sdtm
+        inputs = {"code": source_digest(match_odm_to_sdtm_all, matcher), "match_engine": match_engine}
+        if cache is not None:
+            inputs["crf_metadata_json"] = file_digest(crf_json_path)
+            if store is not None:
+                inputs["sdtmig_store"] = file_digest(store.store_path)
+            else:
+                inputs["sdtmig_normalized_json"] = file_digest(sdtm_json_path)
+        if not up_to_date("match", inputs, artifact_files("match_output")):
+            # Upstream results come from memory, or from disk when their stage was skipped
+            odm_json = odm_json if odm_json is not None else load_study_metadata(crf_json_path)
+            if store is not None:
+                sdtm_json = store.load_domains(referenced_domains(odm_json))
+            elif sdtm_json is None:
+                sdtm_json = sdtm_metadata(load_tree(sdtm_json_path))
+            sdtm_lookup = flatten_sdtm_metadata(sdtm_json)
+            matched = matcher(odm_json, sdtm_lookup)
+            counters.update(mapping_type_counts(matched))
+            counters["item_defs_dropped"] = len(report_dropped_items(odm_json))
+            if write_artifacts:
+                record("match", inputs, save_artifact("match_output", matched, save_mapping))
+
+    if paths.get("candidate_suggestions_csv"):
+        with metrics.stage("suggest", inputs=[crf_json_path, match_csv_path]) as counters:
+            from adapters.odm_json.matchers.suggest_candidates import suggest_for_study
+
+            suggestions_path = Path(paths["candidate_suggestions_csv"])
+            inputs = {
+                "code": source_digest(suggest_for_study),
+                "sdtmig_input_json": file_digest(Path(paths["sdtmig_input_json"])),
+            }
+            if cache is not None:
+                inputs["crf_metadata_json"] = file_digest(crf_json_path)
+                inputs["match_output"] = file_digest(match_csv_path)
+            if not up_to_date("suggest", inputs, [suggestions_path]):
+                odm_json = odm_json if odm_json is not None else load_study_metadata(crf_json_path)
+                rows = suggest_for_study(
+                    paths, odm_json, matched if matched is not None else load_mapping(match_csv_path)
+                )
+                counters.update(
+                    items_unmatched=len({row["ItemOID"] for row in rows}),
+                    candidates=sum(1 for row in rows if row["Rank"]),
+                )
+                record("suggest", inputs, [suggestions_path])
+
+    with metrics.stage("scaffold", inputs=[match_csv_path]) as counters:
+        df = mapping_frame(matched) if matched is not None else load_mapping(match_csv_path)
+        configs = load_derivation_configs(paths)
+        policy = load_materialization_policy(paths)
+        stale = {}
+        for domain in resolve_domains(df, domains or []):
+            inputs = domain_input_digests(df, domain, paths, configs, policy)
+            if not up_to_date(f"scaffold_{domain.lower()}", inputs, domain_outputs(df, domain, paths)):
+                stale[domain] = inputs
+        if stale:
+            print(f"  → Scaffolding domains: {', '.join(stale)}")
+            outputs = scaffold_domains(df, list(stale), paths, workers=workers, configs=configs, policy=policy)
+            for domain, output_path in outputs.items():
+                record(f"scaffold_{domain.lower()}", stale[domain], domain_outputs(df, domain, paths))
+                for key, n in scaffold_stats(output_path).items():
+                    counters[key] = counters.get(key, 0) + n
+        counters["domains_scaffolded"] = len(stale)
+
+    if paths.get("define_xml"):
+        with metrics.stage("define", inputs=[crf_json_path, match_csv_path]) as counters:
+            from adapters.odm_json.writers.write_define_xml import generate_define
+
+            define_path = Path(paths["define_xml"])
+            inputs = {
+                "code": source_digest(generate_define),
+                "mapping_rows": rows_digest(df.itertuples(index=False)),
+                "sdtmig_input_json": file_digest(Path(paths["sdtmig_input_json"])),
+                "overrides": data_digest(directory_digests(Path(paths["overrides_dir"]), recursive=True)),
+                "derivations": data_digest(configs),
+                "define_xsd": file_digest(Path(paths["define_xsd"])) if paths.get("define_xsd") else "",
+            }
+            if cache is not None:
+                inputs["crf_metadata_json"] = file_digest(crf_json_path)
+            if not up_to_date("define", inputs, [define_path]):
+                odm_json = odm_json if odm_json is not None else load_study_metadata(crf_json_path)
+                counters.update(generate_define(paths, odm_json, df))
+                record("define", inputs, [define_path])
+
+    if paths.get("dbt_build"):
+        with metrics.stage("dbt") as counters:
+            from adapters.odm_json.runners.run_dbt import build_models, dbt_project_dir, dbt_state_dir
+
+            project_dir = dbt_project_dir(paths)
+            inputs = {
+                "code": source_digest(build_models),
+                "models": data_digest(directory_digests(project_dir / "models", recursive=True)),
+                "dbt_project": file_digest(project_dir / "dbt_project.yml"),
+                "options": data_digest({
+                    "threads": dbt_threads or paths.get("dbt_threads"),
+                    **{key: paths.get(key) for key in ("dbt_profiles_dir", "dbt_target", "dbt_select")},
+                }),
+            }
+            # New raw data has to reach the incremental models even when no SQL changed
+            if raw_data_changed or not up_to_date("dbt", inputs, [dbt_state_dir(paths) / "manifest.json"]):
+                counters.update(
+                    build_models(paths, full=force, raw_data_changed=raw_data_changed, threads=dbt_threads)
+                )
+                record("dbt", inputs, [dbt_state_dir(paths) / "manifest.json"])
+
+    print(f"✅ Pipeline completed in {sum(metrics.timings.values()):.3f}s")
+    return metrics.timings
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Run the ODM → SDTM scaffolding pipeline in a single process."
+    )
+    parser.add_argument("--study", required=True, help="Study folder name (e.g., VEXIN-03)")
+    parser.add_argument("--env", default="dev", help="Environment profile in paths.yml")
+    parser.add_argument(
+        "--domains", nargs="+", default=["DM"], help="SDTM domains to scaffold (e.g. DM AE VS, or all)"
+    )
+    parser.add_argument(
+        "--workers", type=int, default=None, help="Parallel scaffold workers (default: CPU count)"
+    )
+    parser.add_argument(
+        "--match-engine", choices=["python", "columnar"], default="python",
+        help="Match engine: per-item Python dicts or the DuckDB columnar engine"
+    )
+    parser.add_argument(
+        "--skip-artifacts", action="store_true",
+        help="Do not write the intermediate JSON/CSV files under runs/metadata"
+    )
+    parser.add_argument(
+        "--stream", action="store_true", help="Stream ODM metadata extraction with iterparse"
+    )
+    parser.add_argument(
+        "--no-cache", action="store_true", help="Ignore and do not update the stage build manifests"
+    )
+    parser.add_argument(
+        "--force", action="store_true", help="Rebuild every stage even if its inputs are unchanged"
+    )
+    parser.add_argument(
+        "--export-text", action="store_true",
+        help="With artifact_format: binary, also write the JSON/CSV intermediates"
+    )
+    parser.add_argument(
+        "--profile", action="store_true", help="Dump cProfile stats per stage under runs/logs/profiles"
+    )
+    parser.add_argument(
+        "--dbt-threads", type=int, default=None,
+        help="With dbt_build set, dbt threads for the build (default: dbt_threads or the profile)"
+    )
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s: %(message)s")
+    profile_dir = None
+    if args.profile:
+        profile_dir = Path(load_paths(study=args.study, env=args.env)["metrics_log"]).parent / "profiles"
+
+    run_pipeline(
+        study=args.study,
+        env=args.env,
+        domains=args.domains,
+        write_artifacts=not args.skip_artifacts,
+        stream=args.stream,
+        use_cache=not args.no_cache,
+        force=args.force,
+        workers=args.workers,
+        match_engine=args.match_engine,
+        profile_dir=profile_dir,
+        export_text=args.export_text,
+        dbt_threads=args.dbt_threads,
+    )
+
+
+if __name__ == "__main__":
+    main()
+
+## -- End of Program Code -- ##
@@ -0,0 +1,354 @@
+"""
+Local service mode: one long-running process that keeps the expensive state of
+the pipeline warm between jobs.
+
+A cold `baas` run re-imports pandas and lxml, recompiles the ODM XSD, reopens
+the SDTMIG store and re-reads paths.yml on every call. Here all of that is
+loaded once and kept in bounded LRU caches (compiled schemas, SDTMIG stores,
+candidate indexes and resolved study configs), and jobs such as "convert",
+"match" or "scaffold DM for VEXIN-03" are posted over HTTP on localhost or a
+Unix socket:
+
+    baas serve --port 8765 --workers 4
+    baas job --job scaffold --study VEXIN-03 --domains DM
+
+Jobs run on a bounded thread pool so they share the warm caches; jobs of the
+same study run one at a time, since they write the same artifacts. Once the
+pool and its queue are full, new jobs are refused with 503 instead of piling up.
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import signal
+import time
+import traceback
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+from adapters.odm_json.runners.service_client import DEFAULT_HOST, DEFAULT_PORT
+from adapters.odm_json.utils.load_paths import load_paths
+from adapters.odm_json.utils.lru_cache import LRUCache
+
+STUDIES_DIR = Path(__file__).resolve().parents[3] / "studies"
+
+# Largest accepted request body
+MAX_BODY_BYTES = 1024 * 1024
+
+HTTP_REASONS = {
+    200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+    413: "Payload Too Large", 500: "Internal Server Error", 503: "Service Unavailable",
+}
+
+
+class PayloadTooLarge(Exception):
+    """A request body over MAX_BODY_BYTES (answered with 413)."""
+
+
+class MalformedRequest(Exception):
+    """A request line or header that is not HTTP/1.1 (answered with 400)."""
+
+
+# -- Jobs
+# Each job takes the resolved paths and the request body and returns a JSON-able summary.
+def convert_job(paths: dict, request: dict) -> dict:
+    from adapters.odm_json.extractors.convert_odm_xml_to_json import extract_odm_metadata
+    from adapters.odm_json.utils.artifacts import artifact_outputs, save_tree
+
+    odm_json = extract_odm_metadata(paths, stream=bool(request.get("stream")), workers=1)
+    outputs = artifact_outputs(paths, "crf_metadata")
+    for output_path in outputs:
+        save_tree(odm_json, output_path)
+    mdv = odm_json["MetaDataVersion"]
+    return {
+        "item_defs": len(mdv.get("ItemDefs", [])),
+        "code_lists": len(mdv.get("CodeLists", [])),
+        "outputs": [str(p) for p in outputs],
+    }
+
+def match_job(paths: dict, request: dict) -> dict:
+    from adapters.odm_json.matchers.match_odm_to_sdtm import (
+        flatten_sdtm_metadata,
+        load_sdtm_metadata,
+        match_odm_to_sdtm_all,
+    )
+    from adapters.odm_json.runners.run_pipeline import mapping_type_counts
+    from adapters.odm_json.utils.artifacts import artifact_outputs, artifact_paths, save_mapping
+    from adapters.odm_json.utils.metadata_model import load_study_metadata
+
+    odm_json = load_study_metadata(artifact_paths(paths)["crf_metadata"])
+    matched = match_odm_to_sdtm_all(odm_json, flatten_sdtm_metadata(load_sdtm_metadata(paths, odm_json)))
+    outputs = artifact_outputs(paths, "match_output")
+    for output_path in outputs:
+        save_mapping(matched, output_path)
+    return {**mapping_type_counts(matched), "outputs": [str(p) for p in outputs]}
+
+def scaffold_job(paths: dict, request: dict) -> dict:
+    from adapters.odm_json.scaffolds.scaffold_sql import resolve_domains, scaffold_domains
+    from adapters.odm_json.utils.artifacts import artifact_paths, load_mapping
+
+    df = load_mapping(artifact_paths(paths)["match_output"])
+    domains = resolve_domains(df, request.get("domains") or ["all"])
+    outputs = scaffold_domains(df, domains, paths, workers=1)
+    return {"outputs": {domain: str(path) for domain, path in outputs.items()}}
+
+def run_job(paths: dict, request: dict) -> dict:
+    from adapters.odm_json.runners.run_pipeline import run_pipeline
+
+    timings = run_pipeline(
+        study=request["study"], env=request.get("env") or "dev", domains=request.get("domains") or ["DM"],
+        paths=paths, workers=1, force=bool(request.get("force")),
+    )
+    return {"timings": timings}
+
+JOBS: Dict[str, Callable[[dict, dict], dict]] = {
+    "convert": convert_job,
+    "match": match_job,
+    "scaffold": scaffold_job,
+    "run": run_job,
+}
+
+
+# -- Warm caches
+def configure_caches(max_schemas: int, max_sdtmig: int, max_indexes: int):
+    """Bound the per-process caches the pipeline modules keep."""
+    from adapters.odm_json.matchers.suggest_candidates import _INDEXES
+    from adapters.odm_json.utils.schema_cache import _SCHEMA_CACHE
+    from adapters.odm_json.utils.sdtmig_store import _OPEN_STORES
+
+    _SCHEMA_CACHE.resize(max_schemas)
+    _OPEN_STORES.resize(max_sdtmig)
+    _INDEXES.resize(max_indexes)
+    return [_SCHEMA_CACHE, _OPEN_STORES, _INDEXES]
+
+def warm_up(studies: List[str], env: str):
+    """Import the pipeline and compile/open the shared artifacts of these studies up front."""
+    # The stages import these where they use them; a cold first job would pay for them
+    import duckdb  # noqa: F401
+    import pandas  # noqa: F401
+
+    from adapters.odm_json.runners.run_batch import prepare_shared_artifacts
+
+    failures = prepare_shared_artifacts(studies, env)
+    for study, error in failures.items():
+        print(f"⚠️  Could not warm up {study}: {error}")
+
+
+class BlueprintService:
+    """Job dispatch, per-study locking and warm study configs behind the HTTP front end."""
+
+    def __init__(self, env: str = "dev", workers: int = 2, max_queue: int = 16,
+                 max_studies: int = 32, caches: Optional[List[LRUCache]] = None):
+        self.env = env
+        self.workers = workers
+        self.max_queue = max_queue
+        self.pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="baas-job")
+        self.configs = LRUCache("study_configs", max_entries=max_studies)
+        self.caches = [self.configs] + list(caches or [])
+        # (study, env) -> asyncio.Lock, kept only while a job holds or waits for it
+        self._study_locks = weakref.WeakValueDictionary()
+        self.pending = 0
+        self.counts = {"completed": 0, "failed": 0, "rejected": 0}
+        self.started = time.time()
+
+    def study_paths(self, study: str, env: str) -> dict:
+        """Resolved paths.yml of a study, re-read only when the file changes."""
+        config_path = STUDIES_DIR / study / "config" / "paths.yml"
+        key = (study, env, os.stat(config_path).st_mtime_ns)
+        return self.configs.get_or_load(key, lambda: load_paths(study=study, env=env))
+
+    def status(self) -> dict:
+        return {
+            "uptime_seconds": round(time.time() - self.started, 3),
+            "workers": self.workers,
+            "max_queue": self.max_queue,
+            "pending": self.pending,
+            **self.counts,
+            "caches": {cache.name: cache.stats() for cache in self.caches},
+        }
+
+    def _execute(self, job: str, paths: dict, request: dict) -> dict:
+        start = time.perf_counter()
+        result = JOBS[job](paths, request)
+        return {"status": "ok", "job": job, "study": request["study"], "result": result,
+                "seconds": round(time.perf_counter() - start, 6)}
+
+    async def submit(self, request: dict) -> Tuple[int, dict]:
+        """Run one job request; returns (HTTP status, response body)."""
+        job, study = request.get("job"), request.get("study")
+        env = request.get("env") or self.env
+        if job not in JOBS:
+            return 400, {"status": "failed", "error": f"Unknown job '{job}'; expected one of {sorted(JOBS)}"}
+        if not study or Path(study).name != study or not (STUDIES_DIR / study / "config" / "paths.yml").is_file():
+            return 404, {"status": "failed", "error": f"No config/paths.yml for study '{study}'"}
+        if self.pending >= self.workers + self.max_queue:
+            self.counts["rejected"] += 1
+            return 503, {"status": "failed", "error": f"Service busy: {self.pending} jobs pending"}
+
+        self.pending += 1
+        loop = asyncio.get_running_loop()
+        try:
+            lock = self._study_locks.setdefault((study, env), asyncio.Lock())
+            async with lock:
+                paths = self.study_paths(study, env)
+                payload = await loop.run_in_executor(self.pool, self._execute, job, paths, {**request, "env": env})
+            self.counts["completed"] += 1
+            return 200, payload
+        except Exception as exc:
+            traceback.print_exc()
+            self.counts["failed"] += 1
+            return 500, {"status": "failed", "job": job, "study": study, "error": f"{type(exc).__name__}: {exc}"}
+        finally:
+            self.pending -= 1
+
+    def close(self):
+        self.pool.shutdown(wait=True)
+
+
+# -- HTTP
+async def read_request(reader: asyncio.StreamReader) -> Optional[Tuple[str, str, Dict[str, str], bytes]]:
+    """(method, path, headers, body) of the next request on the connection, or None at EOF."""
+    request_line = await reader.readline()
+    if not request_line.strip():
+        return None
+    parts = request_line.decode("latin-1").split()
+    if len(parts) != 3 or not parts[2].startswith("HTTP/"):
+        raise MalformedRequest(f"Bad request line: {request_line[:100]!r}")
+    method, target, _ = parts
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b"\n", b""):
+            break
+        name, colon, value = line.decode("latin-1").partition(":")
+        if not colon or not name.strip():
+            raise MalformedRequest(f"Bad header line: {line[:100]!r}")
+        headers[name.strip().lower()] = value.strip()
+    length = headers.get("content-length") or "0"
+    if not length.isdigit():
+        raise MalformedRequest(f"Bad Content-Length: {length[:100]!r}")
+    length = int(length)
+    if length > MAX_BODY_BYTES:
+        raise PayloadTooLarge(f"Body of {length} bytes exceeds {MAX_BODY_BYTES}")
+    body = await reader.readexactly(length) if length else b""
+    return method.upper(), target, headers, body
+
+def encode_response(status: int, payload: dict, keep_alive: bool) -> bytes:
+    body = json.dumps(payload, default=str).encode("utf-8")
+    head = (
+        f"HTTP/1.1 {status} {HTTP_REASONS.get(status, '')}\r\n"
+        f"Content-Type: application/json\r\n"
+        f"Content-Length: {len(body)}\r\n"
+        f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n"
+    )
+    return head.encode("latin-1") + body
+
+async def route(service: BlueprintService, method: str, target: str, body: bytes) -> Tuple[int, dict]:
+    path = target.split("?", 1)[0].rstrip("/") or "/"
+    if path == "/status":
+        return (200, service.status()) if method == "GET" else (405, {"error": "Use GET /status"})
+    if path == "/jobs":
+        if method != "POST":
+            return 405, {"error": "Use POST /jobs"}
+        try:
+            request = json.loads(body or b"{}")
+        except json.JSONDecodeError as exc:
+            return 400, {"status": "failed", "error": f"Invalid JSON: {exc}"}
+        if not isinstance(request, dict):
+            return 400, {"status": "failed", "error": "Expected a JSON object"}
+        return await service.submit(request)
+    return 404, {"error": f"No route for {path}"}
+
+def connection_handler(service: BlueprintService):
+    async def handle(reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                try:
+                    request = await read_request(reader)
+                except PayloadTooLarge as exc:
+                    writer.write(encode_response(413, {"error": f"Payload too large: {exc}"}, keep_alive=False))
+                    break
+                except MalformedRequest as exc:
+                    writer.write(encode_response(400, {"error": f"Malformed request: {exc}"}, keep_alive=False))
+                    break
+                if request is None:
+                    break
+                method, target, headers, body = request
+                keep_alive = headers.get("connection", "").lower() != "close"
+                status, payload = await route(service, method, target, body)
+                writer.write(encode_response(status, payload, keep_alive))
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+    return handle
+
+async def serve(service: BlueprintService, host: str = DEFAULT_HOST, port: int = DEFAULT_PORT,
+                socket_path: Optional[str] = None):
+    handler = connection_handler(service)
+    if socket_path:
+        server = await asyncio.start_unix_server(handler, path=socket_path)
+        where = f"unix:{socket_path}"
+    else:
+        server = await asyncio.start_server(handler, host=host, port=port)
+        where = f"http://{host}:{server.sockets[0].getsockname()[1]}"
+    print(f"✅ BaaS service listening on {where} ({service.workers} workers)", flush=True)
+
+    # Stop on Ctrl-C or SIGTERM; jobs already running finish before the pool shuts down
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop.set)
+    async with server:
+        await stop.wait()
+    print("✅ BaaS service stopped", flush=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Serve pipeline jobs from one long-running process with warm caches."
+    )
+    parser.add_argument("--host", default=DEFAULT_HOST, help="Interface to bind (default: localhost only)")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT, help="TCP port")
+    parser.add_argument("--socket", default=None, help="Listen on this Unix socket instead of TCP")
+    parser.add_argument("--env", default="dev", help="Default environment profile in paths.yml")
+    parser.add_argument("--workers", type=int, default=min(4, os.cpu_count() or 1), help="Jobs run at once")
+    parser.add_argument("--max-queue", type=int, default=16, help="Jobs allowed to wait before new ones get 503")
+    parser.add_argument("--max-studies", type=int, default=32, help="Study configs kept warm")
+    parser.add_argument("--max-schemas", type=int, default=8, help="Compiled XSDs kept warm")
+    parser.add_argument("--max-sdtmig", type=int, default=4, help="SDTMIG versions (stores) kept open")
+    parser.add_argument("--max-indexes", type=int, default=2, help="Candidate indexes kept warm")
+    parser.add_argument(
+        "--warm", nargs="*", default=None, metavar="STUDY",
+        help="Compile schemas and open SDTMIG stores for these studies at start (no names: every study)"
+    )
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s: %(message)s")
+    caches = configure_caches(args.max_schemas, args.max_sdtmig, args.max_indexes)
+    if args.warm is not None:
+        from adapters.odm_json.runners.run_batch import discover_studies
+
+        warm_up(args.warm or discover_studies(), args.env)
+
+    service = BlueprintService(
+        env=args.env, workers=args.workers, max_queue=args.max_queue, max_studies=args.max_studies, caches=caches
+    )
+    try:
+        asyncio.run(serve(service, host=args.host, port=args.port, socket_path=args.socket))
+    finally:
+        service.close()
+        if args.socket and Path(args.socket).exists():
+            os.unlink(args.socket)
+
+
+if __name__ == "__main__":
+    main()
+
+## -- End of Program Code -- ##
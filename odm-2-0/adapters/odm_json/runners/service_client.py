@@ -0,0 +1,117 @@
+"""
+Client for the local BaaS service (runners/serve.py), standard library only.
+
+    baas job --job scaffold --study VEXIN-03 --domains DM
+    baas job --status
+
+One ServiceClient keeps its HTTP connection open, so a caller submitting many
+jobs pays the connection setup once.
+"""
+import argparse
+import http.client
+import json
+import socket
+from typing import List, Optional
+
+# Where `baas serve` listens unless told otherwise
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+
+
+class _UnixHTTPConnection(http.client.HTTPConnection):
+    """HTTPConnection over a Unix socket."""
+
+    def __init__(self, socket_path: str, timeout: Optional[float] = None):
+        super().__init__("localhost", timeout=timeout)
+        self.socket_path = socket_path
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        if self.timeout is not None:
+            self.sock.settimeout(self.timeout)
+        self.sock.connect(self.socket_path)
+
+
+class ServiceClient:
+    """Submit jobs to a running service and read its status."""
+
+    def __init__(self, host: str = DEFAULT_HOST, port: int = DEFAULT_PORT,
+                 socket_path: Optional[str] = None, timeout: Optional[float] = None):
+        if socket_path:
+            self.connection = _UnixHTTPConnection(socket_path, timeout=timeout)
+        else:
+            self.connection = http.client.HTTPConnection(host, port, timeout=timeout)
+
+    def request(self, method: str, path: str, payload: Optional[dict] = None) -> tuple:
+        """(HTTP status, decoded JSON body) of one request."""
+        body = json.dumps(payload).encode("utf-8") if payload is not None else None
+        headers = {"Content-Type": "application/json"} if body is not None else {}
+        try:
+            self.connection.request(method, path, body=body, headers=headers)
+            response = self.connection.getresponse()
+        except (http.client.RemoteDisconnected, BrokenPipeError, ConnectionResetError):
+            # The server closed an idle keep-alive connection: reconnect once
+            self.connection.close()
+            self.connection.request(method, path, body=body, headers=headers)
+            response = self.connection.getresponse()
+        return response.status, json.loads(response.read() or b"{}")
+
+    def submit(self, job: str, study: str, env: Optional[str] = None,
+               domains: Optional[List[str]] = None, **options) -> dict:
+        """Run a job and return its result; raises RuntimeError when the service reports a failure."""
+        payload = {"job": job, "study": study, **options}
+        if env:
+            payload["env"] = env
+        if domains:
+            payload["domains"] = domains
+        status, body = self.request("POST", "/jobs", payload)
+        if status != 200:
+            raise RuntimeError(f"{job} for {study} failed ({status}): {body.get('error', body)}")
+        return body
+
+    def status(self) -> dict:
+        return self.request("GET", "/status")[1]
+
+    def close(self):
+        self.connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Submit a job to a running BaaS service.")
+    parser.add_argument("--job", help="convert, match, scaffold or run")
+    parser.add_argument("--study", help="Study folder name")
+    parser.add_argument("--env", default=None, help="Environment profile (default: the service's)")
+    parser.add_argument("--domains", nargs="+", default=None, help="Domains for scaffold/run (e.g. DM AE or all)")
+    parser.add_argument("--force", action="store_true", help="run: rebuild every stage")
+    parser.add_argument("--status", action="store_true", help="Print the service status and cache statistics")
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--socket", default=None, help="Unix socket of the service")
+    args = parser.parse_args()
+
+    with ServiceClient(args.host, args.port, socket_path=args.socket) as client:
+        if args.status:
+            print(json.dumps(client.status(), indent=2))
+            return
+        if not (args.job and args.study):
+            parser.error("--job and --study are required (or --status)")
+        options = {"force": True} if args.force else {}
+        try:
+            result = client.submit(args.job, args.study, env=args.env, domains=args.domains, **options)
+        except RuntimeError as exc:
+            print(f"❌ {exc}")
+            raise SystemExit(1)
+        print(f"✅ {args.job} for {args.study} finished in {result['seconds']:.3f}s")
+        print(json.dumps(result["result"], indent=2, default=str))
+
+
+if __name__ == "__main__":
+    main()
+
+## -- End of Program Code -- ##
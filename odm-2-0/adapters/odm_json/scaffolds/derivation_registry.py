@@ -0,0 +1,119 @@
+"""
+Derivation snippets for the SQL scaffolder, read once per run.
+
+overrides/standard and overrides/custom/<domain> are each listed once, the
+derive_<var>.sql and prep_input_cte.sql snippets are kept in memory (keyed by
+path and mtime, so a long-lived process re-reads only files that changed), and
+variables listed in the derivation configs without a snippet are reported in a
+single pass instead of once per domain.
+"""
+import logging
+import os
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+SNIPPET_SUFFIX = ".sql"
+PREP_CTE_NAME = "prep_input_cte"
+
+# path -> (mtime_ns, stripped content), shared by every registry in the process
+_SNIPPETS: Dict[Path, Tuple[int, str]] = {}
+
+
+def read_snippet(path: Path, mtime_ns: Optional[int] = None) -> str:
+    """Stripped content of a snippet file, from memory unless it changed on disk."""
+    path = Path(path)
+    mtime_ns = mtime_ns if mtime_ns is not None else path.stat().st_mtime_ns
+    cached = _SNIPPETS.get(path)
+    if cached and cached[0] == mtime_ns:
+        return cached[1]
+    with open(path, "r") as f:
+        content = f.read().strip()
+    _SNIPPETS[path] = (mtime_ns, content)
+    return content
+
+
+def scan_snippets(directory: Path) -> Tuple[Dict[str, Tuple[str, Path]], Dict[str, Path]]:
+    """
+    One listing of a snippet directory: ({stem: (content, path)} for .sql files,
+    {stem: path} for files with any other suffix).
+    """
+    snippets, other = {}, {}
+    try:
+        entries = list(os.scandir(directory))
+    except (FileNotFoundError, NotADirectoryError):
+        return snippets, other
+    for entry in sorted(entries, key=lambda e: e.name):
+        if not entry.is_file():
+            continue
+        path = Path(directory) / entry.name
+        if path.suffix == SNIPPET_SUFFIX:
+            snippets[path.stem.lower()] = (read_snippet(path, entry.stat().st_mtime_ns), path)
+        else:
+            other[path.stem.lower()] = path
+    return snippets, other
+
+
+class DerivationRegistry:
+    """
+    In-memory derivation snippets for a set of domains: the shared standard
+    derivations and each domain's custom derivations and prep_input_cte.
+    """
+
+    def __init__(self, overrides_dir: Path, configs: Tuple[dict, dict], domains: List[str]):
+        standard_config, custom_config = configs
+        self.overrides_dir = Path(overrides_dir)
+        self.standard_vars = {v.upper() for v in standard_config.get("standard_derivations", []) or []}
+        custom_lists = custom_config.get("custom_derivations", {}) or {}
+        self.custom_vars = {d.upper(): {v.upper() for v in custom_lists.get(d.upper(), []) or []} for d in domains}
+
+        self.standard, self._standard_other = scan_snippets(self.overrides_dir / "standard")
+        self.custom, self._custom_other = {}, {}
+        for domain in self.custom_vars:
+            self.custom[domain], self._custom_other[domain] = scan_snippets(self.custom_dir(domain))
+
+    def custom_dir(self, domain: str) -> Path:
+        return self.overrides_dir / "custom" / domain.lower()
+
+    def standard_snippet(self, var: str) -> Optional[Tuple[str, Path]]:
+        """(content, path) of overrides/standard/derive_<var>.sql, or None."""
+        return self.standard.get(f"derive_{var.lower()}")
+
+    def custom_snippet(self, domain: str, var: str) -> Optional[Tuple[str, Path]]:
+        """(content, path) of overrides/custom/<domain>/derive_<var>.sql, or None."""
+        return self.custom.get(domain.upper(), {}).get(f"derive_{var.lower()}")
+
+    def prep_input_cte(self, domain: str) -> Optional[Tuple[str, Path]]:
+        return self.custom.get(domain.upper(), {}).get(PREP_CTE_NAME)
+
+    def missing(self) -> List[Tuple[str, str, Optional[Path]]]:
+        """
+        (scope, expected file, file found under another suffix) for every listed
+        derivation without a snippet; scope is "standard" or the domain.
+        """
+        missing = []
+        for var in sorted(self.standard_vars):
+            stem = f"derive_{var.lower()}"
+            if stem not in self.standard:
+                missing.append(("standard", stem + SNIPPET_SUFFIX, self._standard_other.get(stem)))
+        for domain in sorted(self.custom_vars):
+            for var in sorted(self.custom_vars[domain]):
+                stem = f"derive_{var.lower()}"
+                if stem not in self.custom[domain]:
+                    missing.append((domain, stem + SNIPPET_SUFFIX, self._custom_other[domain].get(stem)))
+        return missing
+
+    def report_missing(self):
+        """Log every listed-but-missing derivation snippet in one warning."""
+        missing = self.missing()
+        if not missing:
+            return
+        lines = []
+        for scope, name, other in missing:
+            hint = f" (found {other.name}; only {SNIPPET_SUFFIX} snippets are injected)" if other else ""
+            lines.append(f"  {scope}: {name}{hint}")
+        logging.warning(
+            f"⚠️ {len(missing)} derivation(s) listed but snippet file missing under {self.overrides_dir}:\n"
+            + "\n".join(lines)
+        )
+
+## -- End of Program Code -- ##
@@ -1,43 +1,41 @@
+from __future__ import annotations
+
 import argparse
 import logging
+import os
+import re
+import sys
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
-import pandas as pd
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple
 import yaml
 
+from adapters.odm_json.extractors.extract_clinical_data import CHANGES_TABLE, RAW_SCHEMA, raw_sources_path
+from adapters.odm_json.scaffolds.derivation_registry import DerivationRegistry
+from adapters.odm_json.utils.artifacts import artifact_paths, load_mapping
+from adapters.odm_json.utils.build_cache import code_digest, data_digest, directory_digests, file_digest, rows_digest
 from adapters.odm_json.utils.load_paths import load_paths
 
-# --- Argument Parser ---
-parser = argparse.ArgumentParser(description="Generate SQL scaffolded for SDTM domain.")
-parser.add_argument("--study", type=str, required=True, help="Study name")
-parser.add_argument("--env", type=str, default="dev", help="Environment profile (e.g. dev)")
-parser.add_argument("--domain", type=str, required=True, help="Target SDTM domain (e.g. DM)")
-args = parser.parse_args()
-
-# --- Load Paths ---
-paths = load_paths(study=args.study, env=args.env)
-domain = args.domain.upper()
-
-match_csv = Path(paths["match_output_csv"])
-output_dir = Path(paths["dbt_models_dir"])
-
-config_dir = Path(paths["config_dir"])
-overrides_dir = Path(paths["overrides_dir"])
-
-logging.basicConfig(level=logging.INFO, format="%(levelname)s: %(message)s")
+# pandas is imported by the functions that build frames; the rest only call DataFrame methods
+if TYPE_CHECKING:
+    import pandas as pd
 
 def load_yaml(path: Path):
     with open(path, "r") as f:
         return yaml.safe_load(f)
 
-def load_csv(path: Path):
-    return pd.read_csv(path)
+def mapping_frame(rows) -> pd.DataFrame:
+    """
+    Build the mapping DataFrame straight from match_odm_to_sdtm_all() rows (or the
+    columnar matcher's frame), typed the way pd.read_csv() would read the CSV back.
+    """
+    import numpy as np
+    import pandas as pd
 
-def read_sql_file(path: Path):
-    """Read a .sql file if it exists, return (content, path). Otherwise return (None, path)."""
-    if path.exists() and path.suffix == ".sql":
-        with open(path, "r") as f:
-            return f.read().strip(), path
-    return None, path
+    df = pd.DataFrame(rows).replace("", np.nan)
+    if "Ordinal" in df.columns:
+        df["Ordinal"] = pd.to_numeric(df["Ordinal"], errors="coerce")
+    return df
 
 def inject_variable_line(
     var: str,
@@ -46,11 +44,9 @@ def inject_variable_line(
     mapping_type: str,
     standard_deriv_vars: set,
     custom_deriv_vars: set,
-    custom_path: Path,
-    standard_path: Path,
+    registry: DerivationRegistry,
 ):
     var_upper = var.upper()
-    var_lower = var.lower()
     comment = ""
 
     if mapping_type == "Direct":
@@ -58,23 +54,20 @@ def inject_variable_line(
 
 
     if var_upper in standard_deriv_vars:
-        deriv_file = standard_path / f"derive_{var_lower}.sql"
-        deriv_code, used_path = read_sql_file(deriv_file)
+        deriv_code, used_path = registry.standard_snippet(var_upper) or (None, None)
         if deriv_code:
             logging.info(f"[{domain}] Injecting standard derivation for: {var_upper} from {used_path}")
             return f"    -- Injected standard: {used_path.name}\n    ,{deriv_code}"
         else:
-            logging.warning(f"[{domain}] Standard derivation listed but file missing: derive_{var_lower}.sql")
+            # Missing snippets are reported once per run by DerivationRegistry.report_missing()
             comment = f"  -- TODO: Standard derivation file missing for {var_upper}"
 
     if var_upper in custom_deriv_vars:
-        deriv_file = custom_path / f"derive_{var_lower}.sql"
-        deriv_code, used_path = read_sql_file(deriv_file)
+        deriv_code, used_path = registry.custom_snippet(domain, var_upper) or (None, None)
         if deriv_code:
             logging.info(f"[{domain}] Injecting custom derivation for: {var_upper} from {used_path}")
             return f"    -- Injected custom: {used_path.name}\n    ,{deriv_code}"
         else:
-            logging.warning(f"[{domain}] Custom derivation listed but file missing: derive_{var_lower}.sql")
             comment = f"  -- TODO: Custom derivation file missing for {var_upper}"
 
     if mapping_type == "Derived":
@@ -83,88 +76,636 @@ def inject_variable_line(
 
     return f"    ,NULL AS {var_upper}{comment}"
 
-def main():
-    df = load_csv(match_csv)
+def load_derivation_configs(paths: dict) -> Tuple[dict, dict]:
+    """Load (standard_derivations.yml, custom_derivations.yml) from the study config dir."""
+    config_dir = Path(paths["config_dir"])
     standard_config = load_yaml(config_dir / "standard_derivations.yml")
     custom_config = load_yaml(config_dir / "custom_derivations.yml")
+    return standard_config, custom_config
+
+def domain_rows(df: pd.DataFrame, domain: str) -> pd.DataFrame:
+    """Mapping rows whose SDTM_Domain is `domain` (SUPP-- rows belong to their own dataset)."""
+    return df[df["SDTM_Domain"].fillna("").str.upper() == domain.upper()]
+
+def domain_output_path(domain: str, paths: dict) -> Path:
+    return Path(paths["dbt_models_dir"]) / f"{domain.lower()}.sql"
+
+def supp_rows(df: pd.DataFrame, domain: str) -> pd.DataFrame:
+    """SUPPQUAL mapping rows of a parent domain (SDTM_Domain SUPP<domain>)."""
+    rows = domain_rows(df, f"SUPP{domain}")
+    return rows[rows["Mapping_Type"] == "SUPPQUAL"]
+
+def supp_output_path(domain: str, paths: dict) -> Path:
+    return Path(paths["dbt_models_dir"]) / f"supp{domain.lower()}.sql"
+
+def domain_outputs(df: pd.DataFrame, domain: str, paths: dict) -> List[Path]:
+    """Models scaffold_domain() writes for `domain`: the domain, then its SUPP-- model if it has qualifiers."""
+    outputs = [domain_output_path(domain, paths)]
+    if not supp_rows(df, domain).empty:
+        outputs.append(supp_output_path(domain, paths))
+    return outputs
+
+def raw_relation(domain: str, paths: dict, from_seed: bool = False) -> str:
+    """
+    Jinja relation the model reads raw data from: the ClinicalData table loaded by
+    extract_clinical_data when the study has a duckdb_path (unless from_seed), else
+    the raw_<domain> seed.
+    """
+    if paths.get("duckdb_path") and not from_seed:
+        return f"{{{{ source('{RAW_SCHEMA}', 'raw_{domain.lower()}') }}}}"
+    return f"{{{{ ref('raw_{domain.lower()}') }}}}"
+
+def seed_path(domain: str, paths: dict) -> Path:
+    return Path(paths["dbt_models_dir"]).parents[1] / "seeds" / f"raw_{domain.lower()}.csv"
+
+def seed_columns(domain: str, paths: dict) -> Optional[set]:
+    """Upper-cased header of the study's raw_<domain> seed, or None without one."""
+    path = seed_path(domain, paths)
+    if not path.exists():
+        return None
+    with open(path, "r", encoding="utf-8-sig") as f:
+        header = f.readline()
+    return {col.strip().strip('"').upper() for col in header.split(",") if col.strip()}
+
+def ingested_columns(domain: str, paths: dict) -> Optional[set]:
+    """
+    Upper-cased columns of odm_raw.raw_<domain> as declared by the last ingest, an
+    empty set when that table was not loaded, or None when nothing was declared yet.
+    """
+    path = raw_sources_path(paths)
+    if not path.exists():
+        return None
+    sources = load_yaml(path) or {}
+    for source in sources.get("sources", []):
+        for table in source.get("tables", []):
+            if table.get("name") == f"raw_{domain.lower()}":
+                if "columns" not in table:
+                    return None
+                return {col["name"].upper() for col in table["columns"]}
+    return set()
+
+_IDENTIFIER = re.compile(r"[A-Za-z_][A-Za-z0-9_]*")
+
+def referenced_columns(sql: str) -> set:
+    """Upper-cased identifiers and quoted names in model SQL, leaving out comments and AS aliases."""
+    sql = re.sub(r"--[^\n]*", "", sql)
+    sql = re.sub(r"\bAS\s+[A-Za-z_][A-Za-z0-9_]*", "", sql, flags=re.IGNORECASE)
+    return {name.upper() for name in _IDENTIFIER.findall(sql)}
+
+def reads_seed(domain: str, paths: dict, sql: str) -> bool:
+    """
+    Whether a domain keeps reading its raw_<domain> seed although ClinicalData is
+    ingested: when the seed has columns the model uses (directly or in derivation
+    snippets) that the ingested table lacks, e.g. PROJECT or PREVSTUDY.
+    """
+    if not paths.get("duckdb_path"):
+        return False
+    seed, ingested = seed_columns(domain, paths), ingested_columns(domain, paths)
+    if seed is None or ingested is None:
+        return False
+    missing = sorted((referenced_columns(sql) & seed) - ingested)
+    if missing:
+        logging.warning(
+            f"[{domain}] {RAW_SCHEMA}.raw_{domain.lower()} has no {', '.join(missing)}; "
+            f"the model reads the raw_{domain.lower()} seed instead"
+        )
+    return bool(missing)
+
+# How SUPP-- models turn qualifier columns into rows: DuckDB UNPIVOT, or UNION ALL for other adapters
+SUPP_UNPIVOT_MODES = ("unpivot", "union_all")
+
+SUPP_VARIABLES = ["STUDYID", "RDOMAIN", "USUBJID", "IDVAR", "IDVARVAL", "QNAM", "QLABEL", "QVAL", "QORIG", "QEVAL"]
+
+def supp_unpivot_mode(paths: dict) -> str:
+    mode = paths.get("supp_unpivot") or "unpivot"
+    if mode not in SUPP_UNPIVOT_MODES:
+        raise ValueError(f"supp_unpivot must be one of {', '.join(SUPP_UNPIVOT_MODES)}, got '{mode}'")
+    return mode
+
+def incremental_ingest(paths: dict) -> bool:
+    """ClinicalData is applied as deltas (see extract_clinical_data) when an ingest_state is configured."""
+    return bool(paths.get("duckdb_path") and paths.get("ingest_state"))
+
+MATERIALIZATIONS = ("view", "table", "incremental", "external")
+
+# Unique key of an incremental model unless the policy names one; "--" is the domain prefix
+DEFAULT_UNIQUE_KEY = ["STUDYID", "USUBJID", "--SEQ"]
+# Delete key when incremental runs reselect whole subjects (delta ingest)
+SUBJECT_KEY = ["STUDYID", "USUBJID"]
+
+def load_materialization_policy(paths: dict) -> dict:
+    """The study's materializations.yml ({"default": {...}, "domains": {DOMAIN: {...}}}), or {} if absent."""
+    policy_path = Path(paths["config_dir"]) / "materializations.yml"
+    if not policy_path.exists():
+        return {}
+    return load_yaml(policy_path) or {}
+
+def domain_policy(domain: str, paths: dict, policy: Optional[dict] = None, from_seed: bool = False) -> dict:
+    """
+    Effective materialization settings for a domain: the policy's default merged
+    with its domain entry. Without either, models are views, or incremental on
+    USUBJID when ClinicalData is ingested as deltas (and the model reads it rather
+    than its seed).
+    """
+    policy = load_materialization_policy(paths) if policy is None else policy
+    settings = {**(policy.get("default") or {}), **((policy.get("domains") or {}).get(domain.upper()) or {})}
+    if "materialized" not in settings:
+        if incremental_ingest(paths) and not from_seed:
+            settings = {"materialized": "incremental", "unique_key": ["USUBJID"], **settings}
+        else:
+            settings["materialized"] = "view"
+    if settings["materialized"] not in MATERIALIZATIONS:
+        raise ValueError(
+            f"[{domain}] Unknown materialization '{settings['materialized']}' (expected one of {', '.join(MATERIALIZATIONS)})"
+        )
+    return settings
+
+def _domain_columns(columns, domain: str, variables: List[str]) -> List[str]:
+    """Expand the "--" domain prefix and keep the columns the model actually has."""
+    expanded = [col.upper().replace("--", domain.upper(), 1) for col in columns or []]
+    missing = [col for col in expanded if col not in variables]
+    if missing:
+        logging.warning(f"[{domain}] Materialization columns not in the model, ignored: {', '.join(missing)}")
+    return [col for col in expanded if col in variables]
+
+def _jinja_value(value) -> str:
+    if isinstance(value, dict):
+        return "{" + ", ".join(f"{k!r}: {_jinja_value(v)}" for k, v in value.items()) + "}"
+    if isinstance(value, (list, tuple)):
+        return "[" + ", ".join(_jinja_value(v) for v in value) + "]"
+    return repr(value)
+
+def _one_line(sql: str) -> str:
+    """SQL without -- comments, on one line."""
+    return " ".join(re.sub(r"--[^\n]*", "", sql).split())
+
+def subjects_query(usubjid_line: Optional[str], from_clause: str, prep_cte_sql: Optional[str] = None) -> Optional[str]:
+    """
+    One-line query of the USUBJIDs a model currently produces from its raw input:
+    its own USUBJID select line (comments dropped) over its FROM clause. None when
+    the model has no USUBJID expression.
+    """
+    if not usubjid_line:
+        return None
+    expression = _one_line(usubjid_line).lstrip(",").strip()
+    if not expression or expression.upper().startswith("NULL AS"):
+        return None
+    query = f"SELECT {expression} {from_clause}"
+    if prep_cte_sql:
+        query = f"{_one_line(prep_cte_sql)} {query}"
+    return query
+
+def removed_subjects_hook(current_subjects: str) -> str:
+    """
+    pre_hook of an incremental model over delta ingests: when the last ingest
+    removed subjects, delete the rows whose USUBJID the raw data no longer
+    produces (current_subjects queries the ones it does). The changed-subject
+    filter never selects a removed subject, so delete+insert alone keeps them.
+    """
+    changes = f"{{{{ source('{RAW_SCHEMA}', '{CHANGES_TABLE}') }}}}"
+    return (
+        "{% if is_incremental() %}"
+        "DELETE FROM {{ this }}"
+        f" WHERE EXISTS (SELECT 1 FROM {changes} WHERE Change = 'remove')"
+        f" AND USUBJID IS NOT NULL"
+        f" AND USUBJID NOT IN (SELECT USUBJID FROM ({current_subjects}) WHERE USUBJID IS NOT NULL)"
+        "{% endif %}"
+    )
+
+def model_config(
+    domain: str,
+    paths: dict,
+    variables: List[str],
+    policy: Optional[dict] = None,
+    from_seed: bool = False,
+    current_subjects: Optional[str] = None,
+) -> Tuple[str, List[str]]:
+    """
+    The model's {{ config(...) }} line and its trailing lines (incremental filter,
+    ORDER BY) from the domain's materialization policy.
+
+    - incremental: unique_key (default STUDYID/USUBJID/--SEQ) with delete+insert;
+      with delta ingest only the subjects the last ingest touched are selected
+      (not for models reading their seed, which has no SubjectKey), so the
+      delete key is narrowed to STUDYID/USUBJID: a subject's old rows go even
+      when it now has fewer records. A pre_hook drops the rows of removed
+      subjects (see removed_subjects_hook).
+    - sort: ORDER BY for table/incremental/external models, so DuckDB writes the
+      rows clustered and its zone maps can skip row groups on those columns.
+    - partition_by: Hive partitioning for external (Parquet) models; for other
+      materializations the columns lead the sort order instead.
+    """
+    settings = domain_policy(domain, paths, policy, from_seed)
+    materialized = settings["materialized"]
+    config = {"materialized": materialized}
+    trailing = []
+
+    sort = _domain_columns(settings.get("sort"), domain, variables)
+    partition_by = _domain_columns(settings.get("partition_by"), domain, variables)
+
+    if materialized == "incremental":
+        unique_key = _domain_columns(settings.get("unique_key", DEFAULT_UNIQUE_KEY), domain, variables)
+        if not unique_key:
+            raise ValueError(f"[{domain}] Incremental materialization needs a unique_key present in the model")
+        subject_filter = incremental_ingest(paths) and not from_seed
+        if subject_filter:
+            subject_key = [col for col in SUBJECT_KEY if col in variables]
+            if "USUBJID" not in subject_key:
+                raise ValueError(f"[{domain}] Incremental ingest replaces whole subjects and needs USUBJID in the model")
+            extra = [col for col in unique_key if col not in subject_key]
+            if extra and "unique_key" in settings:
+                logging.warning(
+                    f"[{domain}] unique_key narrowed to {', '.join(subject_key)} (dropped {', '.join(extra)}): "
+                    f"incremental runs replace whole subjects"
+                )
+            unique_key = subject_key
+        config["unique_key"] = unique_key[0] if len(unique_key) == 1 else unique_key
+        config["incremental_strategy"] = settings.get("incremental_strategy", "delete+insert")
+        if subject_filter:
+            changed = f"{{{{ source('{RAW_SCHEMA}', '{CHANGES_TABLE}') }}}}"
+            trailing += [
+                "{% if is_incremental() %}",
+                f'WHERE "SubjectKey" IN (SELECT "SubjectKey" FROM {changed})',
+                "{% endif %}",
+            ]
+            if current_subjects and "USUBJID" in variables:
+                config["pre_hook"] = removed_subjects_hook(current_subjects)
+
+    if materialized == "external":
+        config["format"] = settings.get("format", "parquet")
+        if partition_by:
+            config["options"] = {"partition_by": ", ".join(partition_by)}
+    else:
+        sort = partition_by + [col for col in sort if col not in partition_by]
+
+    if sort:
+        if materialized == "view":
+            logging.warning(f"[{domain}] sort/partition_by ignored for a view")
+        else:
+            trailing.append(f"ORDER BY {', '.join(sort)}")
+
+    rendered = ", ".join(f"{key}={_jinja_value(value)}" for key, value in config.items())
+    return f"{{{{ config({rendered}) }}}}", trailing
+
+def resolve_domains(df: pd.DataFrame, requested: List[str]) -> List[str]:
+    """
+    Expand a --domain request into a sorted list of domain codes. "all" selects every
+    SDTM_Domain in the mapping except the SUPP-- datasets derived from a parent domain.
+    """
+    requested = [d.strip().upper() for item in requested for d in item.split(",") if d.strip()]
+    if "ALL" not in requested:
+        return sorted(set(requested))
+
+    mapped = set(df["SDTM_Domain"].dropna().str.upper())
+    return sorted(d for d in mapped if not (d.startswith("SUPP") and d[4:] in mapped))
+
+def domain_input_digests(
+    df: pd.DataFrame,
+    domain: str,
+    paths: dict,
+    configs: Optional[Tuple[dict, dict]] = None,
+    policy: Optional[dict] = None,
+) -> dict:
+    """
+    Content digests of everything the scaffold for `domain` is rendered from:
+    its code (with the package modules it imports), its own mapping rows, its
+    derivation lists and its override files.
+    """
+    domain = domain.upper()
+    overrides_dir = Path(paths["overrides_dir"])
+    standard_config, custom_config = configs or load_derivation_configs(paths)
+
+    return {
+        "scaffold_sql": code_digest(sys.modules[__name__]),
+        "raw_relation": data_digest(raw_relation(domain, paths)),
+        "raw_seed": file_digest(seed_path(domain, paths)) if seed_path(domain, paths).exists() else "",
+        "raw_sources": file_digest(raw_sources_path(paths)) if raw_sources_path(paths).exists() else "",
+        "incremental_ingest": data_digest(incremental_ingest(paths)),
+        "materialization": data_digest(domain_policy(domain, paths, policy)),
+        "mapping_rows": rows_digest(domain_rows(df, domain).itertuples(index=False)),
+        "supp_rows": rows_digest(supp_rows(df, domain).itertuples(index=False)),
+        "supp_materialization": data_digest(domain_policy(f"SUPP{domain}", paths, policy)),
+        "supp_unpivot": data_digest(supp_unpivot_mode(paths)),
+        "standard_derivations": data_digest(standard_config.get("standard_derivations", [])),
+        "custom_derivations": data_digest(custom_config.get("custom_derivations", {}).get(domain, [])),
+        "standard_overrides": data_digest(directory_digests(overrides_dir / "standard")),
+        "custom_overrides": data_digest(directory_digests(overrides_dir / "custom" / domain.lower())),
+    }
+
+def first_row_lookup(df: pd.DataFrame) -> Dict[str, Tuple[str, str]]:
+    """
+    Map each upper-cased SDTM_Variable to (raw input name, mapping type) from its
+    first row in df, falling back to the variable name / "unmatched" for blanks.
+    """
+    first_rows = (
+        df.assign(_VAR=df["SDTM_Variable"].str.upper())
+        .dropna(subset=["_VAR"])
+        .drop_duplicates("_VAR", keep="first")
+    )
+    raw_names = first_rows["Raw_Input_Name"].where(first_rows["Raw_Input_Name"].notna(), first_rows["_VAR"])
+    mapping_types = first_rows["Mapping_Type"].where(first_rows["Mapping_Type"].notna(), "unmatched")
+    return dict(zip(first_rows["_VAR"], zip(raw_names, mapping_types)))
+
+def ordered_variables(df: pd.DataFrame, all_known_vars: set) -> List[str]:
+    """Mapping variables in Ordinal order, then any remaining known variables alphabetically."""
+    ordered_df = df.sort_values("Ordinal", na_position="last") if "Ordinal" in df.columns else df
+    ordered_vars = ordered_df["SDTM_Variable"].dropna().str.upper().tolist()
+    return ordered_vars + sorted(all_known_vars.difference(ordered_vars))
+
+def scaffold_domain(
+    df: pd.DataFrame,
+    domain: str,
+    paths: dict,
+    configs: Optional[Tuple[dict, dict]] = None,
+    policy: Optional[dict] = None,
+    registry: Optional[DerivationRegistry] = None,
+) -> Path:
+    """
+    Render the dbt model for `domain` from the mapping rows in df and return the
+    written path. Derivation snippets come from `registry` (scanned here if not given).
+    """
+    domain = domain.upper()
+    qualifiers = supp_rows(df, domain)
+    df = domain_rows(df, domain)
+    configs = configs or load_derivation_configs(paths)
+    standard_config, custom_config = configs
+    if registry is None:
+        registry = DerivationRegistry(Path(paths["overrides_dir"]), configs, [domain])
+        registry.report_missing()
 
     standard_deriv_vars = set(standard_config.get("standard_derivations", []))
-    domain = df["SDTM_Domain"].dropna().unique()[0].upper()
     custom_deriv_vars = set(custom_config.get("custom_derivations", {}).get(domain, []))
 
     mapping_vars = set(df["SDTM_Variable"].dropna().str.upper())
     all_known_vars = mapping_vars.union(standard_deriv_vars).union(custom_deriv_vars)
 
-    custom_path = overrides_dir / "custom" / domain.lower()
-    standard_path = overrides_dir / "standard"
+    ordered_vars = ordered_variables(df, all_known_vars)
+    lookup = first_row_lookup(df)
+
+    variable_lines = []
+    first = True
+    for var in ordered_vars:
+        # Raw input name and mapping type from the first mapping row for the variable
+        raw_var, mapping_type = lookup.get(var, (var, "unmatched"))
+
+        line = inject_variable_line(
+            var=var,
+            raw_var=raw_var,
+            domain=domain,
+            mapping_type=mapping_type,
+            standard_deriv_vars=standard_deriv_vars,
+            custom_deriv_vars=custom_deriv_vars,
+            registry=registry,
+        )
+
+        if first:
+            line = line.replace("    ,", "    ", 1)
+            first = False
+
+        variable_lines.append(line)
+
+    # The model and its SUPP-- model read the same relation: the seed when the ingested table lacks columns they use
+    prep_cte = registry.prep_input_cte(domain)
+    from_seed = reads_seed(
+        domain, paths,
+        "\n".join(variable_lines + [prep_cte[0] if prep_cte else ""] + [q["raw"] for q in supp_qualifiers(qualifiers)]),
+    )
+    relation = f"FROM {raw_relation(domain, paths, from_seed)}"
+    from_clause = f"FROM {domain.lower()}_input" if prep_cte else relation
+    usubjid_line = dict(zip(ordered_vars, variable_lines)).get("USUBJID")
+    config_line, trailing_lines = model_config(
+        domain, paths, ordered_vars, policy, from_seed,
+        current_subjects=subjects_query(usubjid_line, from_clause, prep_cte[0] if prep_cte else None),
+    )
 
     lines = []
-    lines.append("{{ config(materialized='view') }}")
+    lines.append(config_line)
     lines.append("")
 
-    prep_cte_file = custom_path / "prep_input_cte.sql"
-    if prep_cte_file.exists():
-        with open(prep_cte_file, "r") as f:
-            prep_cte_sql = f.read().strip()
+    if prep_cte:
+        prep_cte_sql, prep_cte_file = prep_cte
         lines.append("-- ============================================")
         lines.append("-- Step 1: Pre-Merge Input Data")
         lines.append("-- ============================================")
         lines.append("-- Injected from: " + str(prep_cte_file))
         lines.append(prep_cte_sql)
-        from_clause = f"FROM {domain.lower()}_input"
-    else:
-        from_clause = f"FROM {{{{ ref('raw_{domain.lower()}') }}}}"
 
     lines.append("")
     lines.append("-- ============================================")
     lines.append("-- Step 2: Build SDTM Domain Variables")
     lines.append("-- ============================================")
     lines.append("SELECT")
+    lines.extend(variable_lines)
 
-    ordered_df = df.sort_values("Ordinal", na_position="last") if "Ordinal" in df.columns else df
-    ordered_vars = ordered_df["SDTM_Variable"].dropna().str.upper().tolist()
+    lines.append("")
+    lines.append(from_clause)
+    lines.extend(trailing_lines)
 
-    for var in sorted(all_known_vars):
-        if var not in ordered_vars:
-            ordered_vars.append(var)
+    output_path = domain_output_path(domain, paths)
+    output_path.parent.mkdir(parents=True, exist_ok=True)
 
-    first = True
-    for var in ordered_vars:
-        # Find the row inmapping in the CSV for the SDTM variable
-        match_row = df[df["SDTM_Variable"].str.upper() == var].head(1)
+    with open(output_path, "w") as f:
+        f.write("\n".join(lines) + "\n")
 
-        # Get the raw input name and mapping type, or fall back to var name
-        raw_var = match_row["Raw_Input_Name"].values[0] if not match_row.empty and pd.notna(match_row["Raw_Input_Name"].values[0]) else var
-        mapping_type = match_row["Mapping_Type"].values[0] if not match_row.empty and pd.notna(match_row["Mapping_Type"].values[0]) else "unmatched"
+    logging.info(f"✅ Generated SQL scaffold → {output_path}")
 
-        line = inject_variable_line(
+    if not qualifiers.empty:
+        scaffold_supp_domain(df, qualifiers, domain, paths, configs, policy, registry, from_seed)
+    return output_path
+
+def _text(value) -> str:
+    return value.strip() if isinstance(value, str) else ""
+
+def _sql_literal(value: str) -> str:
+    return "'" + value.replace("'", "''") + "'" if value else "CAST(NULL AS VARCHAR)"
+
+def supp_qualifiers(rows: pd.DataFrame) -> List[Dict[str, str]]:
+    """One entry per QNAM (first mapping row wins): raw column, QLABEL, IDVAR and IDVARVAL."""
+    qualifiers = {}
+    for row in rows.to_dict("records"):
+        qnam = (_text(row.get("QNAM")) or _text(row.get("ODM_Variable"))).upper()
+        raw = _text(row.get("Raw_Input_Name")) or _text(row.get("ODM_Variable"))
+        if not qnam or not raw or qnam in qualifiers:
+            continue
+        qualifiers[qnam] = {
+            "QNAM": qnam,
+            "raw": raw,
+            "QLABEL": _text(row.get("QLABEL")) or _text(row.get("Alias_Label")),
+            "IDVAR": _text(row.get("IDVAR")),
+            "IDVARVAL": _text(row.get("IDVARVAL")),
+        }
+    return list(qualifiers.values())
+
+def scaffold_supp_domain(
+    parent_df: pd.DataFrame,
+    rows: pd.DataFrame,
+    domain: str,
+    paths: dict,
+    configs: Tuple[dict, dict],
+    policy: Optional[dict],
+    registry: DerivationRegistry,
+    from_seed: bool = False,
+) -> Path:
+    """
+    Render supp<domain>.sql: every SUPPQUAL column of the domain's raw table becomes
+    QNAM/QVAL rows in one UNPIVOT (or one UNION ALL statement), which also drops the
+    null and blank QVALs. STUDYID and USUBJID are rendered exactly as in the parent
+    model; QLABEL, IDVAR and IDVARVAL come from the mapping's SUPPQUAL aliases.
+    """
+    supp = f"SUPP{domain}"
+    qualifiers = supp_qualifiers(rows)
+    standard_config, custom_config = configs
+    standard_deriv_vars = set(standard_config.get("standard_derivations", []))
+    custom_deriv_vars = set(custom_config.get("custom_derivations", {}).get(domain, []))
+    lookup = first_row_lookup(parent_df) if not parent_df.empty else {}
+
+    key_lines = []
+    for var in ("STUDYID", "USUBJID"):
+        raw_var, mapping_type = lookup.get(var, (var, "unmatched"))
+        key_lines.append(inject_variable_line(
             var=var,
             raw_var=raw_var,
             domain=domain,
             mapping_type=mapping_type,
             standard_deriv_vars=standard_deriv_vars,
             custom_deriv_vars=custom_deriv_vars,
-            custom_path=custom_path,
-            standard_path=standard_path,
-        )
-
-        if first:
-            line = line.replace("    ,", "    ", 1)
-            first = False
-
-        lines.append(line)
-
+            registry=registry,
+        ))
+    key_lines[0] = key_lines[0].replace("    ,", "    ", 1)
+
+    relation = f"FROM {raw_relation(domain, paths, from_seed)}"
+    config_line, trailing_lines = model_config(
+        supp, paths, SUPP_VARIABLES, policy, from_seed, current_subjects=subjects_query(key_lines[1], relation)
+    )
+    # The incremental filter applies to the raw rows, the ORDER BY to the unpivoted result
+    filter_lines = [line for line in trailing_lines if not line.startswith("ORDER BY")]
+    order_lines = [line for line in trailing_lines if line.startswith("ORDER BY")]
+
+    input_cte = f"{supp.lower()}_input"
+    quoted = [f'"{q["QNAM"]}"' for q in qualifiers]
+    meta_cte = f"{supp.lower()}_qualifiers"
+
+    lines = [config_line, ""]
+    lines.append("-- ============================================")
+    lines.append(f"-- Step 1: Qualifier Columns of {domain}")
+    lines.append("-- ============================================")
+    lines.append(f"WITH {input_cte} AS (")
+    lines.append("SELECT")
+    lines.extend(key_lines)
+    for q, column in zip(qualifiers, quoted):
+        lines.append(f'    ,CAST(raw_{domain.lower()}.{q["raw"].lower()} AS VARCHAR) AS {column}')
+    lines.append(relation)
+    lines.extend(filter_lines)
+    lines.append("),")
+    lines.append(f"{meta_cte} (QNAM, QLABEL, IDVAR, IDVARVAL) AS (")
+    lines.append("    VALUES")
+    lines.append(",\n".join(
+        f"        ({_sql_literal(q['QNAM'])}, {_sql_literal(q['QLABEL'])}, "
+        f"{_sql_literal(q['IDVAR'])}, {_sql_literal(q['IDVARVAL'])})"
+        for q in qualifiers
+    ))
+    lines.append(")")
 
     lines.append("")
-    lines.append(from_clause)
-
-    output_path = output_dir / f"{domain.lower()}.sql" #f"scaffold_{domain.lower()}.sql"
-    output_path.parent.mkdir(parents=True, exist_ok=True)
-
+    lines.append("-- ============================================")
+    lines.append(f"-- Step 2: Build {supp} Rows")
+    lines.append("-- ============================================")
+    lines.append("SELECT")
+    lines.append("    q.STUDYID")
+    lines.append(f"    ,'{domain}' AS RDOMAIN")
+    lines.append("    ,q.USUBJID")
+    lines.append("    ,m.IDVAR")
+    lines.append("    ,m.IDVARVAL")
+    lines.append("    ,q.QNAM")
+    lines.append("    ,m.QLABEL")
+    lines.append("    ,q.QVAL")
+    lines.append("    ,'CRF' AS QORIG")
+    lines.append("    ,CAST(NULL AS VARCHAR) AS QEVAL")
+    lines.append("FROM (")
+    if supp_unpivot_mode(paths) == "unpivot":
+        # UNPIVOT leaves out NULL values, so empty qualifiers never become rows
+        lines.append(f"    UNPIVOT {input_cte}")
+        lines.append(f"    ON {', '.join(quoted)}")
+        lines.append("    INTO NAME QNAM VALUE QVAL")
+    else:
+        lines.append("\n    UNION ALL\n".join(
+            f"    SELECT STUDYID, USUBJID, '{q['QNAM']}' AS QNAM, {column} AS QVAL FROM {input_cte}"
+            for q, column in zip(qualifiers, quoted)
+        ))
+    lines.append(") q")
+    lines.append(f"JOIN {meta_cte} m ON m.QNAM = q.QNAM")
+    lines.append("WHERE TRIM(q.QVAL) <> ''")
+    lines.extend(order_lines)
+
+    output_path = supp_output_path(domain, paths)
     with open(output_path, "w") as f:
         f.write("\n".join(lines) + "\n")
 
-    logging.info(f"✅ Generated SQL scaffold → {output_path}")
+    logging.info(f"✅ Generated SQL scaffold → {output_path} ({len(qualifiers)} qualifiers)")
+    return output_path
+
+def scaffold_stats(output_path: Path) -> Dict[str, int]:
+    """Injected derivations and TODO placeholders in a generated model."""
+    with open(output_path, "r") as f:
+        text = f.read()
+    return {
+        "injected_standard": text.count("-- Injected standard:"),
+        "injected_custom": text.count("-- Injected custom:"),
+        "todo_variables": text.count("-- TODO:"),
+    }
+
+def scaffold_domains(
+    df: pd.DataFrame,
+    domains: List[str],
+    paths: dict,
+    workers: Optional[int] = None,
+    configs: Optional[Tuple[dict, dict]] = None,
+    policy: Optional[dict] = None,
+) -> Dict[str, Path]:
+    """
+    Render several domain models at once. The derivation configs are loaded and the
+    override snippets read once, the mapping is partitioned by SDTM_Domain, and each
+    partition is rendered on a process pool. Returns {domain: output path} in
+    sorted domain order.
+    """
+    domains = sorted({d.upper() for d in domains})
+    configs = configs or load_derivation_configs(paths)
+    registry = DerivationRegistry(Path(paths["overrides_dir"]), configs, domains)
+    registry.report_missing()
+    policy = load_materialization_policy(paths) if policy is None else policy
+    partitions = {domain: df.iloc[0:0] for domain in domains}
+    # SUPP-- rows travel with their parent domain, whose scaffold also writes the SUPP-- model
+    keys = df["SDTM_Domain"].fillna("").str.upper()
+    is_supp = keys.str.startswith("SUPP") & keys.str[4:].isin(domains)
+    keys = keys.where(~is_supp, keys.str[4:])
+    for domain, part in df.groupby(keys, sort=False):
+        if domain in partitions:
+            partitions[domain] = part
+
+    workers = min(workers or os.cpu_count() or 1, len(domains))
+    if workers <= 1:
+        return {d: scaffold_domain(partitions[d], d, paths, configs, policy, registry) for d in domains}
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {d: pool.submit(scaffold_domain, partitions[d], d, paths, configs, policy, registry) for d in domains}
+        return {d: futures[d].result() for d in domains}
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate SQL scaffolded for SDTM domain.")
+    parser.add_argument("--study", type=str, required=True, help="Study name")
+    parser.add_argument("--env", type=str, default="dev", help="Environment profile (e.g. dev)")
+    parser.add_argument(
+        "--domain", type=str, nargs="+", required=True,
+        help="Target SDTM domain(s) (e.g. DM, 'DM AE VS', DM,AE or all)"
+    )
+    parser.add_argument("--workers", type=int, default=None, help="Parallel workers (default: CPU count)")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s: %(message)s")
+    paths = load_paths(study=args.study, env=args.env)
+    df = load_mapping(artifact_paths(paths)["match_output"])
+    domains = resolve_domains(df, args.domain)
+    scaffold_domains(df, domains, paths, workers=args.workers)
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,171 @@
+"""
+Readers and writers for the runs/metadata intermediates.
+
+With `artifact_format: binary` in paths.yml, the metadata trees (CRF metadata,
+normalized SDTMIG) are written as msgpack and the mapping table as typed
+Parquet, next to where the JSON/CSV would go. Readers choose by suffix, so
+every stage reads whichever format the previous one wrote. The human-readable
+JSON/CSV stays available as an export (`export_text_artifacts: true`).
+"""
+import json
+import mmap
+import os
+from pathlib import Path
+from typing import Dict, List
+
+import msgpack
+
+from adapters.odm_json.utils.metadata_model import to_builtin
+
+ARTIFACT_FORMATS = ("text", "binary")
+
+# paths.yml key of each intermediate and its binary suffix
+ARTIFACTS = {
+    "crf_metadata": ("crf_metadata_json", ".msgpack"),
+    "sdtmig_normalized": ("sdtmig_normalized_json", ".msgpack"),
+    "match_output": ("match_output_csv", ".parquet"),
+}
+
+# Column types of the mapping table (column order is the match_odm_to_sdtm_all() row order)
+MAPPING_SCHEMA = {
+    "ItemOID": "VARCHAR",
+    "ODM_Variable": "VARCHAR",
+    "ODM_Domain": "VARCHAR",
+    "Raw_Input_Name": "VARCHAR",
+    "Alias_Context": "VARCHAR",
+    "Alias_Name": "VARCHAR",
+    "Alias_Label": "VARCHAR",
+    "Mapping_Type": "VARCHAR",
+    "Match_Type": "VARCHAR",
+    "Derived_Target": "VARCHAR",
+    "SDTM_Domain": "VARCHAR",
+    "SDTM_Variable": "VARCHAR",
+    "SDTM_Label": "VARCHAR",
+    "Ordinal": "INTEGER",
+    "Core": "VARCHAR",
+    "Role": "VARCHAR",
+    "Datatype": "VARCHAR",
+    "Description": "VARCHAR",
+    "CodeList": "VARCHAR",
+    "SDTM_Path": "VARCHAR",
+    "QNAM": "VARCHAR",
+    "QLABEL": "VARCHAR",
+    "IDVAR": "VARCHAR",
+    "IDVARVAL": "VARCHAR",
+    "Not_Submitted": "BOOLEAN",
+}
+
+
+# -- Paths
+def artifact_format(paths: dict) -> str:
+    fmt = paths.get("artifact_format") or "text"
+    if fmt not in ARTIFACT_FORMATS:
+        raise ValueError(f"artifact_format must be one of {ARTIFACT_FORMATS}, got '{fmt}'")
+    return fmt
+
+def artifact_paths(paths: dict) -> Dict[str, Path]:
+    """The file each intermediate is written to and read from, in the configured format."""
+    binary = artifact_format(paths) == "binary"
+    return {
+        name: Path(paths[key]).with_suffix(suffix) if binary else Path(paths[key])
+        for name, (key, suffix) in ARTIFACTS.items()
+    }
+
+def text_export_paths(paths: dict, export_text: bool = False) -> Dict[str, Path]:
+    """JSON/CSV copies to write alongside binary artifacts (none in text format)."""
+    if artifact_format(paths) != "binary" or not (export_text or paths.get("export_text_artifacts")):
+        return {}
+    return {name: Path(paths[key]) for name, (key, _) in ARTIFACTS.items()}
+
+def artifact_outputs(paths: dict, name: str, export_text: bool = False) -> List[Path]:
+    """Every file one intermediate is written to: the artifact and its JSON/CSV export, if any."""
+    exports = text_export_paths(paths, export_text)
+    return [artifact_paths(paths)[name]] + ([exports[name]] if name in exports else [])
+
+
+# -- Metadata trees
+def _replace_atomically(path: Path, payload: bytes):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_suffix(path.suffix + ".tmp")
+    with open(tmp_path, "wb") as f:
+        f.write(payload)
+    os.replace(tmp_path, path)
+
+def save_tree(data: dict, path: Path):
+    """Write a metadata tree (dicts or metadata_model records) as msgpack (.msgpack) or indented JSON."""
+    path = Path(path)
+    if path.suffix == ".msgpack":
+        _replace_atomically(path, msgpack.packb(data, use_bin_type=True, default=to_builtin))
+        return
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=2, default=to_builtin)
+
+def load_tree(path: Path) -> dict:
+    """
+    Read a metadata tree written by save_tree() as plain dicts; msgpack is decoded
+    straight from a memory map. metadata_model turns them back into records.
+    """
+    path = Path(path)
+    if path.suffix != ".msgpack":
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        return msgpack.unpackb(mm, raw=False)
+
+
+# -- Mapping table
+def _typed_select(relation: str) -> str:
+    """SELECT that casts a registered mapping frame to MAPPING_SCHEMA, blanks as NULL."""
+    columns = []
+    for col, sql_type in MAPPING_SCHEMA.items():
+        text = f'NULLIF(CAST("{col}" AS VARCHAR), \'\')'
+        if sql_type == "VARCHAR":
+            columns.append(f'{text} AS "{col}"')
+        else:
+            columns.append(f'TRY_CAST({text} AS {sql_type}) AS "{col}"')
+    return f"SELECT {', '.join(columns)} FROM {relation}"
+
+def save_mapping(matched, path: Path):
+    """
+    Write the mapping table (match rows or the columnar matcher's frame) as typed
+    Parquet (.parquet, through DuckDB) or in the matcher's CSV dialect.
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    is_frame = hasattr(matched, "columns")
+    if path.suffix != ".parquet":
+        if is_frame:
+            from adapters.odm_json.matchers.columnar_matcher import save_frame_to_csv
+
+            save_frame_to_csv(matched, path)
+        else:
+            from adapters.odm_json.matchers.match_odm_to_sdtm import save_to_csv
+
+            save_to_csv(matched, path)
+        return
+
+    import duckdb
+    import pandas as pd
+
+    frame = matched if is_frame else pd.DataFrame.from_records(matched, columns=list(MAPPING_SCHEMA))
+    tmp_path = path.with_suffix(".parquet.tmp")
+    with duckdb.connect() as con:
+        con.register("mapping_rows", frame)
+        con.execute(f"COPY ({_typed_select('mapping_rows')}) TO '{tmp_path.as_posix()}' (FORMAT PARQUET)")
+    os.replace(tmp_path, path)
+
+def load_mapping(path: Path):
+    """The mapping table as a DataFrame: typed from Parquet, or parsed from CSV."""
+    path = Path(path)
+    if path.suffix != ".parquet":
+        import pandas as pd
+
+        return pd.read_csv(path)
+
+    import duckdb
+
+    with duckdb.connect() as con:
+        return con.execute("SELECT * FROM read_parquet(?)", [path.as_posix()]).df()
+
+## -- End of Program Code -- ##
@@ -0,0 +1,144 @@
+import ast
+import functools
+import hashlib
+import json
+import math
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+
+def file_digest(path: Path) -> str:
+    """sha256 of a file's content, read in chunks."""
+    with open(path, "rb") as f:
+        return hashlib.file_digest(f, "sha256").hexdigest()
+
+
+def _imported_modules(path: Path) -> List[str]:
+    """Absolute module names a source file imports, including imports inside functions."""
+    with open(path, "rb") as f:
+        tree = ast.parse(f.read(), filename=str(path))
+    names = []
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            names += [alias.name for alias in node.names]
+        elif isinstance(node, ast.ImportFrom) and node.level == 0 and node.module:
+            # `from package import module` imports a submodule
+            names += [node.module] + [f"{node.module}.{alias.name}" for alias in node.names]
+    return names
+
+
+def _module_file(root: Path, name: str) -> Optional[Path]:
+    """The source file of module `name` under root, or None when it is not a module there."""
+    base = root.joinpath(*name.split("."))
+    for path in (base.with_suffix(".py"), base / "__init__.py"):
+        if path.is_file():
+            return path
+    return None
+
+
+@functools.lru_cache(maxsize=None)
+def code_digest(*modules) -> str:
+    """
+    sha256 of the given modules' source and of every module of their top-level
+    package they import, directly or through each other, so a change to a
+    helper (metadata_model.py, artifacts.py, ...) invalidates the stages built
+    on it. Cached per process, like the code it describes.
+    """
+    digests = {}
+    # __spec__ keeps the dotted name of a module run as __main__ (python -m ...)
+    pending = [(getattr(module.__spec__, "name", None) or module.__name__, Path(module.__file__)) for module in modules]
+    while pending:
+        name, path = pending.pop()
+        if name in digests:
+            continue
+        digests[name] = file_digest(path)
+        root = path.parents[name.count(".")]
+        package = name.split(".")[0]
+        for imported in _imported_modules(path):
+            imported_path = _module_file(root, imported) if imported.split(".")[0] == package else None
+            if imported_path is not None:
+                pending.append((imported, imported_path))
+    return data_digest(digests)
+
+
+def data_digest(data) -> str:
+    """sha256 of a JSON-serialisable value, independent of dict key order."""
+    payload = json.dumps(data, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _canonical_value(value) -> str:
+    if value is None or (isinstance(value, float) and math.isnan(value)):
+        return ""
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value)
+
+
+def rows_digest(rows: Iterable[Iterable]) -> str:
+    """
+    sha256 of tabular rows, independent of row order and of how the values were
+    typed (a CSV round trip turns "" into NaN and "3" into 3.0).
+    """
+    canonical = sorted(json.dumps([_canonical_value(v) for v in row]) for row in rows)
+    return data_digest(canonical)
+
+
+def directory_digests(directory: Path, recursive: bool = False) -> Dict[str, str]:
+    """Content digests of the files in a directory, keyed by path relative to it."""
+    directory = Path(directory)
+    if not directory.is_dir():
+        return {}
+    pattern = "**/*" if recursive else "*"
+    return {
+        str(path.relative_to(directory)): file_digest(path)
+        for path in sorted(directory.glob(pattern))
+        if path.is_file()
+    }
+
+
+class BuildCache:
+    """
+    Content-hash manifests for pipeline stages, one JSON file per stage under
+    manifest_dir. A stage is up to date when its input digests match the ones
+    recorded on its last run and its outputs still exist unchanged.
+    """
+
+    def __init__(self, manifest_dir: Path):
+        self.manifest_dir = Path(manifest_dir)
+
+    def manifest_path(self, stage: str) -> Path:
+        return self.manifest_dir / f"{stage}.json"
+
+    def load(self, stage: str) -> dict:
+        path = self.manifest_path(stage)
+        if not path.exists():
+            return {}
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def is_fresh(self, stage: str, inputs: Dict[str, str], outputs: List[Path]) -> bool:
+        manifest = self.load(stage)
+        if not manifest or manifest.get("inputs") != inputs:
+            return False
+        recorded = manifest.get("outputs", {})
+        for output in outputs:
+            output = Path(output)
+            if str(output) not in recorded or not output.exists():
+                return False
+            if file_digest(output) != recorded[str(output)]:
+                return False
+        return True
+
+    def record(self, stage: str, inputs: Dict[str, str], outputs: List[Path]):
+        manifest = {
+            "stage": stage,
+            "inputs": inputs,
+            "outputs": {str(Path(output)): file_digest(output) for output in outputs},
+        }
+        path = self.manifest_path(stage)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(manifest, f, indent=2, sort_keys=True)
+
+## -- End of Program Code -- ##
@@ -0,0 +1,162 @@
+import cProfile
+import json
+import os
+import resource
+import sys
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, Iterable, Optional
+
+
+# Seconds between RSS samples while a stage runs
+RSS_SAMPLE_INTERVAL = 0.01
+
+
+def peak_rss_mb() -> float:
+    """High-water resident set size of this process and its reaped children since it started, in MB."""
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+    scale = 1024 * 1024 if sys.platform == "darwin" else 1024
+    own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    return max(own, children) / scale
+
+
+def current_rss_mb() -> Optional[float]:
+    """Resident set size of this process right now, in MB; None where /proc is not available."""
+    try:
+        with open("/proc/self/statm", "rb") as f:
+            pages = int(f.read().split()[1])
+    except (OSError, IndexError, ValueError):
+        return None
+    return pages * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+
+
+class RssSampler:
+    """
+    Highest current RSS seen between start() and stop(), sampled on a daemon
+    thread every RSS_SAMPLE_INTERVAL seconds (and at both ends), so each stage
+    reports its own peak rather than the process high-water mark so far.
+    """
+
+    def __init__(self, interval: float = RSS_SAMPLE_INTERVAL):
+        self.interval = interval
+        self.peak: Optional[float] = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _sample(self):
+        rss = current_rss_mb()
+        if rss is not None and (self.peak is None or rss > self.peak):
+            self.peak = rss
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self._sample()
+
+    def start(self) -> "RssSampler":
+        self._sample()
+        if self.peak is not None:
+            self._thread = threading.Thread(target=self._run, name="rss-sampler", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self) -> Optional[float]:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        self._sample()
+        return self.peak
+
+
+def input_bytes(paths: Iterable) -> int:
+    """Total size of the input files that exist."""
+    total = 0
+    for path in paths:
+        if path and os.path.isfile(path):
+            total += os.path.getsize(path)
+    return total
+
+
+class Instrumentation:
+    """
+    Per-stage metrics for one pipeline run: wall time, CPU time, memory, input
+    bytes and stage-specific counters. Each finished stage is appended as one JSON
+    line to metrics_path (when set) and, with profile_dir, its cProfile stats are
+    dumped to <profile_dir>/<run_id>_<stage>.prof.
+
+    peak_rss_mb is the highest RSS of this process sampled during the stage (None
+    without /proc); max_rss_mb is the process high-water mark so far, children
+    included, which only grows from stage to stage.
+    """
+
+    def __init__(
+        self,
+        metrics_path: Optional[Path] = None,
+        profile_dir: Optional[Path] = None,
+        **context,
+    ):
+        self.metrics_path = Path(metrics_path) if metrics_path else None
+        self.profile_dir = Path(profile_dir) if profile_dir else None
+        self.run_id = uuid.uuid4().hex[:12]
+        self.context = context
+        self.records = []
+        self.timings: Dict[str, float] = {}
+
+    @contextmanager
+    def stage(self, name: str, inputs: Iterable = ()):
+        """
+        Measure the enclosed block as stage `name`. Yields a counters dict the stage
+        fills in (e.g. counters["item_defs"] = 120); inputs are the files it reads.
+        """
+        counters: Dict[str, int] = {}
+        profiler = cProfile.Profile() if self.profile_dir else None
+        sampler = RssSampler().start()
+        wall_start = time.perf_counter()
+        cpu_start = time.process_time()
+        status = "ok"
+        if profiler:
+            profiler.enable()
+        try:
+            yield counters
+        except BaseException:
+            status = "failed"
+            raise
+        finally:
+            if profiler:
+                profiler.disable()
+            wall = time.perf_counter() - wall_start
+            stage_rss = sampler.stop()
+            self.timings[name] = wall
+            record = {
+                "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+                "run_id": self.run_id,
+                **self.context,
+                "stage": name,
+                "status": status,
+                "wall_s": round(wall, 6),
+                "cpu_s": round(time.process_time() - cpu_start, 6),
+                "peak_rss_mb": round(stage_rss, 1) if stage_rss is not None else None,
+                "max_rss_mb": round(peak_rss_mb(), 1),
+                "input_bytes": input_bytes(inputs),
+                "counters": counters,
+            }
+            self.records.append(record)
+            self._write(record)
+            if profiler:
+                self.profile_dir.mkdir(parents=True, exist_ok=True)
+                profiler.dump_stats(self.profile_dir / f"{self.run_id}_{name}.prof")
+            rss = record["peak_rss_mb"] if record["peak_rss_mb"] is not None else record["max_rss_mb"]
+            print(f"⏱  {name:<10} {wall:8.3f}s  cpu {record['cpu_s']:7.3f}s  rss {rss:7.1f}MB")
+
+    def _write(self, record: dict):
+        if self.metrics_path is None:
+            return
+        self.metrics_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.metrics_path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(record) + "\n")
+
+## -- End of Program Code -- ##
@@ -0,0 +1,88 @@
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, Hashable
+
+_MISSING = object()
+
+
+class LRUCache:
+    """
+    Bounded, thread-safe map for the per-process caches (compiled schemas, SDTMIG
+    stores, candidate indexes, study configs). The least recently used entry is
+    dropped once more than max_entries are held; dropped values are not closed,
+    so a job still holding one can finish with it. get_or_load() builds a missing
+    entry once even when several threads ask for it at the same time.
+    """
+
+    def __init__(self, name: str, max_entries: int = 16):
+        self.name = name
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Hashable, object]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._loading: Dict[Hashable, threading.Lock] = {}
+        self.hits = self.misses = self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._entries
+
+    def get(self, key: Hashable, default=None):
+        with self._lock:
+            if key not in self._entries:
+                self.misses += 1
+                return default
+            self.hits += 1
+            self._entries.move_to_end(key)
+            return self._entries[key]
+
+    def __setitem__(self, key: Hashable, value):
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            self._evict()
+
+    def pop(self, key: Hashable, default=None):
+        with self._lock:
+            return self._entries.pop(key, default)
+
+    def get_or_load(self, key: Hashable, loader: Callable[[], object]):
+        value = self.get(key, _MISSING)
+        if value is not _MISSING:
+            return value
+        with self._lock:
+            key_lock = self._loading.setdefault(key, threading.Lock())
+        with key_lock:
+            # Another thread may have loaded it while this one waited
+            with self._lock:
+                if key in self._entries:
+                    self._entries.move_to_end(key)
+                    return self._entries[key]
+            value = loader()
+            self[key] = value
+        with self._lock:
+            self._loading.pop(key, None)
+        return value
+
+    def resize(self, max_entries: int):
+        with self._lock:
+            self.max_entries = max_entries
+            self._evict()
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        return {
+            "entries": len(self._entries), "max_entries": self.max_entries,
+            "hits": self.hits, "misses": self.misses, "evictions": self.evictions,
+        }
+
+    def _evict(self):
+        while len(self._entries) > max(self.max_entries, 0):
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+## -- End of Program Code -- ##
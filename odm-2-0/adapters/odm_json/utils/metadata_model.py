@@ -0,0 +1,281 @@
+"""
+Compact in-memory model of the ODM and SDTMIG metadata passed between stages.
+
+Definitions are slotted dataclasses instead of one dict per ItemDef, alias or
+CodeListItem: fields are named after the ODM attributes / JSON keys, repeated
+strings (OIDs, domain codes, variable names, data types, alias contexts) are
+interned, and a CodeList keeps its terms as two parallel tuples rather than a
+dict per term. Every record is also a read-only Mapping with the same keys as
+the JSON it is written as, so code that reads `item["OID"]` or
+`mdv.get("CodeLists", [])` works on records and on trees loaded from JSON.
+
+The flat rows of the match stage are NamedTuples: SdtmTarget is the SDTM half
+of a mapping row (one per SDTMIG variable) and MappingRow is a whole row, in
+MAPPING_SCHEMA column order.
+
+save_tree() writes records through to_builtin(), so the JSON and msgpack
+artifacts keep the layout the dict-based stages wrote, with one addition: every
+ItemDef carries a "Question" key (its Question text, or null), which the suggest
+stage reads back when the convert stage was skipped.
+"""
+import sys
+from collections.abc import Mapping
+from dataclasses import dataclass, fields
+from pathlib import Path
+from typing import Any, ClassVar, Dict, Iterator, List, NamedTuple, Optional, Tuple
+
+
+def intern(value: Optional[str]) -> Optional[str]:
+    return sys.intern(value) if isinstance(value, str) else value
+
+
+class Record(Mapping):
+    """Read-only Mapping view of a slotted dataclass, keyed like its JSON form."""
+
+    __slots__ = ()
+    KEYS: ClassVar[Tuple[str, ...]] = ()
+
+    def __getitem__(self, key: str):
+        if key not in self.KEYS:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.KEYS)
+
+    def __len__(self) -> int:
+        return len(self.KEYS)
+
+    def to_json(self) -> dict:
+        """The JSON object of this record (nested records are left for to_builtin)."""
+        return {key: self[key] for key in self.KEYS}
+
+
+def _keys(cls) -> type:
+    """Set KEYS to the dataclass fields, in declaration order."""
+    cls.KEYS = tuple(f.name for f in fields(cls))
+    return cls
+
+def to_builtin(obj: Any):
+    """json/msgpack `default` hook: records as their JSON objects."""
+    if isinstance(obj, Record):
+        return obj.to_json()
+    raise TypeError(f"Object of type {type(obj).__name__} is not serializable")
+
+
+# -- ODM
+@_keys
+@dataclass(slots=True, eq=False)
+class Alias(Record):
+    Context: Optional[str]
+    Name: Optional[str]
+
+    @classmethod
+    def from_json(cls, data: dict) -> "Alias":
+        return cls(intern(data.get("Context")), intern(data.get("Name")))
+
+
+@_keys
+@dataclass(slots=True, eq=False)
+class ItemDef(Record):
+    OID: str
+    Name: Optional[str]
+    DataType: Optional[str]
+    Length: Optional[str]
+    Format: Optional[str]
+    CodeListRef: Optional[str]
+    Derived: bool
+    Question: Optional[str]
+    Aliases: Tuple[Alias, ...]
+
+    @classmethod
+    def from_json(cls, data: dict) -> "ItemDef":
+        return cls(
+            intern(data["OID"]), intern(data.get("Name")), intern(data.get("DataType")), intern(data.get("Length")),
+            intern(data.get("Format")), intern(data.get("CodeListRef")), bool(data.get("Derived")),
+            data.get("Question"), tuple(Alias.from_json(a) for a in data.get("Aliases", [])),
+        )
+
+
+@dataclass(slots=True, eq=False)
+class CodeList(Record):
+    """A CodeList with its terms as parallel tuples; read as JSON, its "Items" are built on access."""
+
+    OID: str
+    Name: Optional[str]
+    DataType: Optional[str]
+    CodedValues: Tuple[Optional[str], ...]
+    Decodes: Tuple[Optional[str], ...]
+
+    KEYS: ClassVar[Tuple[str, ...]] = ("OID", "Name", "DataType", "Items")
+
+    @property
+    def Items(self) -> List[dict]:
+        return [{"CodedValue": value, "Decode": decode} for value, decode in self.terms()]
+
+    def terms(self) -> Iterator[Tuple[Optional[str], Optional[str]]]:
+        """(CodedValue, Decode) pairs in CodeList order."""
+        return zip(self.CodedValues, self.Decodes)
+
+    @classmethod
+    def from_json(cls, data: dict) -> "CodeList":
+        items = data.get("Items", [])
+        return cls(
+            intern(data["OID"]), intern(data.get("Name")), intern(data.get("DataType")),
+            tuple(intern(item.get("CodedValue")) for item in items), tuple(item.get("Decode") for item in items),
+        )
+
+
+@_keys
+@dataclass(slots=True, eq=False)
+class ItemRef(Record):
+    ItemOID: str
+    Mandatory: Optional[str]
+    RepeatKey: Optional[str]
+
+    @classmethod
+    def from_json(cls, data: dict) -> "ItemRef":
+        return cls(intern(data["ItemOID"]), intern(data.get("Mandatory")), intern(data.get("RepeatKey")))
+
+
+@_keys
+@dataclass(slots=True, eq=False)
+class ItemGroupDef(Record):
+    OID: str
+    Name: Optional[str]
+    Type: Optional[str]
+    Repeating: Optional[str]
+    ItemRefs: Tuple[ItemRef, ...]
+
+    @classmethod
+    def from_json(cls, data: dict) -> "ItemGroupDef":
+        return cls(
+            intern(data["OID"]), intern(data.get("Name")), intern(data.get("Type")), intern(data.get("Repeating")),
+            tuple(ItemRef.from_json(ref) for ref in data.get("ItemRefs", [])),
+        )
+
+
+@_keys
+@dataclass(slots=True, eq=False)
+class MetaDataVersion(Record):
+    OID: str
+    Name: str
+    ItemDefs: List[ItemDef]
+    CodeLists: List[CodeList]
+    ItemGroupDefs: List[ItemGroupDef]
+
+    @classmethod
+    def from_json(cls, data: dict) -> "MetaDataVersion":
+        return cls(
+            intern(data.get("OID", "MDV.UNKNOWN")), data.get("Name", ""),
+            [ItemDef.from_json(item) for item in data.get("ItemDefs", [])],
+            [CodeList.from_json(cl) for cl in data.get("CodeLists", [])],
+            [ItemGroupDef.from_json(ig) for ig in data.get("ItemGroupDefs", [])],
+        )
+
+
+@_keys
+@dataclass(slots=True, eq=False)
+class StudyMetadata(Record):
+    StudyOID: str
+    MetaDataVersion: MetaDataVersion
+
+    @classmethod
+    def from_json(cls, data: dict) -> "StudyMetadata":
+        return cls(intern(data["StudyOID"]), MetaDataVersion.from_json(data["MetaDataVersion"]))
+
+
+def study_metadata(tree) -> StudyMetadata:
+    """The CRF metadata as records, whether it was just parsed or loaded from JSON/msgpack."""
+    return tree if isinstance(tree, StudyMetadata) else StudyMetadata.from_json(tree)
+
+def load_study_metadata(path: Path) -> StudyMetadata:
+    from adapters.odm_json.utils.artifacts import load_tree
+
+    return StudyMetadata.from_json(load_tree(path))
+
+
+# -- SDTMIG
+@_keys
+@dataclass(slots=True, eq=False)
+class SdtmVariable(Record):
+    variable: str
+    label: Optional[str]
+    role: Optional[str]
+    datatype: Optional[str]
+    core: Optional[str]
+    description: Optional[str]
+    ordinal: Optional[str]
+    codelist: Optional[str]
+    sdtm_path: Optional[str]
+
+    @classmethod
+    def from_json(cls, data: dict) -> "SdtmVariable":
+        return cls(
+            intern(data["variable"]), data.get("label"), intern(data.get("role")), intern(data.get("datatype")),
+            intern(data.get("core")), data.get("description"), intern(data.get("ordinal")),
+            intern(data.get("codelist")), data.get("sdtm_path"),
+        )
+
+
+def sdtm_domain(data: dict) -> dict:
+    """A normalized SDTMIG domain entry with its variables as SdtmVariable records."""
+    return {
+        **data,
+        "variables": {
+            intern(var): meta if isinstance(meta, SdtmVariable) else SdtmVariable.from_json(meta)
+            for var, meta in data.get("variables", {}).items()
+        },
+    }
+
+def sdtm_metadata(tree: Dict[str, dict]) -> Dict[str, dict]:
+    """Normalized SDTMIG metadata ({domain: entry}) with SdtmVariable records."""
+    return {intern(domain): sdtm_domain(data) for domain, data in tree.items()}
+
+
+# -- Mapping rows
+class SdtmTarget(NamedTuple):
+    """The SDTMIG side of a mapping row, one per (domain, variable) of the IG."""
+
+    SDTM_Domain: str
+    SDTM_Variable: str
+    SDTM_Label: Any = ""
+    Ordinal: Any = ""
+    Core: Any = ""
+    Role: Any = ""
+    Datatype: Any = ""
+    Description: Any = ""
+    CodeList: Any = ""
+    SDTM_Path: Any = ""
+
+
+class MappingRow(NamedTuple):
+    """One row of the mapping table, in MAPPING_SCHEMA column order."""
+
+    ItemOID: str
+    ODM_Variable: str
+    ODM_Domain: str
+    Raw_Input_Name: str
+    Alias_Context: str
+    Alias_Name: str
+    Alias_Label: str
+    Mapping_Type: str
+    Match_Type: str
+    Derived_Target: str
+    SDTM_Domain: str
+    SDTM_Variable: str
+    SDTM_Label: Any
+    Ordinal: Any
+    Core: Any
+    Role: Any
+    Datatype: Any
+    Description: Any
+    CodeList: Any
+    SDTM_Path: Any
+    QNAM: str
+    QLABEL: str
+    IDVAR: str
+    IDVARVAL: str
+    Not_Submitted: bool
+
+## -- End of Program Code -- ##
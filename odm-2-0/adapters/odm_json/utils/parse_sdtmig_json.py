@@ -1,5 +1,7 @@
 import json
 
+from adapters.odm_json.utils.metadata_model import SdtmVariable, intern
+
 def extract_sdtm_metadata(input_json_path):
     """
     Extracts grouped SDTM variable metadata from a CDISC Library JSON export.
@@ -7,53 +9,54 @@ def extract_sdtm_metadata(input_json_path):
     {
         "DM": {
             "domain_label": "Demographics",
+            "domain_class": "Special-Purpose",
+            "structure": "One record per subject",
             "variables": {
-                "AGE": {...},
-                "SEX": {...},
+                "AGE": SdtmVariable(variable="AGE", label="Age", ...),
+                "SEX": SdtmVariable(...),
                 ...
             }
         },
         ...
     }
+    Variables are SdtmVariable records (utils.metadata_model), saved as the
+    same JSON objects the dict version produced.
     """
     with open(input_json_path, "r", encoding="utf-8") as f:
         sdtm_data = json.load(f)
 
-    # Build a map of dataset path → domain label
-    domain_label_lookup = {
-        dataset["_links"]["self"]["href"].split("/")[-1]: dataset["_links"]["self"]["title"]
-        for class_obj in sdtm_data.get("classes", [])
-        for dataset in class_obj.get("datasets", [])
-    }
-
     grouped = {}
     for class_obj in sdtm_data.get("classes", []):
         for dataset in class_obj.get("datasets", []):
-            domain_abbr = dataset["_links"]["self"]["href"].split("/")[-1]
-            domain_label = domain_label_lookup.get(domain_abbr, domain_abbr)
+            domain_abbr = intern(dataset["_links"]["self"]["href"].split("/")[-1])
 
             if domain_abbr not in grouped:
                 grouped[domain_abbr] = {
-                    "domain_label": domain_label,
+                    "domain_label": None,
                     "variables": {}
                 }
+            # Last dataset seen for a domain supplies its label
+            grouped[domain_abbr]["domain_label"] = dataset["_links"]["self"]["title"]
+            grouped[domain_abbr]["domain_class"] = class_obj.get("label") or class_obj.get("name")
+            grouped[domain_abbr]["structure"] = dataset.get("datasetStructure")
 
             for var in dataset.get("datasetVariables", []):
                 var_name = var.get("name")
                 if not var_name:
                     continue
 
-                grouped[domain_abbr]["variables"][var_name] = {
-                    "variable": var_name,
-                    "label": var.get("label"),
-                    "role": var.get("role"),
-                    "datatype": var.get("simpleDatatype"),
-                    "core": var.get("core"),
-                    "description": var.get("description"),
-                    "ordinal": var.get("ordinal"), 
-                    "codelist": var.get("_links", {}).get("codelist", [{}])[0].get("href") if var.get("_links", {}).get("codelist") else None,
-                    "sdtm_path": var.get("_links", {}).get("self", {}).get("href")
-                }
+                var_name = intern(var_name)
+                grouped[domain_abbr]["variables"][var_name] = SdtmVariable(
+                    variable=var_name,
+                    label=var.get("label"),
+                    role=intern(var.get("role")),
+                    datatype=intern(var.get("simpleDatatype")),
+                    core=intern(var.get("core")),
+                    description=var.get("description"),
+                    ordinal=intern(var.get("ordinal")),
+                    codelist=intern(var.get("_links", {}).get("codelist", [{}])[0].get("href")) if var.get("_links", {}).get("codelist") else None,
+                    sdtm_path=var.get("_links", {}).get("self", {}).get("href")
+                )
 
     return grouped
 
@@ -0,0 +1,146 @@
+import hashlib
+import os
+import pickle
+import tempfile
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+from lxml import etree
+
+from adapters.odm_json.utils.lru_cache import LRUCache
+
+XSD_NS = {"xs": "http://www.w3.org/2001/XMLSchema"}
+
+# Compiled schemas for this process, keyed by the absolute root XSD path and the
+# mtime_ns of every file in its schema set
+_SCHEMA_CACHE = LRUCache("schemas", max_entries=8)
+
+# Files of each root XSD's schema set (root, includes, imports) as last collected
+_SCHEMA_FILES: Dict[str, Tuple[str, ...]] = {}
+
+
+class _SchemaSetResolver(etree.Resolver):
+    """Serve xs:include / xs:import targets from an in-memory document set."""
+
+    def __init__(self, documents: Dict[str, bytes]):
+        super().__init__()
+        self.documents = documents
+
+    def resolve(self, url, pubid, context):
+        key = _normalize_url(url)
+        if key in self.documents:
+            return self.resolve_string(self.documents[key], context, base_url=key)
+        return None
+
+
+def _normalize_url(url: str) -> str:
+    if url.startswith("file://"):
+        url = url[len("file://"):]
+    return os.path.normpath(url)
+
+
+def collect_schema_set(xsd_path: Path) -> Dict[str, Tuple[int, bytes]]:
+    """Read the root XSD and every local schema it includes or imports, transitively."""
+    documents = {}
+    pending = [os.path.normpath(str(Path(xsd_path).resolve()))]
+    while pending:
+        path = pending.pop()
+        if path in documents:
+            continue
+        with open(path, "rb") as f:
+            content = f.read()
+        documents[path] = (os.stat(path).st_mtime_ns, content)
+
+        schema_doc = etree.fromstring(content, base_url=path)
+        for ref in schema_doc.iterfind("xs:include", XSD_NS):
+            pending.append(os.path.normpath(os.path.join(os.path.dirname(path), ref.get("schemaLocation"))))
+        for ref in schema_doc.iterfind("xs:import", XSD_NS):
+            location = ref.get("schemaLocation")
+            if location and "://" not in location:
+                pending.append(os.path.normpath(os.path.join(os.path.dirname(path), location)))
+    return documents
+
+
+def _mtime_ns(path: str) -> Optional[int]:
+    try:
+        return os.stat(path).st_mtime_ns
+    except FileNotFoundError:
+        return None
+
+
+def _is_fresh(documents: Dict[str, Tuple[int, bytes]]) -> bool:
+    for path, (mtime_ns, _) in documents.items():
+        if not os.path.exists(path) or os.stat(path).st_mtime_ns != mtime_ns:
+            return False
+    return True
+
+
+def _schema_set_path(abs_path: str, cache_dir: Path) -> Path:
+    """Pickle of one root XSD's schema set, named by its absolute path (two ODM.xsd never share one)."""
+    digest = hashlib.sha256(abs_path.encode("utf-8")).hexdigest()[:16]
+    return Path(cache_dir) / f"{Path(abs_path).stem}.{digest}.schemaset.pkl"
+
+
+def _load_schema_set(xsd_path: Path, cache_dir: Optional[Path]) -> Dict[str, Tuple[int, bytes]]:
+    """Return the resolved schema set, via the on-disk pickle when one is configured and fresh."""
+    if cache_dir is None:
+        return collect_schema_set(xsd_path)
+
+    abs_path = os.path.normpath(str(Path(xsd_path).resolve()))
+    pickle_path = _schema_set_path(abs_path, cache_dir)
+    if pickle_path.exists():
+        with open(pickle_path, "rb") as f:
+            documents = pickle.load(f)
+        # A set collected for another root (or from a moved checkout) is stale
+        if abs_path in documents and _is_fresh(documents):
+            return documents
+
+    documents = collect_schema_set(xsd_path)
+    pickle_path.parent.mkdir(parents=True, exist_ok=True)
+    # A unique temp name: batch workers and service threads may write the same set
+    with tempfile.NamedTemporaryFile(dir=pickle_path.parent, suffix=".tmp", delete=False) as f:
+        pickle.dump(documents, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(f.name, pickle_path)
+    return documents
+
+
+def load_schema(xsd_path: Path, cache_dir: Optional[Path] = None) -> etree.XMLSchema:
+    """
+    Return a compiled XMLSchema for xsd_path, compiling at most once per process
+    for a given file path and the mtimes of every XSD it includes or imports.
+
+    lxml cannot pickle a compiled XMLSchema, so when cache_dir is given the
+    resolved schema set (root XSD plus all includes/imports) is pickled there
+    instead and compiled from memory, skipping include resolution on disk.
+    """
+    abs_path = os.path.normpath(str(Path(xsd_path).resolve()))
+    if abs_path not in _SCHEMA_FILES:
+        _SCHEMA_FILES[abs_path] = tuple(sorted(_load_schema_set(Path(abs_path), cache_dir)))
+    key = (abs_path, tuple((path, _mtime_ns(path)) for path in _SCHEMA_FILES[abs_path]))
+    return _SCHEMA_CACHE.get_or_load(key, lambda: _compile_schema(abs_path, cache_dir))
+
+
+def _compile_schema(abs_path: str, cache_dir: Optional[Path]) -> etree.XMLSchema:
+    documents = _load_schema_set(Path(abs_path), cache_dir)
+    # An edit may have changed what the root includes
+    _SCHEMA_FILES[abs_path] = tuple(sorted(documents))
+    parser = etree.XMLParser(load_dtd=True, no_network=True)
+    parser.resolvers.add(_SchemaSetResolver({path: content for path, (_, content) in documents.items()}))
+    schema_doc = etree.fromstring(documents[abs_path][1], parser, base_url=abs_path)
+    return etree.XMLSchema(etree.ElementTree(schema_doc))
+
+
+def schema_set_digest(xsd_path: Path, cache_dir: Optional[Path] = None) -> str:
+    """sha256 over the content of the root XSD and everything it includes or imports."""
+    documents = _load_schema_set(Path(xsd_path).resolve(), cache_dir)
+    digest = hashlib.sha256()
+    for path in sorted(documents):
+        digest.update(hashlib.sha256(documents[path][1]).digest())
+    return digest.hexdigest()
+
+
+def clear_schema_cache():
+    _SCHEMA_CACHE.clear()
+    _SCHEMA_FILES.clear()
+
+## -- End of Program Code -- ##
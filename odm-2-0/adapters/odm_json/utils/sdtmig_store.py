@@ -0,0 +1,146 @@
+import mmap
+import os
+import struct
+import threading
+from pathlib import Path
+from typing import Dict, Iterable, Optional
+
+import msgpack
+
+from adapters.odm_json.utils.lru_cache import LRUCache
+from adapters.odm_json.utils.metadata_model import sdtm_domain, to_builtin
+from adapters.odm_json.utils.parse_sdtmig_json import extract_sdtm_metadata
+
+# File layout: MAGIC | uint64 index length | msgpack index | per-domain msgpack blobs
+# (the version is bumped whenever the normalized domain entries change shape)
+MAGIC = b"BAASIG2\n"
+_HEADER = struct.Struct("<Q")
+
+# Open stores for this process, keyed by absolute store path
+_OPEN_STORES = LRUCache("sdtmig_stores", max_entries=8)
+# Concurrent jobs must not rebuild the same store file at once
+_BUILD_LOCK = threading.Lock()
+
+
+def _source_stamp(source_json: Path) -> dict:
+    stat = os.stat(source_json)
+    return {"path": str(Path(source_json).resolve()), "size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+
+def build_store(source_json: Path, store_path: Path) -> Path:
+    """
+    Normalize a CDISC Library SDTMIG JSON export once and write it as an indexed
+    msgpack store: one blob per domain, addressed by (offset, length) in the index.
+    """
+    grouped = extract_sdtm_metadata(source_json)
+
+    blobs = []
+    domains = {}
+    offset = 0
+    for domain, domain_data in grouped.items():
+        blob = msgpack.packb(domain_data, use_bin_type=True, default=to_builtin)
+        domains[domain] = [offset, len(blob)]
+        blobs.append(blob)
+        offset += len(blob)
+
+    index = msgpack.packb({"source": _source_stamp(source_json), "domains": domains}, use_bin_type=True)
+
+    store_path = Path(store_path)
+    store_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = store_path.with_suffix(".tmp")
+    with open(tmp_path, "wb") as f:
+        f.write(MAGIC)
+        f.write(_HEADER.pack(len(index)))
+        f.write(index)
+        for blob in blobs:
+            f.write(blob)
+    os.replace(tmp_path, store_path)
+    print(f"✅ SDTMIG store built: {store_path} ({len(domains)} domains)")
+    return store_path
+
+
+class SdtmigStore:
+    """
+    Read-only, memory-mapped view of a store written by build_store(). Only the
+    domains that are asked for are decoded; each is cached after first use.
+    """
+
+    def __init__(self, store_path: Path):
+        self.store_path = Path(store_path)
+        with open(self.store_path, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        if self._mm[:len(MAGIC)] != MAGIC:
+            raise ValueError(f"Not an SDTMIG store: {self.store_path}")
+        (index_len,) = _HEADER.unpack_from(self._mm, len(MAGIC))
+        index_start = len(MAGIC) + _HEADER.size
+        index = msgpack.unpackb(self._mm[index_start:index_start + index_len], raw=False)
+
+        self.source = index["source"]
+        self._offsets = index["domains"]
+        self._data_start = index_start + index_len
+        self._decoded: Dict[str, dict] = {}
+
+    @property
+    def domains(self):
+        return list(self._offsets)
+
+    def is_current(self, source_json: Path) -> bool:
+        return self.source == _source_stamp(source_json)
+
+    def domain(self, domain: str) -> Optional[dict]:
+        """The normalized {"domain_label", ..., "variables"} entry for one domain (SdtmVariable records), or None."""
+        if domain not in self._decoded:
+            if domain not in self._offsets:
+                return None
+            offset, length = self._offsets[domain]
+            start = self._data_start + offset
+            self._decoded[domain] = sdtm_domain(msgpack.unpackb(self._mm[start:start + length], raw=False))
+        return self._decoded[domain]
+
+    def load_domains(self, domains: Optional[Iterable[str]] = None) -> Dict[str, dict]:
+        """
+        Subset of the normalized SDTMIG metadata (same shape as extract_sdtm_metadata())
+        for the given domains, in store order. All domains when domains is None.
+        """
+        wanted = self._offsets if domains is None else set(domains)
+        return {d: self.domain(d) for d in self._offsets if d in wanted}
+
+    def close(self):
+        self._mm.close()
+
+
+def open_store(source_json: Path, store_path: Path) -> SdtmigStore:
+    """
+    Return the store for an SDTMIG version, (re)building it when it is missing or
+    older than its source JSON. Stores are opened once per process and shared.
+    """
+    key = str(Path(store_path).resolve())
+    store = _OPEN_STORES.get(key)
+    if store is not None and store.is_current(source_json):
+        return store
+
+    with _BUILD_LOCK:
+        # Another job may have opened or rebuilt it while this one waited
+        store = _OPEN_STORES.get(key)
+        if store is not None and store.is_current(source_json):
+            return store
+        if Path(store_path).exists():
+            try:
+                store = SdtmigStore(store_path)
+            except ValueError:
+                # Written by an older store version: rebuilt below
+                store = None
+            if store is not None and not store.is_current(source_json):
+                store.close()
+                store = None
+        else:
+            store = None
+
+        if store is None:
+            build_store(source_json, store_path)
+            store = SdtmigStore(store_path)
+        _OPEN_STORES[key] = store
+    return store
+
+## -- End of Program Code -- ##
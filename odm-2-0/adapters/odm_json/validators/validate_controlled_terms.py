@@ -0,0 +1,236 @@
+"""
+Controlled-terminology checks of the raw ClinicalData tables.
+
+The CodeLists captured by parse_metadata() are indexed once: a set of coded
+values and a decode map per CodeList OID. Every raw column whose ItemDef has a
+CodeListRef is then checked in bulk inside DuckDB. Each raw table is unpivoted
+to (column, value) pairs and left-joined against the term table, so a study with
+hundreds of codelists and millions of values costs one grouped join per table
+rather than a lookup per cell. Optionally a decoded_<domain> view is created
+per table with a <COLUMN>_DECODE column beside each coded column.
+"""
+from __future__ import annotations
+
+import argparse
+import csv
+from pathlib import Path
+from typing import TYPE_CHECKING, Dict, FrozenSet, List, Optional, Tuple
+
+from adapters.odm_json.extractors.extract_clinical_data import RAW_SCHEMA, existing_tables, table_layouts
+from adapters.odm_json.utils.load_paths import load_paths
+from adapters.odm_json.utils.metadata_model import study_metadata
+
+if TYPE_CHECKING:
+    import duckdb
+
+TERMS_TABLE = "codelist_terms"
+
+# Invalid values kept per column in the summary
+MAX_EXAMPLES = 5
+
+REPORT_COLUMNS = ["table", "column", "codelist", "values_checked", "violations", "distinct_invalid", "examples"]
+
+
+# -- CodeList Index
+class CodeListIndex:
+    """Coded values and decodes per CodeList OID from the extracted ODM metadata."""
+
+    def __init__(self, odm_json: dict):
+        mdv = study_metadata(odm_json).MetaDataVersion
+        self.names: Dict[str, str] = {}
+        self.terms: Dict[str, FrozenSet[str]] = {}
+        self.decodes: Dict[str, Dict[str, Optional[str]]] = {}
+        for code_list in mdv.CodeLists:
+            # The compact CodeList's parallel tuples, not its per-term "Items" dicts
+            decodes = {value: decode for value, decode in code_list.terms() if value is not None}
+            self.names[code_list.OID] = code_list.Name or code_list.OID
+            self.terms[code_list.OID] = frozenset(decodes)
+            self.decodes[code_list.OID] = decodes
+        self.item_codelists = {item.OID: item.CodeListRef for item in mdv.ItemDefs if item.CodeListRef}
+
+    def __len__(self) -> int:
+        return len(self.terms)
+
+    def rows(self) -> List[Tuple[str, str, Optional[str]]]:
+        """(CodeListOID, CodedValue, Decode) rows, the table the bulk checks join against."""
+        return [(oid, value, decode) for oid, decodes in self.decodes.items() for value, decode in decodes.items()]
+
+    def coded_columns(self, layouts: Dict[str, dict]) -> Dict[str, Dict[str, str]]:
+        """
+        {raw table: {column: CodeList OID}} for the columns whose ItemDef has a
+        CodeListRef to a known CodeList. Refs to undefined CodeLists are skipped.
+        """
+        columns: Dict[str, Dict[str, str]] = {}
+        for table, layout in layouts.items():
+            for items in layout["items"].values():
+                for item_oid, column in items.items():
+                    codelist = self.item_codelists.get(item_oid)
+                    if codelist in self.terms:
+                        columns.setdefault(table, {}).setdefault(column, codelist)
+        return columns
+
+
+# -- Bulk checks
+def _ident(name: str) -> str:
+    """A quoted SQL identifier; column names come from ItemDef Names."""
+    return '"' + name.replace('"', '""') + '"'
+
+def _literal(value: str) -> str:
+    """A quoted SQL string, for DDL such as CREATE VIEW that takes no bound parameters."""
+    return "'" + value.replace("'", "''") + "'"
+
+def _relation(table: str) -> str:
+    return f"{RAW_SCHEMA}.{_ident(table)}"
+
+def load_terms(con: duckdb.DuckDBPyConnection, index: CodeListIndex):
+    """Replace odm_raw.codelist_terms with the index's terms."""
+    import pandas as pd
+
+    con.execute(f"CREATE SCHEMA IF NOT EXISTS {RAW_SCHEMA}")
+    frame = pd.DataFrame.from_records(index.rows(), columns=["CodeListOID", "CodedValue", "Decode"])
+    con.register("_ct_terms", frame)
+    try:
+        con.execute(
+            f'CREATE OR REPLACE TABLE {RAW_SCHEMA}.{TERMS_TABLE} AS '
+            f'SELECT CAST("CodeListOID" AS VARCHAR) AS "CodeListOID", CAST("CodedValue" AS VARCHAR) AS "CodedValue", '
+            f'CAST("Decode" AS VARCHAR) AS "Decode" FROM _ct_terms'
+        )
+    finally:
+        con.unregister("_ct_terms")
+
+def check_table(con: duckdb.DuckDBPyConnection, table: str, columns: Dict[str, str]) -> List[dict]:
+    """Per-column violation summary for one raw table, computed in a single grouped join."""
+    casts = ", ".join(f"CAST({_ident(col)} AS VARCHAR) AS {_ident(col)}" for col in columns)
+    unpivot_on = ", ".join(_ident(col) for col in columns)
+    column_map = ", ".join("(?, ?)" for _ in columns)
+    params = [value for col, oid in columns.items() for value in (col, oid)]
+    rows = con.execute(f"""
+        WITH vals AS (
+            UNPIVOT (SELECT {casts} FROM {_relation(table)})
+            ON {unpivot_on} INTO NAME column_name VALUE value
+        ),
+        coded AS (SELECT * FROM (VALUES {column_map}) AS coded(column_name, codelist))
+        SELECT
+            v.column_name,
+            c.codelist,
+            count(*) AS values_checked,
+            count(*) FILTER (WHERE t."CodedValue" IS NULL) AS violations,
+            count(DISTINCT v.value) FILTER (WHERE t."CodedValue" IS NULL) AS distinct_invalid,
+            list(DISTINCT v.value ORDER BY v.value) FILTER (WHERE t."CodedValue" IS NULL) AS invalid
+        FROM vals v
+        JOIN coded c USING (column_name)
+        LEFT JOIN {RAW_SCHEMA}.{TERMS_TABLE} t
+            ON t."CodeListOID" = c.codelist AND t."CodedValue" = v.value
+        GROUP BY v.column_name, c.codelist
+        ORDER BY v.column_name
+    """, params).fetchall()
+    return [
+        {
+            "table": table,
+            "column": column,
+            "codelist": codelist,
+            "values_checked": checked,
+            "violations": violations,
+            "distinct_invalid": distinct_invalid,
+            "examples": "|".join((invalid or [])[:MAX_EXAMPLES]),
+        }
+        for column, codelist, checked, violations, distinct_invalid, invalid in rows
+    ]
+
+def create_decoded_view(con: duckdb.DuckDBPyConnection, table: str, columns: Dict[str, str]):
+    """odm_raw.decoded_<domain>: the raw table plus a <COLUMN>_DECODE column per coded column."""
+    view = table.replace("raw_", "decoded_", 1)
+    decodes, joins = [], []
+    for n, (col, oid) in enumerate(columns.items()):
+        decodes.append(f'd{n}."Decode" AS {_ident(f"{col}_DECODE")}')
+        joins.append(
+            f"LEFT JOIN {RAW_SCHEMA}.{TERMS_TABLE} d{n} "
+            f'ON d{n}."CodeListOID" = {_literal(oid)} AND d{n}."CodedValue" = CAST(r.{_ident(col)} AS VARCHAR)'
+        )
+    con.execute(
+        f"CREATE OR REPLACE VIEW {_relation(view)} AS "
+        f"SELECT r.*, {', '.join(decodes)} FROM {_relation(table)} r {' '.join(joins)}"
+    )
+
+def validate_controlled_terms(
+    con: duckdb.DuckDBPyConnection, odm_json: dict, decode: bool = False
+) -> List[dict]:
+    """
+    Check every coded raw column against its CodeList and return one summary row
+    per column; with decode, also create the decoded_<domain> views.
+    """
+    index = CodeListIndex(odm_json)
+    coded = index.coded_columns(table_layouts(odm_json))
+    present = existing_tables(con)
+    load_terms(con, index)
+
+    summary = []
+    for table in sorted(coded):
+        if table not in present:
+            continue
+        summary.extend(check_table(con, table, coded[table]))
+        if decode:
+            create_decoded_view(con, table, coded[table])
+    return summary
+
+
+# -- Reporting
+def write_report(summary: List[dict], report_path: Path):
+    report_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(report_path, "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=REPORT_COLUMNS)
+        writer.writeheader()
+        writer.writerows(summary)
+
+def print_summary(summary: List[dict]):
+    failing = [row for row in summary if row["violations"]]
+    checked = sum(row["values_checked"] for row in summary)
+    if not failing:
+        print(f"✅ Controlled terminology: {checked} values in {len(summary)} coded columns, no violations")
+        return
+    print(f"⚠️  Controlled terminology: {sum(r['violations'] for r in failing)} of {checked} values outside their CodeList")
+    for row in failing:
+        print(
+            f"   {row['table']}.{row['column']:<12} {row['codelist']:<16} "
+            f"{row['violations']:>8} / {row['values_checked']:<8} e.g. {row['examples']}"
+        )
+
+def check_study_terminology(paths: dict, odm_json: dict, decode: Optional[bool] = None) -> List[dict]:
+    """Run the checks against the study DuckDB file; write ct_report when configured."""
+    import duckdb
+
+    decode = paths.get("ct_decode", False) if decode is None else decode
+    with duckdb.connect(str(paths["duckdb_path"])) as con:
+        summary = validate_controlled_terms(con, odm_json, decode=decode)
+
+    print_summary(summary)
+    if paths.get("ct_report"):
+        write_report(summary, Path(paths["ct_report"]))
+        print(f"✅ Terminology report written to {paths['ct_report']}")
+    return summary
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Check raw ClinicalData columns against their ODM CodeLists."
+    )
+    parser.add_argument("--study", required=True, help="Study folder name")
+    parser.add_argument("--env", default="dev", help="Environment name in paths.yml (e.g., dev)")
+    parser.add_argument(
+        "--decode", action="store_true", help="Also create odm_raw.decoded_<domain> views with decoded values"
+    )
+    args = parser.parse_args()
+
+    from adapters.odm_json.utils.artifacts import artifact_paths
+    from adapters.odm_json.utils.metadata_model import load_study_metadata
+
+    paths = load_paths(study=args.study, env=args.env)
+    if not paths.get("duckdb_path"):
+        parser.error("No duckdb_path configured in paths.yml; run the ingest stage first")
+    odm_json = load_study_metadata(artifact_paths(paths)["crf_metadata"])
+    check_study_terminology(paths, odm_json, decode=args.decode or None)
+
+
+if __name__ == "__main__":
+    main()
+
+## -- End of Program Code -- ##
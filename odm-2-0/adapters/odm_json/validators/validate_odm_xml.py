@@ -0,0 +1,192 @@
+"""
+Streamed, parallel XSD validation for large ODM-XML exports.
+
+SubjectData and ClinicalData are global elements of the ODM 2.0 schema, so
+ClinicalData can be validated in pieces: the file is read once with lxml
+iterparse, SubjectData subtrees are serialized into chunks wrapped in their
+own <ClinicalData> element and validated on a process pool, and the remaining
+skeleton (Study, MetaDataVersion, AdminData, emptied ClinicalData) is validated
+as a document in the parent. Files that passed are recorded by content hash,
+one marker file per export so concurrent runs never rewrite a shared file.
+"""
+import json
+import os
+import tempfile
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import List, Optional
+
+from lxml import etree
+
+from adapters.odm_json.utils.build_cache import file_digest
+from adapters.odm_json.utils.schema_cache import load_schema, schema_set_digest
+
+ODM_NS = "http://www.cdisc.org/ns/odm/v2.0"
+SUBJECT_TAG = f"{{{ODM_NS}}}SubjectData"
+CLINICAL_TAG = f"{{{ODM_NS}}}ClinicalData"
+
+# Registry of exports that passed validation, kept next to the pickled schema sets:
+# one <export digest>.json marker per export
+REGISTRY_NAME = "validated_exports"
+
+# Errors kept per chunk and reported in total
+MAX_ERRORS = 20
+
+
+# -- Validated-file registry
+def _marker_path(xml_digest: str, cache_dir: Optional[Path]) -> Optional[Path]:
+    return Path(cache_dir) / REGISTRY_NAME / f"{xml_digest}.json" if cache_dir else None
+
+def is_validated(xml_digest: str, xsd_digest: str, cache_dir: Optional[Path]) -> bool:
+    """True when this exact export already passed against this exact schema set."""
+    path = _marker_path(xml_digest, cache_dir)
+    if path is None or not path.exists():
+        return False
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f).get("xsd") == xsd_digest
+
+def record_validated(xml_path: Path, xml_digest: str, xsd_digest: str, cache_dir: Optional[Path]):
+    """
+    Write the export's marker through a uniquely named temp file, so batch
+    workers and service threads recording at the same time cannot clobber
+    each other.
+    """
+    path = _marker_path(xml_digest, cache_dir)
+    if path is None:
+        return
+    entry = {
+        "xsd": xsd_digest,
+        "file": Path(xml_path).name,
+        "bytes": os.path.getsize(xml_path),
+        "validated_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+    }
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with tempfile.NamedTemporaryFile("w", encoding="utf-8", dir=path.parent, suffix=".tmp", delete=False) as f:
+        json.dump(entry, f, indent=2)
+    os.replace(f.name, path)
+
+
+# -- Chunk validation (runs in pool workers)
+def _error_lines(error_log, where: str) -> List[str]:
+    return [f"{where} line {e.line}: {e.message}" for e in list(error_log)[:MAX_ERRORS]]
+
+def validate_chunk(xsd_path: str, cache_dir: Optional[str], wrapper: bytes, subjects: List[bytes], first_key: str) -> List[str]:
+    """Validate serialized SubjectData elements inside one <ClinicalData> wrapper; return error lines."""
+    schema = load_schema(Path(xsd_path), cache_dir=Path(cache_dir) if cache_dir else None)
+    doc = etree.fromstring(wrapper + b"".join(subjects) + b"</ClinicalData>", etree.XMLParser(huge_tree=True))
+    if schema.validate(doc):
+        return []
+    return _error_lines(schema.error_log, f"SubjectData chunk from {first_key}:")
+
+def _wrapper_open(clinical) -> bytes:
+    """Opening tag of a ClinicalData element with its attributes and namespaces."""
+    shell = etree.Element(clinical.tag, dict(clinical.attrib), nsmap=clinical.nsmap)
+    return etree.tostring(shell)[:-2] + b">"
+
+
+# -- Streamed validation
+def validate_xml_streaming(
+    xml_path: Path,
+    xsd_path: Path,
+    cache_dir: Optional[Path] = None,
+    workers: Optional[int] = None,
+    chunk_bytes: int = 8 * 1024 * 1024,
+    force: bool = False,
+) -> dict:
+    """
+    Validate an ODM-XML export against its XSD without holding ClinicalData in
+    memory, spreading SubjectData chunks of ~chunk_bytes over a process pool.
+
+    An export whose content hash is already in the registry under cache_dir is
+    not validated again (unless force). Raises ValueError on the first failing
+    run with up to MAX_ERRORS messages; returns {"cached", "bytes", "seconds",
+    "subjects", "chunks"} otherwise.
+    """
+    xml_path, xsd_path = Path(xml_path), Path(xsd_path)
+    start = time.perf_counter()
+    size = os.path.getsize(xml_path)
+    xml_digest = file_digest(xml_path)
+    xsd_digest = schema_set_digest(xsd_path, cache_dir)
+
+    if not force and is_validated(xml_digest, xsd_digest, cache_dir):
+        print(f"✅ XML file {xml_path.name} unchanged since last validation against {xsd_path.name}, skipping")
+        return {"cached": True, "bytes": size, "seconds": time.perf_counter() - start, "subjects": 0, "chunks": 0}
+
+    # Compile in the parent first: forked workers inherit the compiled schema
+    schema = load_schema(xsd_path, cache_dir=cache_dir)
+    workers = workers or os.cpu_count() or 1
+    errors: List[str] = []
+    in_flight = deque()
+    subjects = chunks = 0
+
+    def collect(block: bool):
+        while in_flight and (block or in_flight[0].done() or len(in_flight) >= workers * 2):
+            errors.extend(in_flight.popleft().result())
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        chunk, chunk_size, first_key, wrapper = [], 0, None, None
+
+        def submit():
+            nonlocal chunk, chunk_size, first_key, chunks
+            if chunk:
+                in_flight.append(pool.submit(
+                    validate_chunk, str(xsd_path), str(cache_dir) if cache_dir else None, wrapper, chunk, first_key
+                ))
+                chunks += 1
+                chunk, chunk_size, first_key = [], 0, None
+                collect(block=False)
+
+        root = None
+        # Only ClinicalData/SubjectData events reach Python; lxml filters the rest in C
+        for event, elem in etree.iterparse(
+            str(xml_path), events=("start", "end"), tag=(CLINICAL_TAG, SUBJECT_TAG), huge_tree=True
+        ):
+            if root is None:
+                root = elem.getroottree().getroot()
+            if event == "start":
+                if elem.tag == CLINICAL_TAG:
+                    submit()
+                    wrapper = _wrapper_open(elem)
+                continue
+            if elem.tag != SUBJECT_TAG:
+                continue
+
+            if workers == 1:
+                # No pool to feed: validate the subtree in place, skipping the serialize/re-parse
+                if not schema.validate(elem):
+                    errors.extend(_error_lines(schema.error_log, f"SubjectData {elem.get('SubjectKey')}:"))
+                subjects += 1
+                elem.getparent().remove(elem)
+                continue
+
+            data = etree.tostring(elem)
+            chunk.append(data)
+            chunk_size += len(data)
+            first_key = first_key or elem.get("SubjectKey")
+            subjects += 1
+            # Detach the subject so only the document skeleton stays in memory
+            elem.getparent().remove(elem)
+            if chunk_size >= chunk_bytes:
+                submit()
+        submit()
+
+        # Everything except SubjectData: headers, metadata, admin/reference data
+        if not schema.validate(etree.ElementTree(root)):
+            errors.extend(_error_lines(schema.error_log, "document skeleton:"))
+        collect(block=True)
+
+    seconds = time.perf_counter() - start
+    if errors:
+        shown = "\n".join(errors[:MAX_ERRORS])
+        raise ValueError(f"XML validation failed ({len(errors)} errors):\n{shown}")
+
+    record_validated(xml_path, xml_digest, xsd_digest, cache_dir)
+    print(
+        f"✅ XML file {xml_path.name} is valid against {xsd_path.name} "
+        f"({subjects} subjects{f' in {chunks} chunks' if chunks else ''}, {size / seconds / 1e6:.1f} MB/s)"
+    )
+    return {"cached": False, "bytes": size, "seconds": seconds, "subjects": subjects, "chunks": chunks}
+
+## -- End of Program Code -- ##
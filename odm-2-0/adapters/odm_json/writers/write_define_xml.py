@@ -0,0 +1,451 @@
+"""
+Define-XML 2.1 for a study's SDTM datasets, written as a stream.
+
+Everything comes from metadata the pipeline already has: the mapping table
+(which SDTMIG variable each ODM item feeds, with role, core and ordinal), the
+CRF ItemDefs and CodeLists, the normalized SDTMIG (dataset labels, classes and
+structures) and the derivation snippets under overrides. The document is
+written with lxml's incremental xmlfile writer one definition at a time, so no
+tree of the whole file is built and memory does not grow with the number of
+ItemDefs or codelist terms. Validation streams the written file through
+iterparse against the cached compiled schema.
+"""
+from __future__ import annotations
+
+import argparse
+import os
+from datetime import datetime
+from pathlib import Path
+from typing import TYPE_CHECKING, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from lxml import etree
+
+from adapters.odm_json.matchers.match_odm_to_sdtm import referenced_domains
+from adapters.odm_json.scaffolds.derivation_registry import DerivationRegistry
+from adapters.odm_json.scaffolds.scaffold_sql import (
+    SUPP_VARIABLES,
+    domain_rows,
+    load_derivation_configs,
+    resolve_domains,
+    supp_qualifiers,
+    supp_rows,
+)
+from adapters.odm_json.utils.artifacts import artifact_paths, load_mapping, load_tree
+from adapters.odm_json.utils.load_paths import load_paths
+from adapters.odm_json.utils.metadata_model import load_study_metadata, sdtm_metadata
+from adapters.odm_json.utils.schema_cache import load_schema
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+ODM_NS = "http://www.cdisc.org/ns/odm/v1.3"
+DEF_NS = "http://www.cdisc.org/ns/def/v2.1"
+XLINK_NS = "http://www.w3.org/1999/xlink"
+NSMAP = {None: ODM_NS, "def": DEF_NS, "xlink": XLINK_NS}
+
+ODM_VERSION = "1.3.2"
+DEFINE_VERSION = "2.1.0"
+SOURCE_SYSTEM = "SDTM Blueprint-as-a-Service"
+INDENT = "  "
+
+# Define-XML 2.1 data types; other ODM 2.0 types are mapped onto them
+DEFINE_DATATYPES = {
+    "text", "integer", "float", "date", "time", "datetime", "partialDate", "partialTime",
+    "partialDatetime", "incompleteDatetime", "durationDatetime", "intervalDatetime",
+}
+ODM_DATATYPE_MAP = {"string": "text", "boolean": "text", "double": "float", "hexFloat": "float", "base64Float": "float"}
+
+SUPP_DATASET = "SUPPQUAL"
+SUPP_CLASS = "RELATIONSHIP"
+
+
+def _odm(tag: str) -> str:
+    return f"{{{ODM_NS}}}{tag}"
+
+def _def(tag: str) -> str:
+    return f"{{{DEF_NS}}}{tag}"
+
+def _text(value) -> str:
+    """A mapping cell as text: NaN/None (missing in pandas or the CSV) become ""."""
+    return str(value).strip() if isinstance(value, (str, int)) and not isinstance(value, bool) else ""
+
+
+# -- Nodes
+# A node is (tag, attributes, text or child nodes). Each definition is built as a
+# handful of small tuples and written straight away; none of them is kept.
+def description(text: str, tag: str = "Description") -> tuple:
+    return (_odm(tag), {}, [(_odm("TranslatedText"), {"xml:lang": "en"}, text)])
+
+def write_node(xf, node: tuple, depth: int):
+    tag, attrib, content = node
+    xf.write("\n" + INDENT * depth)
+    with xf.element(tag, {k: v for k, v in attrib.items() if v not in (None, "")}):
+        if isinstance(content, str):
+            xf.write(content)
+            return
+        for child in content:
+            write_node(xf, child, depth + 1)
+        if content:
+            xf.write("\n" + INDENT * depth)
+
+
+# -- Dataset plan
+def define_datatype(item: Optional[dict], sdtm_datatype: str) -> str:
+    odm_type = (item or {}).get("DataType") or ""
+    if odm_type in DEFINE_DATATYPES:
+        return odm_type
+    if odm_type in ODM_DATATYPE_MAP:
+        return ODM_DATATYPE_MAP[odm_type]
+    return "integer" if sdtm_datatype == "Num" else "text"
+
+def define_class(domain_class: Optional[str]) -> str:
+    """Define-XML class name (SPECIAL PURPOSE, FINDINGS ABOUT, ...) from the SDTMIG class label."""
+    return (domain_class or "").replace("-", " ").upper()
+
+def sdtmig_version(sdtm_json: Dict[str, dict]) -> str:
+    """IG version from any variable's CDISC Library path (/mdr/sdtmig/3-4/...), e.g. "3.4"."""
+    for domain_data in sdtm_json.values():
+        for meta in domain_data.get("variables", {}).values():
+            parts = (meta.get("sdtm_path") or "").split("/")
+            if len(parts) > 3 and parts[2] == "sdtmig":
+                return parts[3].replace("-", ".")
+    return ""
+
+def _ordinal(value) -> float:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return float("inf")
+
+def _variable(oid: str, name: str, label: str, datatype: str, item: Optional[dict], order: int,
+              mandatory: bool, role: str = "", origin: str = "", method: str = "", value_list: str = "") -> dict:
+    length = (item or {}).get("Length") if datatype in ("text", "integer", "float") else None
+    return {
+        "oid": oid, "name": name, "label": label or name, "datatype": datatype, "length": length,
+        "codelist": (item or {}).get("CodeListRef"), "order": order, "mandatory": mandatory,
+        "role": role, "origin": origin, "method": method, "value_list": value_list,
+    }
+
+class DefinePlan:
+    """
+    Datasets, variables, value-level entries and methods of a study define, kept
+    as small dicts; the XML itself is only ever written, never held.
+    """
+
+    def __init__(self, odm_json: dict, df: pd.DataFrame, sdtm_json: Dict[str, dict],
+                 configs: Tuple[dict, dict], registry: DerivationRegistry, domains: List[str]):
+        mdv = odm_json["MetaDataVersion"]
+        self.study_oid = odm_json.get("StudyOID", "UNKNOWN_STUDY")
+        self.mdv_name = mdv.get("Name") or self.study_oid
+        self.items = {item["OID"]: item for item in mdv.get("ItemDefs", [])}
+        self.code_lists = {cl["OID"]: cl for cl in mdv.get("CodeLists", [])}
+        self.sdtm_json = sdtm_json
+        self.version = sdtmig_version(sdtm_json)
+        self.standard_oid = f"STD.SDTMIG.{self.version}" if self.version else "STD.SDTMIG"
+        self.registry = registry
+        self.standard_vars = {v.upper() for v in configs[0].get("standard_derivations", []) or []}
+        self.custom_vars = configs[1].get("custom_derivations", {}) or {}
+
+        self.datasets: List[dict] = []
+        self.value_lists: List[dict] = []
+        self.methods: List[dict] = []
+        for domain in domains:
+            self.datasets.append(self._domain_dataset(df, domain))
+            qualifiers = supp_rows(df, domain)
+            if not qualifiers.empty:
+                self.datasets.append(self._supp_dataset(qualifiers, domain))
+
+    def _derivation(self, domain: str, var: str) -> Optional[Tuple[str, Path]]:
+        # Same precedence as the scaffolder: a standard snippet, then the domain's custom one
+        if var in self.standard_vars and self.registry.standard_snippet(var):
+            return self.registry.standard_snippet(var)
+        return self.registry.custom_snippet(domain, var)
+
+    def _domain_dataset(self, df: pd.DataFrame, domain: str) -> dict:
+        ig = self.sdtm_json.get(domain) or {}
+        ig_vars = ig.get("variables", {})
+        rows = [r for r in domain_rows(df, domain).to_dict("records") if _text(r.get("Mapping_Type")) != "Not_Submitted"]
+        rows.sort(key=lambda r: _ordinal(r.get("Ordinal")))
+
+        first_rows = {}
+        for row in rows:
+            var = _text(row.get("SDTM_Variable")).upper()
+            if var and var not in first_rows:
+                first_rows[var] = row
+        derived_vars = self.standard_vars | {v.upper() for v in self.custom_vars.get(domain, []) or []}
+        names = list(first_rows) + sorted(derived_vars.difference(first_rows))
+
+        variables = []
+        for order, var in enumerate(names, start=1):
+            row = first_rows.get(var, {})
+            meta = ig_vars.get(var, {})
+            item = self.items.get(_text(row.get("ItemOID")))
+            mapping_type = _text(row.get("Mapping_Type"))
+            origin = method = ""
+            if var in derived_vars or mapping_type == "Derived":
+                origin, method = "Derived", f"MT.{domain}.{var}"
+                snippet = self._derivation(domain, var)
+                self.methods.append({"oid": method, "domain": domain, "var": var, "snippet": snippet})
+            elif mapping_type in ("Direct", "SUPPQUAL") and item is not None:
+                origin = "Collected"
+            variables.append(_variable(
+                f"IT.{domain}.{var}", var, _text(row.get("SDTM_Label")) or meta.get("label") or "",
+                define_datatype(item, _text(row.get("Datatype")) or meta.get("datatype") or ""),
+                item, order, (_text(row.get("Core")) or meta.get("core")) == "Req",
+                role=_text(row.get("Role")) or meta.get("role") or "", origin=origin, method=method,
+            ))
+        return {
+            "name": domain, "label": ig.get("domain_label") or domain, "class": define_class(ig.get("domain_class")),
+            "structure": ig.get("structure") or "", "repeating": "No" if domain == "DM" else "Yes",
+            "variables": variables,
+        }
+
+    def _supp_dataset(self, rows: pd.DataFrame, domain: str) -> dict:
+        supp = f"SUPP{domain}"
+        ig = self.sdtm_json.get(SUPP_DATASET) or {}
+        ig_vars = ig.get("variables", {})
+        value_list = f"VL.{supp}.QVAL"
+
+        variables = []
+        for order, var in enumerate(SUPP_VARIABLES, start=1):
+            meta = ig_vars.get(var, {})
+            variables.append(_variable(
+                f"IT.{supp}.{var}", var, meta.get("label") or var, "text", None, order,
+                meta.get("core", "Req") == "Req", role=meta.get("role") or "",
+                origin="Assigned" if var != "QVAL" else "", value_list=value_list if var == "QVAL" else "",
+            ))
+
+        items_by_raw = {}
+        for row in rows.to_dict("records"):
+            items_by_raw.setdefault(_text(row.get("Raw_Input_Name")) or _text(row.get("ODM_Variable")), row)
+        entries = []
+        for order, q in enumerate(supp_qualifiers(rows), start=1):
+            item = self.items.get(_text(items_by_raw.get(q["raw"], {}).get("ItemOID")))
+            entry = _variable(
+                f"IT.{supp}.QVAL.{q['QNAM']}", q["QNAM"], q["QLABEL"], define_datatype(item, "Char"),
+                item, order, False, origin="Collected" if item is not None else "",
+            )
+            entry["where"] = {"oid": f"WC.{supp}.QNAM.{q['QNAM']}", "item": f"IT.{supp}.QNAM", "value": q["QNAM"]}
+            entries.append(entry)
+        self.value_lists.append({"oid": value_list, "entries": entries})
+
+        return {
+            "name": supp, "label": f"Supplemental Qualifiers for {domain}", "class": SUPP_CLASS,
+            "structure": ig.get("structure") or "", "repeating": "Yes", "variables": variables,
+        }
+
+    def item_defs(self) -> Iterator[dict]:
+        for dataset in self.datasets:
+            yield from dataset["variables"]
+        for value_list in self.value_lists:
+            yield from value_list["entries"]
+
+    def referenced_code_lists(self) -> List[str]:
+        """CodeList OIDs used by the define's ItemDefs, in CRF order."""
+        used = {v["codelist"] for v in self.item_defs() if v["codelist"]}
+        return [oid for oid in self.code_lists if oid in used]
+
+
+# -- Definitions
+def item_def_node(var: dict) -> tuple:
+    children = [description(var["label"])]
+    if var["codelist"]:
+        children.append((_odm("CodeListRef"), {"CodeListOID": var["codelist"]}, []))
+    if var["value_list"]:
+        children.append((_def("ValueListRef"), {"ValueListOID": var["value_list"]}, []))
+    if var["origin"]:
+        children.append((_def("Origin"), {"Type": var["origin"], "Source": "Investigator" if var["origin"] == "Collected" else ""}, []))
+    return (_odm("ItemDef"), {
+        "OID": var["oid"], "Name": var["name"], "DataType": var["datatype"], "Length": var["length"],
+        "SASFieldName": var["name"][:8],
+    }, children)
+
+def item_ref_node(var: dict, children: Iterable[tuple] = ()) -> tuple:
+    return (_odm("ItemRef"), {
+        "ItemOID": var["oid"], "OrderNumber": str(var["order"]), "Mandatory": "Yes" if var["mandatory"] else "No",
+        "MethodOID": var["method"], "Role": var["role"],
+    }, list(children))
+
+def item_group_def_node(dataset: dict, standard_oid: str) -> tuple:
+    name = dataset["name"]
+    leaf = f"LF.{name}"
+    children = [description(dataset["label"])]
+    children += [item_ref_node(var) for var in dataset["variables"]]
+    if dataset["class"]:
+        children.append((_def("Class"), {"Name": dataset["class"]}, []))
+    children.append((_def("leaf"), {"ID": leaf, f"{{{XLINK_NS}}}href": f"{name.lower()}.xpt"},
+                     [(_def("title"), {}, f"{name.lower()}.xpt")]))
+    return (_odm("ItemGroupDef"), {
+        "OID": f"IG.{name}", "Domain": name[4:] if name.startswith("SUPP") else name, "Name": name,
+        "Repeating": dataset["repeating"], "IsReferenceData": "No", "SASDatasetName": name[:8],
+        f"{{{DEF_NS}}}Structure": dataset["structure"], "Purpose": "Tabulation",
+        f"{{{DEF_NS}}}StandardOID": standard_oid, f"{{{DEF_NS}}}ArchiveLocationID": leaf,
+    }, children)
+
+def value_list_def_node(value_list: dict) -> tuple:
+    return (_def("ValueListDef"), {"OID": value_list["oid"]}, [
+        item_ref_node(entry, [(_def("WhereClauseRef"), {"WhereClauseOID": entry["where"]["oid"]}, [])])
+        for entry in value_list["entries"]
+    ])
+
+def where_clause_def_node(where: dict) -> tuple:
+    return (_def("WhereClauseDef"), {"OID": where["oid"]}, [
+        (_odm("RangeCheck"), {"SoftHard": "Soft", f"{{{DEF_NS}}}ItemOID": where["item"], "Comparator": "EQ"},
+         [(_odm("CheckValue"), {}, where["value"])]),
+    ])
+
+def method_def_node(method: dict) -> tuple:
+    snippet = method["snippet"]
+    if snippet:
+        text = f"Derived in {method['domain'].lower()}.sql from {snippet[1].name}"
+    else:
+        text = f"Derivation of {method['var']} to be specified (no snippet under overrides)"
+    children = [description(text)]
+    if snippet:
+        children.append((_odm("FormalExpression"), {"Context": "SQL"}, snippet[0]))
+    return (_odm("MethodDef"), {
+        "OID": method["oid"], "Name": f"Algorithm to derive {method['domain']}.{method['var']}", "Type": "Computation",
+    }, children)
+
+def write_code_list(xf, code_list: dict, depth: int):
+    """A CodeList with one element per term; CodeListItem with Decode when any term has one."""
+    items = [item for item in code_list.get("Items", []) if item.get("CodedValue") is not None]
+    decoded = any(item.get("Decode") for item in items)
+    xf.write("\n" + INDENT * depth)
+    with xf.element(_odm("CodeList"), {
+        "OID": code_list["OID"], "Name": code_list.get("Name") or code_list["OID"],
+        "DataType": define_datatype(code_list, ""),
+    }):
+        for item in items:
+            if decoded:
+                write_node(xf, (_odm("CodeListItem"), {"CodedValue": item["CodedValue"]},
+                                [description(item.get("Decode") or item["CodedValue"], "Decode")]), depth + 1)
+            else:
+                write_node(xf, (_odm("EnumeratedItem"), {"CodedValue": item["CodedValue"]}, []), depth + 1)
+        xf.write("\n" + INDENT * depth)
+
+
+# -- Document
+def write_define_xml(plan: DefinePlan, output_path: Path) -> Dict[str, int]:
+    """Stream the define for `plan` to output_path (replaced atomically); return element counts."""
+    output_path = Path(output_path)
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = output_path.with_suffix(output_path.suffix + ".tmp")
+    counts = {"item_group_defs": 0, "item_defs": 0, "code_lists": 0, "code_list_items": 0, "method_defs": 0}
+
+    with etree.xmlfile(str(tmp_path), encoding="UTF-8") as xf:
+        xf.write_declaration()
+        with xf.element(_odm("ODM"), {
+            "FileType": "Snapshot",
+            "FileOID": f"DEF.{plan.study_oid}",
+            "CreationDateTime": datetime.now().isoformat(timespec="seconds"),
+            "ODMVersion": ODM_VERSION,
+            "Originator": SOURCE_SYSTEM,
+            "SourceSystem": SOURCE_SYSTEM,
+            f"{{{DEF_NS}}}Context": "Other",
+        }, nsmap=NSMAP):
+            xf.write("\n" + INDENT)
+            with xf.element(_odm("Study"), {"OID": plan.study_oid}):
+                write_node(xf, (_odm("GlobalVariables"), {}, [
+                    (_odm("StudyName"), {}, plan.study_oid),
+                    (_odm("StudyDescription"), {}, plan.mdv_name),
+                    (_odm("ProtocolName"), {}, plan.study_oid),
+                ]), 2)
+                xf.write("\n" + INDENT * 2)
+                with xf.element(_odm("MetaDataVersion"), {
+                    "OID": f"MDV.{plan.study_oid}.SDTMIG.{plan.version}",
+                    "Name": f"{plan.study_oid}, SDTMIG {plan.version} Data Definitions",
+                    f"{{{DEF_NS}}}DefineVersion": DEFINE_VERSION,
+                }):
+                    write_node(xf, (_def("Standards"), {}, [(_def("Standard"), {
+                        "OID": plan.standard_oid, "Name": "SDTMIG", "Type": "IG",
+                        "Version": plan.version, "Status": "Final",
+                    }, [])]), 3)
+                    for value_list in plan.value_lists:
+                        write_node(xf, value_list_def_node(value_list), 3)
+                    for value_list in plan.value_lists:
+                        for entry in value_list["entries"]:
+                            write_node(xf, where_clause_def_node(entry["where"]), 3)
+                    for dataset in plan.datasets:
+                        write_node(xf, item_group_def_node(dataset, plan.standard_oid), 3)
+                        counts["item_group_defs"] += 1
+                    for var in plan.item_defs():
+                        write_node(xf, item_def_node(var), 3)
+                        counts["item_defs"] += 1
+                    for oid in plan.referenced_code_lists():
+                        write_code_list(xf, plan.code_lists[oid], 3)
+                        counts["code_lists"] += 1
+                        counts["code_list_items"] += len(plan.code_lists[oid].get("Items", []))
+                    for method in plan.methods:
+                        write_node(xf, method_def_node(method), 3)
+                        counts["method_defs"] += 1
+                    xf.write("\n" + INDENT * 2)
+                xf.write("\n" + INDENT)
+            xf.write("\n")
+
+    os.replace(tmp_path, output_path)
+    return counts
+
+def validate_define_xml(define_path: Path, xsd_path: Path, cache_dir: Optional[Path] = None):
+    """
+    Validate a written define against the Define-XML schema while streaming it
+    through iterparse; each element is released as soon as it is checked.
+    """
+    schema = load_schema(Path(xsd_path), cache_dir)
+    try:
+        for _, elem in etree.iterparse(str(define_path), events=("end",), schema=schema):
+            elem.clear()
+    except etree.XMLSyntaxError as exc:
+        raise ValueError(f"Define-XML validation failed:\n{exc}") from exc
+    print(f"✅ {Path(define_path).name} is valid against {Path(xsd_path).name}")
+
+
+# -- Study
+def load_define_sdtmig(paths: dict, odm_json: dict) -> Dict[str, dict]:
+    """SDTMIG metadata of the study's domains plus SUPPQUAL, from the store or the normalized artifact."""
+    if paths.get("sdtmig_store"):
+        from adapters.odm_json.utils.sdtmig_store import open_store
+
+        store = open_store(Path(paths["sdtmig_input_json"]), Path(paths["sdtmig_store"]))
+        return store.load_domains(referenced_domains(odm_json) | {SUPP_DATASET})
+    return sdtm_metadata(load_tree(artifact_paths(paths)["sdtmig_normalized"]))
+
+def generate_define(paths: dict, odm_json: dict, df: pd.DataFrame, sdtm_json: Optional[Dict[str, dict]] = None) -> Dict[str, int]:
+    """Write (and, with define_xsd configured, validate) the study's define.xml."""
+    sdtm_json = sdtm_json if sdtm_json is not None else load_define_sdtmig(paths, odm_json)
+    domains = resolve_domains(df, ["all"])
+    configs = load_derivation_configs(paths)
+    registry = DerivationRegistry(Path(paths["overrides_dir"]), configs, domains)
+    plan = DefinePlan(odm_json, df, sdtm_json, configs, registry, domains)
+
+    define_path = Path(paths["define_xml"])
+    counts = write_define_xml(plan, define_path)
+    print(
+        f"✅ Define-XML written to {define_path} ({counts['item_group_defs']} datasets, "
+        f"{counts['item_defs']} ItemDefs, {counts['code_lists']} CodeLists)"
+    )
+    if paths.get("define_xsd"):
+        cache_dir = paths.get("schema_cache_dir")
+        validate_define_xml(define_path, Path(paths["define_xsd"]), Path(cache_dir) if cache_dir else None)
+    else:
+        print("⚠️  No define_xsd configured in paths.yml; define.xml was not schema-validated")
+    return counts
+
+def main():
+    parser = argparse.ArgumentParser(description="Write Define-XML 2.1 for a study's SDTM datasets.")
+    parser.add_argument("--study", required=True, help="Study folder name")
+    parser.add_argument("--env", default="dev", help="Environment name in paths.yml (e.g., dev)")
+    args = parser.parse_args()
+
+    paths = load_paths(study=args.study, env=args.env)
+    if not paths.get("define_xml"):
+        parser.error("No define_xml configured in paths.yml")
+    artifacts = artifact_paths(paths)
+    odm_json = load_study_metadata(artifacts["crf_metadata"])
+    generate_define(paths, odm_json, load_mapping(artifacts["match_output"]))
+
+
+if __name__ == "__main__":
+    main()
+
+## -- End of Program Code -- ##
@@ -0,0 +1,91 @@
+"""
+Benchmark: import-time budgets for the pipeline modules.
+
+Each module is imported in a fresh interpreter under `python3 -X importtime`,
+and the median cumulative import time is checked against its budget. The same
+interpreter also checks that no heavy dependency (pandas, numpy, duckdb, lxml)
+was imported. Those belong inside the code paths that use them. Exits 1 when any
+module is over budget or imports a heavy dependency, so it can gate a change.
+
+Usage (from odm-2-0/):
+    PYTHONPATH=. python3 -m benchmarks.bench_import_time
+    PYTHONPATH=. python3 -m benchmarks.bench_import_time --runs 9 --scale 2.0
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+from benchmarks.synthetic import REPO_ROOT
+
+HEAVY_MODULES = ("pandas", "numpy", "duckdb", "lxml")
+
+# Cumulative import time budgets in milliseconds (stdlib argparse/yaml/multiprocessing included)
+BUDGETS_MS = {
+    "adapters.odm_json.cli": 60,
+    "adapters.odm_json.runners.run_pipeline": 250,
+    "adapters.odm_json.runners.run_batch": 250,
+    "adapters.odm_json.runners.serve": 250,
+    "adapters.odm_json.runners.service_client": 150,
+    "adapters.odm_json.runners.run_dbt": 150,
+    "adapters.odm_json.extractors.convert_odm_xml_to_json": 150,
+    "adapters.odm_json.extractors.extract_clinical_data": 150,
+    "adapters.odm_json.matchers.match_odm_to_sdtm": 150,
+    "adapters.odm_json.scaffolds.scaffold_sql": 200,
+}
+
+PROBE = "import json, sys, {module}; print(json.dumps(sorted(m for m in {heavy!r} if m in sys.modules)))"
+
+
+def import_once(module: str) -> tuple:
+    """(cumulative import ms, heavy modules loaded) for one cold import of module."""
+    env = dict(os.environ, PYTHONPATH=str(REPO_ROOT))
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", PROBE.format(module=module, heavy=HEAVY_MODULES)],
+        cwd=REPO_ROOT, env=env, capture_output=True, text=True, check=True,
+    )
+    cumulative_us = None
+    for line in proc.stderr.splitlines():
+        # "import time: self [us] | cumulative | imported package"
+        if line.startswith("import time:") and line.rsplit("|", 1)[-1].strip() == module:
+            cumulative_us = int(line.split("|")[1])
+    if cumulative_us is None:
+        raise RuntimeError(f"No importtime line for {module}:\n{proc.stderr[-2000:]}")
+    return cumulative_us / 1000, json.loads(proc.stdout)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check import-time budgets of the pipeline modules.")
+    parser.add_argument("--runs", type=int, default=5, help="Cold imports per module (median is checked)")
+    parser.add_argument("--scale", type=float, default=1.0, help="Multiply every budget (slow CI machines)")
+    args = parser.parse_args()
+
+    failures = []
+    for module, budget in BUDGETS_MS.items():
+        budget *= args.scale
+        samples, heavy = [], []
+        for _ in range(args.runs):
+            ms, heavy = import_once(module)
+            samples.append(ms)
+        median = statistics.median(samples)
+        status = "ok"
+        if median > budget:
+            status = "over budget"
+            failures.append(module)
+        if heavy:
+            status = f"imports {', '.join(heavy)}"
+            failures.append(module)
+        print(f"  {module:<56} {median:7.1f}ms  (budget {budget:5.0f}ms)  {status}")
+
+    if failures:
+        print(f"⚠️ {len(set(failures))} module(s) failed the import-time check")
+        raise SystemExit(1)
+    print("✅ All modules within their import-time budgets")
+
+
+if __name__ == "__main__":
+    main()
+
+## -- End of Program Code -- ##
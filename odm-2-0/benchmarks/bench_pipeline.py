@@ -0,0 +1,244 @@
+"""
+Benchmark: pipeline stages on synthetic ODM 2.0 exports of increasing size.
+
+For each size tier a synthetic ODM export and a matching SDTMIG JSON are
+generated (benchmarks/synthetic.py), then every operation is timed in a fresh
+process so its peak RSS is not inflated by earlier ones. Inputs an operation
+needs (parsed ODM, flattened SDTMIG, mapping frame) are prepared in that
+process before the clock starts. Results are written as JSON so runs from two
+commits can be compared with --compare.
+
+Usage (from odm-2-0/):
+    PYTHONPATH=. python3 -m benchmarks.bench_pipeline --tiers small medium
+    PYTHONPATH=. python3 -m benchmarks.bench_pipeline --output after.json --compare before.json
+"""
+import argparse
+import contextlib
+import io
+import json
+import logging
+import platform
+import subprocess
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict
+from datetime import datetime, timezone
+from multiprocessing import get_context
+from pathlib import Path
+
+from benchmarks.synthetic import REPO_ROOT, SizeSpec, generate_odm, generate_sdtmig
+
+XSD_PATH = REPO_ROOT / "adapters" / "odm_json" / "schemas" / "odm" / "v2_0" / "ODM.xsd"
+RESULTS_DIR = REPO_ROOT / "benchmarks" / "results"
+
+TIERS = {
+    "small": SizeSpec(domains=5, items_per_domain=20, codelists=20, subjects=50, item_data=10_000),
+    "medium": SizeSpec(domains=20, items_per_domain=50, codelists=200, subjects=500, item_data=500_000),
+    "large": SizeSpec(domains=60, items_per_domain=80, codelists=1_000, subjects=5_000, item_data=5_000_000),
+}
+
+OPERATIONS = (
+    "parse_metadata",
+    "parse_metadata_streaming",
+    "validate_xml_against_xsd",
+    "validate_xml_streaming",
+    "extract_sdtm_metadata",
+    "match_odm_to_sdtm_all",
+    "suggest_candidates",
+    "scaffold_domains",
+    "write_define_xml",
+    "validate_controlled_terms",
+)
+
+
+# -- Operations (set up and measured inside a fresh process)
+def prepare(operation: str, xml_path: Path, sdtmig_path: Path, work_dir: Path):
+    """Load the operation's inputs and return the zero-argument call to time."""
+    from adapters.odm_json.extractors.convert_odm_xml_to_json import parse_metadata, validate_xml_against_xsd
+    from adapters.odm_json.matchers.match_odm_to_sdtm import flatten_sdtm_metadata, match_odm_to_sdtm_all
+    from adapters.odm_json.scaffolds.scaffold_sql import mapping_frame, scaffold_domains
+    from adapters.odm_json.utils.parse_sdtmig_json import extract_sdtm_metadata
+    from adapters.odm_json.validators.validate_odm_xml import validate_xml_streaming
+
+    if operation == "parse_metadata":
+        return lambda: parse_metadata(xml_path)
+    if operation == "parse_metadata_streaming":
+        return lambda: parse_metadata(xml_path, stream=True)
+    if operation == "validate_xml_against_xsd":
+        return lambda: validate_xml_against_xsd(xml_path, XSD_PATH)
+    if operation == "validate_xml_streaming":
+        return lambda: validate_xml_streaming(xml_path, XSD_PATH, workers=1, force=True)
+    if operation == "extract_sdtm_metadata":
+        return lambda: extract_sdtm_metadata(sdtmig_path)
+
+    odm_json = parse_metadata(xml_path)
+    if operation == "validate_controlled_terms":
+        import duckdb
+        from adapters.odm_json.extractors.extract_clinical_data import load_clinical_data
+        from adapters.odm_json.validators.validate_controlled_terms import validate_controlled_terms
+
+        con = duckdb.connect()
+        load_clinical_data(xml_path, odm_json, con)
+        return lambda: validate_controlled_terms(con, odm_json)
+
+    if operation == "suggest_candidates":
+        from adapters.odm_json.matchers.suggest_candidates import CandidateIndex, suggest_candidates
+
+        # Index build plus a query for every ItemDef, as if none had matched by OID
+        sdtm_json = extract_sdtm_metadata(sdtmig_path)
+        items = [(item, "bench") for item in odm_json["MetaDataVersion"]["ItemDefs"]]
+        return lambda: suggest_candidates(CandidateIndex(sdtm_json), items)
+
+    sdtm_lookup = flatten_sdtm_metadata(extract_sdtm_metadata(sdtmig_path))
+    if operation == "match_odm_to_sdtm_all":
+        return lambda: match_odm_to_sdtm_all(odm_json, sdtm_lookup)
+
+    if operation in ("scaffold_domains", "write_define_xml"):
+        df = mapping_frame(match_odm_to_sdtm_all(odm_json, sdtm_lookup))
+        domains = sorted(d for d in df["SDTM_Domain"].dropna().unique() if d)
+        config_dir = work_dir / "config"
+        config_dir.mkdir(parents=True, exist_ok=True)
+        (config_dir / "standard_derivations.yml").write_text("standard_derivations: []\n")
+        (config_dir / "custom_derivations.yml").write_text("custom_derivations: {}\n")
+        paths = {
+            "config_dir": str(config_dir),
+            "overrides_dir": str(work_dir / "overrides"),
+            "dbt_models_dir": str(work_dir / "models"),
+        }
+        if operation == "scaffold_domains":
+            return lambda: scaffold_domains(df, domains, paths, workers=1)
+
+        from adapters.odm_json.scaffolds.derivation_registry import DerivationRegistry
+        from adapters.odm_json.scaffolds.scaffold_sql import load_derivation_configs
+        from adapters.odm_json.writers.write_define_xml import DefinePlan, write_define_xml
+
+        # Plan and stream the whole define; peak RSS shows whether it grows with the ItemDefs
+        sdtm_json = extract_sdtm_metadata(sdtmig_path)
+        configs = load_derivation_configs(paths)
+        registry = DerivationRegistry(Path(paths["overrides_dir"]), configs, domains)
+        return lambda: write_define_xml(
+            DefinePlan(odm_json, df, sdtm_json, configs, registry, domains), work_dir / "define.xml"
+        )
+
+    raise ValueError(f"Unknown operation: {operation}")
+
+
+def measure(operation: str, xml_path: str, sdtmig_path: str, work_dir: str, repeat: int) -> dict:
+    """Time one operation `repeat` times; report the best run and the process peak RSS."""
+    from adapters.odm_json.utils.instrumentation import peak_rss_mb
+
+    call = prepare(operation, Path(xml_path), Path(sdtmig_path), Path(work_dir))
+    logging.getLogger().setLevel(logging.WARNING)
+    baseline_mb = peak_rss_mb()
+    runs = []
+    for _ in range(repeat):
+        with contextlib.redirect_stdout(io.StringIO()):
+            start = time.perf_counter()
+            call()
+            runs.append(time.perf_counter() - start)
+    peak_mb = peak_rss_mb()
+    return {
+        "seconds": min(runs),
+        "runs": runs,
+        "peak_rss_mb": round(peak_mb, 1),
+        "rss_growth_mb": round(peak_mb - baseline_mb, 1),
+    }
+
+
+def run_isolated(*args) -> dict:
+    """Run measure() in a spawned interpreter so every operation starts from a clean heap."""
+    with ProcessPoolExecutor(max_workers=1, mp_context=get_context("spawn")) as pool:
+        return pool.submit(measure, *args).result()
+
+
+# -- Tiers
+def bench_tier(name: str, spec: SizeSpec, work_dir: Path, operations, repeat: int) -> dict:
+    tier_dir = work_dir / name
+    xml_path, sdtmig_path = tier_dir / "odm.xml", tier_dir / "sdtmig.json"
+
+    start = time.perf_counter()
+    generate_odm(xml_path, spec)
+    generate_sdtmig(sdtmig_path, spec)
+    generate_s = time.perf_counter() - start
+    xml_mb = xml_path.stat().st_size / 1e6
+    print(f"\n{name}: {spec.item_defs} ItemDefs, {spec.codelists} CodeLists, {spec.domains} ItemGroupDefs, "
+          f"{spec.subjects} subjects, ~{spec.item_data} ItemData ({xml_mb:.1f} MB, generated in {generate_s:.1f}s)")
+
+    results = {}
+    for operation in operations:
+        result = run_isolated(operation, str(xml_path), str(sdtmig_path), str(tier_dir / operation), repeat)
+        results[operation] = result
+        print(f"  {operation:<26} {result['seconds']:8.3f}s  peak {result['peak_rss_mb']:7.1f}MB  "
+              f"(+{result['rss_growth_mb']:.1f}MB)")
+
+    return {"spec": asdict(spec), "xml_bytes": xml_path.stat().st_size, "results": results}
+
+
+# -- Reporting
+def git_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=REPO_ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def compare(report: dict, baseline: dict):
+    """Print time and peak-memory ratios of this run against an earlier results file."""
+    print(f"\nCompared with {baseline.get('commit', '?')} (ratio < 1.00 is faster/smaller):")
+    for tier, data in report["tiers"].items():
+        before = baseline.get("tiers", {}).get(tier)
+        if not before:
+            print(f"  {tier}: not in baseline")
+            continue
+        if before["spec"] != data["spec"]:
+            print(f"  ⚠️ {tier}: tier shape differs from the baseline, ratios are not comparable")
+        for operation, result in data["results"].items():
+            old = before["results"].get(operation)
+            if not old:
+                continue
+            print(f"  {tier:<7} {operation:<26} time x{result['seconds'] / old['seconds']:5.2f}  "
+                  f"peak x{result['peak_rss_mb'] / old['peak_rss_mb']:5.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark pipeline stages on synthetic ODM exports.")
+    parser.add_argument("--tiers", nargs="+", choices=sorted(TIERS), default=["small", "medium"], help="Size tiers to run")
+    parser.add_argument("--operations", nargs="+", choices=OPERATIONS, default=list(OPERATIONS), help="Operations to time")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per operation (best is reported)")
+    parser.add_argument("--output", type=str, default=None, help="Results JSON (default: benchmarks/results/<commit>.json)")
+    parser.add_argument("--compare", type=str, default=None, help="Earlier results JSON to compare against")
+    parser.add_argument("--work-dir", type=str, default=None, help="Where to write generated inputs (default: temp dir)")
+    args = parser.parse_args()
+
+    commit = git_commit()
+    report = {
+        "commit": commit,
+        "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "repeat": args.repeat,
+        "tiers": {},
+    }
+    with tempfile.TemporaryDirectory() as tmp:
+        work_dir = Path(args.work_dir) if args.work_dir else Path(tmp)
+        for tier in args.tiers:
+            report["tiers"][tier] = bench_tier(tier, TIERS[tier], work_dir, args.operations, args.repeat)
+
+    output = Path(args.output) if args.output else RESULTS_DIR / f"{commit}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"\n✅ Benchmark results written to {output}")
+
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            compare(report, json.load(f))
+
+
+if __name__ == "__main__":
+    main()
+
+## -- End of Program Code -- ##
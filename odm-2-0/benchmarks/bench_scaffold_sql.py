@@ -0,0 +1,111 @@
+"""
+Benchmark: variable lookup in scaffold_sql on a synthetic multi-domain mapping.
+
+Compares the previous per-variable DataFrame filter (a full upper-case scan of
+the mapping for every variable, O(vars x rows)) with the prebuilt first-row
+index used by scaffold_domain, then times a full scaffold of every domain.
+
+Usage (from odm-2-0/):
+    PYTHONPATH=. python3 -m benchmarks.bench_scaffold_sql --domains 50 --rows 5000
+"""
+import argparse
+import logging
+import tempfile
+import time
+from pathlib import Path
+
+import pandas as pd
+
+from adapters.odm_json.scaffolds.scaffold_sql import (
+    first_row_lookup,
+    ordered_variables,
+    scaffold_domains,
+)
+
+MAPPING_TYPES = ("Direct", "Derived", "Unmatched", "SUPPQUAL", "Not_Submitted")
+
+
+def synthetic_mapping(n_domains: int, n_rows: int) -> pd.DataFrame:
+    """A match-table-shaped frame with n_rows spread evenly over n_domains."""
+    per_domain = max(1, n_rows // n_domains)
+    rows = []
+    for d in range(n_domains):
+        domain = f"X{d:02d}"
+        for v in range(per_domain):
+            var = f"{domain}VAR{v:03d}"
+            rows.append({
+                "ItemOID": f"IT.{domain}.{var}",
+                "ODM_Variable": var,
+                "ODM_Domain": domain,
+                "Raw_Input_Name": f"{var}_RAW",
+                "Mapping_Type": MAPPING_TYPES[v % len(MAPPING_TYPES)],
+                "SDTM_Domain": domain,
+                "SDTM_Variable": var,
+                "Ordinal": v + 1,
+            })
+    return pd.DataFrame(rows)
+
+
+def legacy_lookup(df: pd.DataFrame, ordered_vars: list) -> dict:
+    """The lookup scaffold_sql.main used to do: one filtered scan per variable."""
+    result = {}
+    for var in ordered_vars:
+        match_row = df[df["SDTM_Variable"].str.upper() == var].head(1)
+        raw_var = match_row["Raw_Input_Name"].values[0] if not match_row.empty and pd.notna(match_row["Raw_Input_Name"].values[0]) else var
+        mapping_type = match_row["Mapping_Type"].values[0] if not match_row.empty and pd.notna(match_row["Mapping_Type"].values[0]) else "unmatched"
+        result[var] = (raw_var, mapping_type)
+    return result
+
+
+def indexed_lookup(df: pd.DataFrame, ordered_vars: list) -> dict:
+    lookup = first_row_lookup(df)
+    return {var: lookup.get(var, (var, "unmatched")) for var in ordered_vars}
+
+
+def timed(func, *args, **kwargs):
+    start = time.perf_counter()
+    result = func(*args, **kwargs)
+    return time.perf_counter() - start, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark scaffold_sql variable lookup.")
+    parser.add_argument("--domains", type=int, default=50, help="Number of synthetic domains")
+    parser.add_argument("--rows", type=int, default=5000, help="Total mapping rows")
+    parser.add_argument("--workers", type=int, default=None, help="Workers for the full scaffold run")
+    args = parser.parse_args()
+
+    logging.getLogger().setLevel(logging.WARNING)
+    df = synthetic_mapping(args.domains, args.rows)
+    ordered_vars = ordered_variables(df, set())
+    print(f"Synthetic mapping: {len(df)} rows, {args.domains} domains, {len(ordered_vars)} variables")
+
+    legacy_s, legacy = timed(legacy_lookup, df, ordered_vars)
+    indexed_s, indexed = timed(indexed_lookup, df, ordered_vars)
+    assert legacy == indexed, "indexed lookup diverged from the per-variable filter"
+
+    print(f"  per-variable filter : {legacy_s:8.3f}s")
+    print(f"  prebuilt index      : {indexed_s:8.3f}s  ({legacy_s / indexed_s:,.0f}x faster)")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        (tmp / "config").mkdir()
+        (tmp / "config" / "standard_derivations.yml").write_text("standard_derivations: []\n")
+        (tmp / "config" / "custom_derivations.yml").write_text("custom_derivations: {}\n")
+        paths = {
+            "config_dir": str(tmp / "config"),
+            "overrides_dir": str(tmp / "overrides"),
+            "dbt_models_dir": str(tmp / "models"),
+        }
+        domains = sorted(df["SDTM_Domain"].unique())
+        serial_s, _ = timed(scaffold_domains, df, domains, paths, workers=1)
+        parallel_s, _ = timed(scaffold_domains, df, domains, paths, workers=args.workers)
+
+    print(f"  scaffold all (serial)   : {serial_s:8.3f}s")
+    print(f"  scaffold all (parallel) : {parallel_s:8.3f}s")
+
+
+if __name__ == "__main__":
+    main()
+
+## -- End of Program Code -- ##
@@ -0,0 +1,159 @@
+"""
+Benchmark: cold CLI runs against the warm local service.
+
+The same job (e.g. scaffold DM for VEXIN-03) is first run as separate
+`bin/baas` processes, each paying imports, schema compilation and config
+loading, then posted to a service started for the benchmark on a free local
+port. Latency (p50/p95/max) and throughput are reported per client
+concurrency. Jobs of one study are serialized by the service, so pass several
+studies with --studies to see the worker pool run jobs side by side. Nothing
+outside this machine is contacted.
+
+Usage (from odm-2-0/):
+    PYTHONPATH=. python3 -m benchmarks.bench_service --study VEXIN-03 --job scaffold --domains DM
+    PYTHONPATH=. python3 -m benchmarks.bench_service --requests 200 --concurrency 1 4 8 --workers 4
+"""
+import argparse
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import List
+
+from adapters.odm_json.runners.service_client import ServiceClient
+from benchmarks.synthetic import REPO_ROOT
+
+BAAS = REPO_ROOT / "bin" / "baas"
+
+
+def cold_command(job: str, study: str, env: str, domains: List[str]) -> List[str]:
+    """The bin/baas command doing the same work as a service job."""
+    if job == "scaffold":
+        return [str(BAAS), "scaffold", "--study", study, "--env", env, "--domain", *domains, "--workers", "1"]
+    if job == "run":
+        return [str(BAAS), "run", "--study", study, "--env", env, "--domains", *domains, "--workers", "1"]
+    return [str(BAAS), job, "--study", study, "--env", env]
+
+
+def percentiles(samples: List[float]) -> dict:
+    ordered = sorted(samples)
+    return {
+        "p50_ms": statistics.median(ordered) * 1000,
+        "p95_ms": ordered[min(len(ordered) - 1, int(round(0.95 * (len(ordered) - 1))))] * 1000,
+        "max_ms": ordered[-1] * 1000,
+    }
+
+
+def bench_cold(job: str, studies: List[str], env: str, domains: List[str], runs: int) -> dict:
+    samples = []
+    for n in range(runs):
+        start = time.perf_counter()
+        subprocess.run(
+            cold_command(job, studies[n % len(studies)], env, domains),
+            cwd=REPO_ROOT, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=True,
+        )
+        samples.append(time.perf_counter() - start)
+    return {"runs": runs, **percentiles(samples)}
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_service(port: int, workers: int, studies: List[str], env: str) -> subprocess.Popen:
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "adapters.odm_json.runners.serve", "--port", str(port),
+         "--workers", str(workers), "--env", env, "--warm", *studies],
+        cwd=REPO_ROOT, env=dict(os.environ, PYTHONPATH=str(REPO_ROOT)),
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    deadline = time.time() + 60
+    while time.time() < deadline:
+        try:
+            with ServiceClient(port=port, timeout=1) as client:
+                client.status()
+            return proc
+        except OSError:
+            time.sleep(0.1)
+    proc.kill()
+    raise RuntimeError("Service did not start within 60s")
+
+
+def bench_warm(port: int, job: str, studies: List[str], domains: List[str], requests: int, concurrency: int) -> dict:
+    """Submit `requests` jobs from `concurrency` clients, each on its own keep-alive connection."""
+    def client_loop(worker: int) -> List[float]:
+        latencies = []
+        with ServiceClient(port=port) as client:
+            for n in range(worker, requests, concurrency):
+                start = time.perf_counter()
+                client.submit(job, studies[n % len(studies)], domains=domains)
+                latencies.append(time.perf_counter() - start)
+        return latencies
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        samples = [s for latencies in pool.map(client_loop, range(concurrency)) for s in latencies]
+    elapsed = time.perf_counter() - start
+    return {"requests": requests, "concurrency": concurrency, "jobs_per_second": requests / elapsed, **percentiles(samples)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare cold CLI runs with jobs on the warm local service.")
+    parser.add_argument("--studies", nargs="+", default=["VEXIN-03"], help="Studies to submit jobs for")
+    parser.add_argument("--env", default="dev", help="Environment profile in paths.yml")
+    parser.add_argument("--job", choices=["convert", "match", "scaffold", "run"], default="scaffold")
+    parser.add_argument("--domains", nargs="+", default=["DM"], help="Domains for scaffold/run")
+    parser.add_argument("--cold-runs", type=int, default=5, help="bin/baas processes to time (0 to skip)")
+    parser.add_argument("--requests", type=int, default=50, help="Jobs per concurrency level")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4], help="Concurrent clients")
+    parser.add_argument("--workers", type=int, default=2, help="Service worker pool size")
+    parser.add_argument("--output", default=None, help="Also write the results as JSON here")
+    args = parser.parse_args()
+
+    report = {"job": args.job, "studies": args.studies, "domains": args.domains, "workers": args.workers}
+    if args.cold_runs:
+        report["cold"] = bench_cold(args.job, args.studies, args.env, args.domains, args.cold_runs)
+        cold = report["cold"]
+        print(f"  cold CLI        {cold['runs']:>5} runs   p50 {cold['p50_ms']:8.1f}ms  p95 {cold['p95_ms']:8.1f}ms")
+
+    port = free_port()
+    proc = start_service(port, args.workers, args.studies, args.env)
+    try:
+        with ServiceClient(port=port) as client:
+            start = time.perf_counter()
+            client.submit(args.job, args.studies[0], domains=args.domains)
+            report["first_job_ms"] = (time.perf_counter() - start) * 1000
+            print(f"  first job       {report['first_job_ms']:8.1f}ms (service started with --warm)")
+
+        report["warm"] = []
+        for concurrency in args.concurrency:
+            result = bench_warm(port, args.job, args.studies, args.domains, args.requests, concurrency)
+            report["warm"].append(result)
+            print(
+                f"  warm service   c={concurrency:<3} {result['jobs_per_second']:7.1f} jobs/s  "
+                f"p50 {result['p50_ms']:8.1f}ms  p95 {result['p95_ms']:8.1f}ms  max {result['max_ms']:8.1f}ms"
+            )
+        with ServiceClient(port=port) as client:
+            report["service_status"] = client.status()
+    finally:
+        proc.terminate()
+        proc.wait(timeout=30)
+
+    if args.output:
+        Path(args.output).parent.mkdir(parents=True, exist_ok=True)
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"\n✅ Benchmark results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
+
+## -- End of Program Code -- ##
@@ -0,0 +1,251 @@
+"""
+Synthetic ODM 2.0 exports and SDTMIG-shaped JSON for benchmarking.
+
+The ODM root element, its namespaces and header attributes come from
+inputs/ref/odm-2.0-template.xml; Study/MetaDataVersion and ClinicalData are
+generated to the requested size and validate against the ODM 2.0 XSD. The
+SDTMIG JSON follows the CDISC Library export shape read by
+extract_sdtm_metadata(), with variables that overlap the ODM ItemDefs the way a
+real study does: most match, some only exist on one side, a share of ItemDefs
+carry DERIVATION_RULE / SUPPQUAL / NOT_SUBMITTED aliases.
+"""
+import json
+import random
+import string
+from dataclasses import dataclass
+from itertools import product
+from pathlib import Path
+from typing import List, Optional
+
+from lxml import etree
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+TEMPLATE = REPO_ROOT / "studies" / "VEXIN-03" / "inputs" / "ref" / "odm-2.0-template.xml"
+
+ODM_NS = "http://www.cdisc.org/ns/odm/v2.0"
+XML_LANG = "{http://www.w3.org/XML/1998/namespace}lang"
+
+STUDY_OID = "ST.SYNTH"
+MDV_OID = "MDV.1"
+EVENT_OID = "SE.VISIT"
+
+
+@dataclass(frozen=True)
+class SizeSpec:
+    """Shape of one synthetic study."""
+    domains: int
+    items_per_domain: int
+    codelists: int
+    subjects: int
+    item_data: int
+
+    @property
+    def item_defs(self) -> int:
+        return self.domains * self.items_per_domain
+
+    @property
+    def records_per_subject_group(self) -> int:
+        """ItemGroupData repeats per subject and domain needed to reach item_data values."""
+        per_record = self.items_per_domain
+        return max(1, round(self.item_data / max(1, self.subjects * self.domains * per_record)))
+
+
+def _q(tag: str) -> str:
+    return f"{{{ODM_NS}}}{tag}"
+
+
+def domain_codes(n: int) -> List[str]:
+    """The first n two-letter domain codes: AA, AB, ..."""
+    return ["".join(pair) for pair in product(string.ascii_uppercase, repeat=2)][:n]
+
+
+def item_kind(index: int) -> str:
+    """How the index-th ItemDef of a domain maps to SDTM."""
+    return {0: "derived", 1: "suppqual", 2: "not_submitted"}.get(index % 10, "direct")
+
+
+def variable_name(domain: str, index: int) -> str:
+    return f"{domain}V{index:04d}"
+
+
+def item_codelist(spec: SizeSpec, domain_index: int, index: int) -> Optional[int]:
+    """CodeList number referenced by an ItemDef (every 7th item), or None."""
+    if not spec.codelists or index % 7 != 5:
+        return None
+    return (domain_index * spec.items_per_domain + index) % spec.codelists
+
+
+def is_integer_item(spec: SizeSpec, domain_index: int, index: int) -> bool:
+    return index % 4 == 3 and item_codelist(spec, domain_index, index) is None
+
+
+# -- ODM
+def _translated_text(parent, text: str):
+    tt = etree.SubElement(parent, _q("TranslatedText"), {XML_LANG: "en", "Type": "text"})
+    tt.text = text
+
+
+def build_study(spec: SizeSpec, domains: List[str]):
+    """The <Study> element with one ItemGroupDef per domain, its ItemDefs and the CodeLists."""
+    study = etree.Element(_q("Study"), nsmap={None: ODM_NS}, OID=STUDY_OID, StudyName="SYNTH", ProtocolName="SYNTH-PROT")
+    mdv = etree.SubElement(study, _q("MetaDataVersion"), OID=MDV_OID, Name="Synthetic export")
+
+    event = etree.SubElement(mdv, _q("StudyEventDef"), OID=EVENT_OID, Name="Visit", Repeating="No", Type="Scheduled")
+    for domain in domains:
+        etree.SubElement(event, _q("ItemGroupRef"), ItemGroupOID=f"IG.{domain}", Mandatory="Yes")
+
+    for domain in domains:
+        group = etree.SubElement(
+            mdv, _q("ItemGroupDef"),
+            OID=f"IG.{domain}", Name=f"Domain {domain}", Repeating="Simple", Domain=domain, Type="Form",
+        )
+        for i in range(spec.items_per_domain):
+            etree.SubElement(
+                group, _q("ItemRef"), ItemOID=f"IT.{domain}.{variable_name(domain, i)}",
+                Mandatory="No", OrderNumber=str(i + 1),
+            )
+
+    for d, domain in enumerate(domains):
+        for i in range(spec.items_per_domain):
+            var = variable_name(domain, i)
+            integer = is_integer_item(spec, d, i)
+            codelist = item_codelist(spec, d, i)
+            item = etree.SubElement(
+                mdv, _q("ItemDef"), OID=f"IT.{domain}.{var}", Name=var,
+                DataType="integer" if integer else "text", Length="8" if integer else "200",
+            )
+            if codelist is not None:
+                etree.SubElement(item, _q("CodeListRef"), CodeListOID=f"CL.{codelist:04d}")
+            kind = item_kind(i)
+            if kind == "derived":
+                etree.SubElement(item, _q("Alias"), Context="DERIVATION_RULE", Name=var)
+            elif kind == "suppqual":
+                etree.SubElement(item, _q("Alias"), Context=f"SUPPQUAL.SUPP{domain}.QNAM", Name=var[:8])
+                etree.SubElement(item, _q("Alias"), Context=f"SUPPQUAL.SUPP{domain}.QLABEL", Name=f"Label {var}")
+                etree.SubElement(item, _q("Alias"), Context=f"SUPPQUAL.SUPP{domain}.IDVAR", Name="USUBJID")
+            elif kind == "not_submitted":
+                etree.SubElement(item, _q("Alias"), Context="NOT_SUBMITTED", Name=var)
+
+    for c in range(spec.codelists):
+        codelist = etree.SubElement(mdv, _q("CodeList"), OID=f"CL.{c:04d}", Name=f"Codelist {c}", DataType="text")
+        for term in range(5):
+            cli = etree.SubElement(codelist, _q("CodeListItem"), CodedValue=f"C{c}T{term}")
+            _translated_text(etree.SubElement(cli, _q("Decode")), f"Term {term} of codelist {c}")
+
+    return study
+
+
+def build_subject(spec: SizeSpec, domains: List[str], subject: int, rng: random.Random):
+    """
+    One <SubjectData> with records_per_subject_group ItemGroupData per domain.
+    Coded items get a term of their CodeList, about 1% of them a value outside it.
+    """
+    subject_data = etree.Element(_q("SubjectData"), nsmap={None: ODM_NS}, SubjectKey=f"S{subject:07d}")
+    event = etree.SubElement(subject_data, _q("StudyEventData"), StudyEventOID=EVENT_OID)
+    for d, domain in enumerate(domains):
+        for repeat in range(1, spec.records_per_subject_group + 1):
+            group = etree.SubElement(
+                event, _q("ItemGroupData"),
+                ItemGroupOID=f"IG.{domain}", ItemGroupRepeatKey=str(repeat), TransactionType="Insert",
+            )
+            for i in range(spec.items_per_domain):
+                var = variable_name(domain, i)
+                item = etree.SubElement(group, _q("ItemData"), ItemOID=f"IT.{domain}.{var}")
+                value = etree.SubElement(item, _q("Value"))
+                codelist = item_codelist(spec, d, i)
+                if codelist is not None:
+                    value.text = f"C{codelist}T{rng.randrange(5) if rng.random() > 0.01 else 9}"
+                elif is_integer_item(spec, d, i):
+                    value.text = str(rng.randrange(1000))
+                else:
+                    value.text = f"{var}-{rng.randrange(100)}"
+    return subject_data
+
+
+def generate_odm(path: Path, spec: SizeSpec, seed: int = 0, template: Path = TEMPLATE) -> Path:
+    """Write a synthetic ODM 2.0 export of the given size, streaming ClinicalData to disk."""
+    rng = random.Random(seed)
+    domains = domain_codes(spec.domains)
+    template_root = etree.parse(str(template)).getroot()
+    header = dict(template_root.attrib)
+    header.update({
+        "FileType": "Snapshot",
+        "Granularity": "All",
+        "Context": "Archive",
+        "FileOID": f"FILE.SYNTH.{spec.item_defs}.{spec.subjects}",
+        "Originator": "BaaS benchmarks",
+        "SourceSystem": "synthetic",
+        "SourceSystemVersion": "1",
+    })
+    header.pop("PriorFileOID", None)
+
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with etree.xmlfile(str(path), encoding="UTF-8") as xf:
+        xf.write_declaration()
+        with xf.element(template_root.tag, header, nsmap=template_root.nsmap):
+            xf.write(build_study(spec, domains))
+            with xf.element(_q("ClinicalData"), StudyOID=STUDY_OID, MetaDataVersionOID=MDV_OID):
+                for subject in range(spec.subjects):
+                    xf.write(build_subject(spec, domains, subject, rng))
+    return path
+
+
+# -- SDTMIG
+def sdtmig_variables(domain: str, spec: SizeSpec) -> list:
+    """SDTMIG dataset variables for a synthetic domain: identifiers, ODM-backed variables, extras."""
+    names = ["STUDYID", "DOMAIN", "USUBJID", f"{domain}SEQ"]
+    names += [variable_name(domain, i) for i in range(spec.items_per_domain) if item_kind(i) != "suppqual"]
+    # Variables the CRF never collects, reported as Unmatched
+    names += [f"{domain}X{i:03d}" for i in range(max(1, spec.items_per_domain // 5))]
+
+    return [
+        {
+            "_links": {"self": {
+                "href": f"/mdr/sdtmig/3-4/datasets/{domain}/variables/{name}",
+                "title": f"Label for {name}",
+                "type": "SDTM Dataset Variable",
+            }},
+            "core": "Req" if ordinal <= 4 else "Perm",
+            "description": f"Synthetic variable {name}.",
+            "label": f"Label for {name}",
+            "name": name,
+            "ordinal": str(ordinal),
+            "role": "Identifier" if ordinal <= 4 else "Record Qualifier",
+            "simpleDatatype": "Char",
+        }
+        for ordinal, name in enumerate(names, start=1)
+    ]
+
+
+def generate_sdtmig(path: Path, spec: SizeSpec) -> Path:
+    """Write a CDISC Library-shaped SDTMIG JSON covering the synthetic ODM domains."""
+    datasets = [
+        {
+            "_links": {"self": {
+                "href": f"/mdr/sdtmig/3-4/datasets/{domain}",
+                "title": f"Synthetic Domain {domain}",
+                "type": "SDTM Dataset",
+            }},
+            "datasetStructure": "One record per synthetic observation per subject",
+            "description": f"Synthetic domain {domain}.",
+            "label": f"Synthetic Domain {domain}",
+            "name": domain,
+            "ordinal": str(ordinal),
+            "datasetVariables": sdtmig_variables(domain, spec),
+        }
+        for ordinal, domain in enumerate(domain_codes(spec.domains), start=1)
+    ]
+    document = {
+        "name": "SDTMIG v3.4 (synthetic)",
+        "label": "Synthetic SDTMIG",
+        "version": "3.4",
+        "classes": [{"name": "Findings", "label": "Findings", "ordinal": "1", "datasets": datasets}],
+    }
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(document, f)
+    return path
+
+## -- End of Program Code -- ##
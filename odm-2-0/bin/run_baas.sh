@@ -21,31 +21,14 @@ exec > >(tee -a "$LOG_FILE") 2>&1
 
 echo "[$(date)] Starting pipeline for study: $STUDY (env=$ENV)"
 
-DOMAIN_LIST=("DM")  # Add more like "AE" "VS" etc.
+DOMAIN_LIST=("DM")  # Add more like "AE" "VS" etc., or use ("all")
 
-echo "Step 1: Convert ODM-XML to JSON"
-python3 -m adapters.odm_json.extractors.convert_odm_xml_to_json \
+# Convert → Normalize → Match → Scaffold run in one interpreter; see
+# adapters/odm_json/runners/run_pipeline.py for per-stage timings/options.
+python3 -m adapters.odm_json.runners.run_pipeline \
   --study "$STUDY" \
-  --env "$ENV"
-
-echo "Step 2: Normalize SDTMIG JSON"
-python3 -m adapters.odm_json.extractors.normalize_sdtmig_json \
-  --study "$STUDY" \
-  --env "$ENV"
-
-echo "Step 3: Match ODM to SDTM"
-python3 -m adapters.odm_json.matchers.match_odm_to_sdtm \
-  --study "$STUDY" \
-  --env "$ENV"
-
-echo "Step 4: Scaffold SQL per domain"
-for DOMAIN in "${DOMAIN_LIST[@]}"; do
-  echo "  → Scaffolding domain: $DOMAIN"
-  python3 -m adapters.odm_json.scaffolds.scaffold_sql \
-    --study "$STUDY" \
-    --env "$ENV" \
-    --domain "$DOMAIN"
-done
+  --env "$ENV" \
+  --domains "${DOMAIN_LIST[@]}"
 
 echo "[$(date)] Pipeline completed for study: $STUDY"
 echo "Logs saved to: $LOG_FILE"
@@ -0,0 +1,121 @@
+"""
+Raw ClinicalData load: the rows written do not depend on how records are
+batched, and Update transactions only change the ItemData they carry.
+
+Run from odm-2-0: python -m pytest tests
+"""
+from pathlib import Path
+
+import duckdb
+import pytest
+
+from adapters.odm_json.extractors.extract_clinical_data import RAW_SCHEMA, load_clinical_data
+
+ODM_JSON = {
+    "MetaDataVersion": {
+        "ItemDefs": [
+            {"OID": "IT.DM.SUBJECT", "Name": "SUBJECT", "DataType": "text"},
+            {"OID": "IT.DM.SEX", "Name": "SEX", "DataType": "text"},
+            {"OID": "IT.DM.AGE", "Name": "AGE", "DataType": "integer"},
+            {"OID": "IT.AE.AETERM", "Name": "AETERM", "DataType": "text"},
+        ],
+        "ItemGroupDefs": [
+            {"OID": "IG.DM", "Domain": "DM", "ItemRefs": [
+                {"ItemOID": "IT.DM.SUBJECT"}, {"ItemOID": "IT.DM.SEX"}, {"ItemOID": "IT.DM.AGE"},
+            ]},
+            {"OID": "IG.AE", "Domain": "AE", "ItemRefs": [{"ItemOID": "IT.AE.AETERM"}]},
+        ],
+    }
+}
+
+
+def _group(oid: str, transaction: str, repeat: str = "1", **items) -> str:
+    values = "".join(
+        f'<ItemData ItemOID="IT.{oid.split(".")[1]}.{name}"><Value>{value}</Value></ItemData>'
+        for name, value in items.items()
+    )
+    return (
+        f'<ItemGroupData ItemGroupOID="{oid}" ItemGroupRepeatKey="{repeat}" '
+        f'TransactionType="{transaction}">{values}</ItemGroupData>'
+    )
+
+
+def _subject(key: str, *groups: str, transaction: str = "Insert") -> str:
+    return (
+        f'<SubjectData SubjectKey="{key}" TransactionType="{transaction}">'
+        f'<StudyEventData StudyEventOID="SE.SCREEN">{"".join(groups)}</StudyEventData></SubjectData>'
+    )
+
+
+def _write_odm(path: Path, *subjects: str) -> Path:
+    path.write_text(
+        '<?xml version="1.0" encoding="UTF-8"?>'
+        '<ODM xmlns="http://www.cdisc.org/ns/odm/v2.0" FileOID="F.1" FileType="Transactional">'
+        f'<ClinicalData StudyOID="ST.1" MetaDataVersionOID="MDV.1">{"".join(subjects)}</ClinicalData></ODM>',
+        encoding="utf-8",
+    )
+    return path
+
+
+def _rows(con, table: str) -> list:
+    return con.execute(
+        f'SELECT "SubjectKey", "ItemGroupRepeatKey", * EXCLUDE ("SubjectKey", "ItemGroupRepeatKey", '
+        f'"StudyEventOID", "StudyEventRepeatKey", "ItemGroupOID", "TransactionType") '
+        f"FROM {RAW_SCHEMA}.{table} ORDER BY ALL"
+    ).fetchall()
+
+
+@pytest.fixture
+def transactional_export(tmp_path):
+    return _write_odm(
+        tmp_path / "export.xml",
+        _subject(
+            "S1",
+            _group("IG.DM", "Insert", SUBJECT="S1", SEX="M", AGE="30"),
+            _group("IG.DM", "Update", SEX="F"),
+            _group("IG.AE", "Insert", "1", AETERM="Headache"),
+            _group("IG.AE", "Insert", "2", AETERM="Nausea"),
+            _group("IG.AE", "Remove", "1"),
+        ),
+        _subject("S2", _group("IG.DM", "Insert", SUBJECT="S2", SEX="M", AGE="41")),
+        _subject("S3", _group("IG.DM", "Insert", SUBJECT="S3", SEX="F", AGE="52")),
+        _subject("S2", transaction="Remove"),
+        _subject("S1", _group("IG.DM", "Update", AGE="31")),
+    )
+
+
+@pytest.mark.parametrize("batch_size", [1, 2, 3, 50_000])
+def test_load_does_not_depend_on_batch_size(transactional_export, batch_size):
+    con = duckdb.connect()
+    load_clinical_data(transactional_export, ODM_JSON, con, batch_size=batch_size)
+
+    assert _rows(con, "raw_dm") == [("S1", "1", "S1", "F", 31), ("S3", "1", "S3", "F", 52)]
+    assert _rows(con, "raw_ae") == [("S1", "2", "Nausea")]
+
+
+def test_incremental_update_keeps_unsupplied_items(tmp_path):
+    con = duckdb.connect()
+    day1 = _write_odm(
+        tmp_path / "day1.xml",
+        _subject("S1", _group("IG.DM", "Insert", SUBJECT="S1", SEX="M", AGE="30")),
+        _subject("S2", _group("IG.DM", "Insert", SUBJECT="S2", SEX="F", AGE="44")),
+    )
+    state = load_clinical_data(day1, ODM_JSON, con)["state"]
+
+    day2 = _write_odm(tmp_path / "day2.xml", _subject("S1", _group("IG.DM", "Update", SEX="F")))
+    stats = load_clinical_data(day2, ODM_JSON, con, state=state)
+
+    assert stats["mode"] == "incremental"
+    assert _rows(con, "raw_dm") == [("S1", "1", "S1", "F", 30), ("S2", "1", "S2", "F", 44)]
+
+
+def test_values_that_do_not_cast_are_counted(tmp_path):
+    export = _write_odm(
+        tmp_path / "export.xml",
+        _subject("S1", _group("IG.DM", "Insert", SUBJECT="S1", AGE="thirty")),
+        _subject("S2", _group("IG.DM", "Insert", SUBJECT="S2", AGE=" ")),
+        _subject("S3", _group("IG.DM", "Insert", SUBJECT="S3", AGE="52"), _group("IG.DM", "Update", AGE="n/a")),
+    )
+    stats = load_clinical_data(export, ODM_JSON, duckdb.connect())
+
+    assert stats["values_uncast"] == {"raw_dm.AGE": 2}